@@ -1,33 +1,360 @@
 import sqlite3
 import os
+import threading
+import time
+import atexit
+from contextlib import contextmanager
 from pathlib import Path
-from config import settings 
+from config import settings
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Conexión SQLite administrada por el ConnectionPool.
+    Hereda de sqlite3.Connection para que pandas y el resto del código la traten
+    como una conexión normal, pero close() la DEVUELVE al pool en lugar de cerrarla.
+    """
+    _pool = None
+
+    def close(self):
+        if self._pool is None:
+            return super().close()
+        self._pool.release(self)
+
+    def _close_physical(self):
+        """Cierre real del handle de SQLite (solo lo usa el pool)."""
+        super().close()
+
+
+# PRAGMAs permitidos en los perfiles de settings (se interpolan en el SQL, por eso la lista blanca)
+ALLOWED_PRAGMAS = (
+    "busy_timeout", "journal_mode", "synchronous", "cache_size",
+    "mmap_size", "temp_store", "wal_autocheckpoint",
+)
+
+
+def apply_pragma_profile(conn, profile_name=None):
+    """
+    Aplica un perfil de settings.DB_PRAGMA_PROFILES a una conexión recién abierta.
+    Retorna el journal_mode efectivo (SQLite puede rechazar WAL, p. ej. en BD de solo lectura).
+    """
+    profile_name = profile_name or settings.DB_PRAGMA_PROFILE
+    profile = settings.DB_PRAGMA_PROFILES.get(profile_name)
+    if profile is None:
+        raise ValueError(f"Perfil de PRAGMA desconocido: {profile_name}")
+
+    journal_mode = None
+    for pragma, value in profile.items():
+        if pragma not in ALLOWED_PRAGMAS:
+            raise ValueError(f"PRAGMA no permitido en perfil '{profile_name}': {pragma}")
+        row = conn.execute(f"PRAGMA {pragma} = {value}").fetchone()
+        if pragma == "journal_mode" and row:
+            journal_mode = str(row[0]).upper()
+    return journal_mode
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones SQLite con reutilización por hilo.
+    - Un hilo que ya tiene una conexión prestada recibe LA MISMA (reentrante),
+      así un DAO llamado dentro de otro no abre un segundo handle ni se bloquea.
+    - Las conexiones libres se reutilizan en orden LIFO (la más "caliente" primero).
+    - Antes de reutilizar una conexión inactiva se valida con un SELECT 1 (health check).
+    """
+    _pools = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, db_path, max_size=settings.DB_POOL_SIZE, timeout=settings.DB_POOL_TIMEOUT,
+                 health_check_idle=settings.DB_POOL_HEALTHCHECK_IDLE):
+        self.db_path = db_path
+        self.max_size = max(1, int(max_size))
+        self.timeout = timeout
+        self.health_check_idle = health_check_idle
+
+        self._cond = threading.Condition()
+        self._idle = []     # [(conexión, instante en que quedó libre)]
+        self._leases = {}   # {id_hilo: [conexión, profundidad]}
+        self._created = 0
+        self._closed = False
+
+        # Política de checkpoint (solo si el perfil deja la BD en WAL)
+        self.wal_enabled = False
+        self._last_checkpoint = time.monotonic()
+
+    @classmethod
+    def for_path(cls, db_path):
+        """Retorna el pool compartido (uno por archivo de BD en todo el proceso)."""
+        key = str(Path(db_path).resolve())
+        with cls._registry_lock:
+            pool = cls._pools.get(key)
+            if pool is None or pool._closed:
+                pool = cls(db_path)
+                cls._pools[key] = pool
+            return pool
+
+    @classmethod
+    def close_all_pools(cls):
+        with cls._registry_lock:
+            pools = list(cls._pools.values())
+            cls._pools.clear()
+        for pool in pools:
+            pool.close_all()
+
+    @classmethod
+    @contextmanager
+    def exclusive(cls, db_path):
+        """
+        Para reemplazar el archivo de BD: cierra su pool solo si ninguna conexión está fuera
+        (comprobación y cierre atómicos) y, hasta salir del bloque, no se puede abrir otro pool
+        sobre el archivo (for_path espera). Produce False sin cerrar nada si hay préstamos.
+        """
+        key = str(Path(db_path).resolve())
+        with cls._registry_lock:
+            pool = cls._pools.get(key)
+            if pool is not None and not pool.close_if_idle():
+                yield False
+                return
+            cls._pools.pop(key, None)
+            yield True
+
+    # --- PRÉSTAMO / DEVOLUCIÓN ---
+    def acquire(self):
+        ident = threading.get_ident()
+        with self._cond:
+            lease = self._leases.get(ident)
+            if lease is not None:
+                # Mismo hilo pidiendo otra vez: reutilizamos su conexión
+                lease[1] += 1
+                return lease[0]
+
+        conn = self._checkout()
+        conn._owner = ident
+        with self._cond:
+            self._leases[ident] = [conn, 1]
+        return conn
+
+    def release(self, conn):
+        with self._cond:
+            lease = self._leases.get(getattr(conn, "_owner", None))
+            if lease is None or lease[0] is not conn:
+                return # Doble close(): ya fue devuelta
+            lease[1] -= 1
+            if lease[1] > 0:
+                return
+            del self._leases[conn._owner]
+        self._checkin(conn)
+
+    def _checkout(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("El pool de conexiones está cerrado.")
+
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                elif self._created < self.max_size:
+                    self._created += 1
+                    conn, idle_since = None, None
+                else:
+                    # Pool agotado: recuperamos préstamos de hilos que murieron sin cerrar
+                    if self._reclaim_orphans():
+                        continue
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise sqlite3.OperationalError(
+                            f"No hay conexiones libres (pool de {self.max_size} agotado).")
+                    self._cond.wait(remaining)
+                    continue
+
+            # Fuera del lock: abrir o validar puede tardar
+            if conn is None:
+                try:
+                    return self._create_connection()
+                except Exception:
+                    with self._cond:
+                        self._created -= 1
+                        self._cond.notify()
+                    raise
+
+            if time.monotonic() - idle_since < self.health_check_idle or self._is_healthy(conn):
+                return conn
+            self._discard(conn)
+
+    def _checkin(self, conn):
+        try:
+            # Igual que un close() real: lo que no se confirmó se descarta
+            if conn.in_transaction:
+                conn.rollback()
+            # La restauración masiva apaga las FK; nunca devolvemos una conexión así al pool
+            conn.execute("PRAGMA foreign_keys = ON")
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+
+        self._maybe_checkpoint(conn)
+
+        with self._cond:
+            if self._closed:
+                self._created -= 1
+                conn._close_physical()
+                return
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def _maybe_checkpoint(self, conn):
+        """
+        Checkpoint PASSIVE oportunista: copia al archivo principal lo que pueda del -wal
+        sin esperar a lectores ni escritores. Complementa al wal_autocheckpoint de SQLite
+        para que el -wal no crezca indefinidamente mientras hay reportes largos leyendo.
+        """
+        if not self.wal_enabled:
+            return
+        now = time.monotonic()
+        if now - self._last_checkpoint < settings.DB_CHECKPOINT_INTERVAL:
+            return
+        self._last_checkpoint = now
+        try:
+            conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        except sqlite3.Error as e:
+            print(f"Aviso: checkpoint WAL pospuesto ({e})")
+
+    def _reclaim_orphans(self):
+        """Devuelve al pool conexiones prestadas a hilos que ya no existen. Requiere el lock."""
+        alive = {t.ident for t in threading.enumerate()}
+        orphans = [ident for ident in self._leases if ident not in alive]
+        for ident in orphans:
+            conn = self._leases.pop(ident)[0]
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.append((conn, 0.0)) # 0.0 fuerza health check al reutilizarla
+            except sqlite3.Error:
+                self._created -= 1
+        return bool(orphans)
+
+    # --- CICLO DE VIDA DE CONEXIONES ---
+    def _create_connection(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, factory=PooledConnection)
+        # CRÍTICO: SQLite por defecto tiene las FK desactivadas.
+        # Esto evita que insertes inasistencias sin contrato.
+        # Se aplica UNA vez por conexión física, no en cada préstamo.
+        conn.execute("PRAGMA foreign_keys = ON")
+        journal_mode = apply_pragma_profile(conn)
+        self.wal_enabled = journal_mode == "WAL"
+        conn._pool = self
+        return conn
+
+    def _is_healthy(self, conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn._close_physical()
+        except sqlite3.Error:
+            pass
+        with self._cond:
+            self._created -= 1
+            self._cond.notify()
+
+    def close_all(self):
+        """Cierre limpio: cierra las conexiones libres; las prestadas se cierran al devolverse."""
+        with self._cond:
+            idle = self._shut()
+        self._close_idle(idle)
+
+    def close_if_idle(self):
+        """
+        Cierra el pool solo si no hay ninguna conexión fuera (prestada, en préstamo o en
+        devolución). Comprobación y cierre bajo el mismo lock: nadie puede tomar una conexión
+        entre ambos. Retorna True si cerró.
+        """
+        with self._cond:
+            if self._created > len(self._idle):
+                return False
+            idle = self._shut()
+        self._close_idle(idle)
+        return True
+
+    def _shut(self):
+        """Marca el pool cerrado (rechaza préstamos nuevos) y retorna las libres. Requiere el lock."""
+        self._closed = True
+        idle = [c for c, _ in self._idle]
+        self._idle.clear()
+        self._created -= len(idle)
+        self._cond.notify_all()
+        return idle
+
+    def _close_idle(self, idle):
+        # Checkpoint final: deja el archivo .db autocontenido (útil para copiarlo o respaldarlo)
+        if idle and self.wal_enabled and settings.DB_CHECKPOINT_ON_CLOSE:
+            try:
+                idle[0].execute(f"PRAGMA wal_checkpoint({settings.DB_CHECKPOINT_ON_CLOSE})").fetchone()
+            except sqlite3.Error as e:
+                print(f"Aviso: no se pudo hacer el checkpoint final del WAL: {e}")
+        for conn in idle:
+            try:
+                conn._close_physical()
+            except sqlite3.Error:
+                pass
+
+    def stats(self):
+        with self._cond:
+            return {
+                "abiertas": self._created,
+                "libres": len(self._idle),
+                "prestadas": len(self._leases),
+                "maximo": self.max_size,
+                "wal": self.wal_enabled,
+            }
+
 
 class DatabaseConnection:
     """
     Manejador de conexión a la base de datos SQLite.
     Implementa el patrón Context Manager (with statement) si se desea,
     o métodos directos.
+    Las conexiones provienen de un pool compartido por todo el proceso:
+    conn.close() devuelve la conexión al pool, por lo que los DAOs no cambian.
     """
-    
+
     def __init__(self, db_name=settings.DB_NAME):
         # Obtiene la ruta absoluta del directorio raíz del proyecto
         # Asume que este archivo está en /config/ y subimos un nivel
         self.root_dir = Path(__file__).parent.parent
         self.db_path = self.root_dir / db_name
+        self.pool = ConnectionPool.for_path(self.db_path)
 
     def get_connection(self):
-        """Retorna una conexión activa con FKs habilitadas."""
+        """Retorna una conexión activa (prestada del pool) con FKs habilitadas."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            # CRÍTICO: SQLite por defecto tiene las FK desactivadas. 
-            # Esto evita que insertes inasistencias sin contrato.
-            conn.execute("PRAGMA foreign_keys = ON") 
-            return conn
+            if self.pool._closed:
+                self.pool = ConnectionPool.for_path(self.db_path)
+            try:
+                return self.pool.acquire()
+            except sqlite3.ProgrammingError:
+                if not self.pool._closed:
+                    raise
+                # Se cerró entre la comprobación y el préstamo (p. ej. restauración): pool nuevo
+                self.pool = ConnectionPool.for_path(self.db_path)
+                return self.pool.acquire()
         except sqlite3.Error as e:
             print(f"Error conectando a la BD en {self.db_path}: {e}")
             return None
 
+    @staticmethod
+    def close_all():
+        """Cierra todos los pools (al salir de la aplicación)."""
+        ConnectionPool.close_all_pools()
+
+    def exclusive(self):
+        """Bloque para reemplazar el archivo de BD (ver ConnectionPool.exclusive)."""
+        return ConnectionPool.exclusive(self.db_path)
+
     def test_connection(self):
         """Método helper para probar si la DB existe y responde."""
         conn = self.get_connection()
@@ -37,4 +364,8 @@ class DatabaseConnection:
             return True
         else:
             print("❌ Fallo en la conexión.")
-            return False
\ No newline at end of file
+            return False
+
+
+# Red de seguridad: si la app termina sin pasar por App.on_close, igual cerramos limpio
+atexit.register(ConnectionPool.close_all_pools)
@@ -0,0 +1,390 @@
+import time
+from config.db_connection import DatabaseConnection
+from models import search_index
+
+
+# ------------------------------------------------------------------------------
+# MIGRACIONES DE ESQUEMA
+# ------------------------------------------------------------------------------
+# Cada migración es (versión, descripción, [pasos]).
+# - La versión aplicada se guarda en PRAGMA user_version (entero en la cabecera del .db).
+# - Un paso puede ser un string SQL o una función f(cursor) para backfills en Python.
+# - Las versiones son consecutivas y NUNCA se editan una vez publicadas: se agrega una nueva.
+
+def _add_column(table, column, declaration):
+    """Paso de migración: ALTER TABLE ADD COLUMN solo si la columna no existe (SQLite no tiene IF NOT EXISTS)."""
+    def step(cursor):
+        cursor.execute(f"PRAGMA table_info({table})")
+        if column not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+    return step
+
+
+MIGRATIONS = [
+    (1, "Índices para las rutas críticas (kardex, inasistencias, contratos, costos)", [
+        # Saldo y reporte de kardex: filtran por contrato + cuenta y ordenan por fecha.
+        # 'dias' al final hace el índice cubriente para SUM(dias) (no toca la tabla).
+        """CREATE INDEX IF NOT EXISTS idx_kardex_contrato_cuenta_fecha
+           ON kardex_vacaciones(id_contrato, cuenta_tipo, fecha_movimiento, dias)""",
+        # Verificación de duplicados de ACUMULACION_MENSUAL por periodo
+        """CREATE INDEX IF NOT EXISTS idx_kardex_contrato_tipo_fecha
+           ON kardex_vacaciones(id_contrato, tipo_movimiento, fecha_movimiento)""",
+        # Reversión de GOCE al eliminar una inasistencia y LEFT JOIN del reporte
+        """CREATE INDEX IF NOT EXISTS idx_kardex_referencia_tipo
+           ON kardex_vacaciones(id_referencia, tipo_movimiento)""",
+        """CREATE INDEX IF NOT EXISTS idx_inasistencias_contrato_fecha
+           ON inasistencias(id_contrato, fecha_inicio_real)""",
+        """CREATE INDEX IF NOT EXISTS idx_contratos_empleado_activo
+           ON contratos(id_empleado, activo)""",
+        """CREATE INDEX IF NOT EXISTS idx_distribucion_contrato
+           ON distribucion_costos(id_contrato)""",
+        # Consulta de planilla por periodo (el UNIQUE existente empieza por id_contrato)
+        """CREATE INDEX IF NOT EXISTS idx_nominas_periodo
+           ON nominas_mensuales(anio, mes)""",
+    ]),
+    (2, "Marca de agua de devengos por contrato (kardex_devengo_control)", [
+        # Último cierre de mes ya procesado por VacationService para cada contrato.
+        # Guarda el fecha_inicio_kardex con el que se calculó para detectar cambios.
+        """CREATE TABLE IF NOT EXISTS kardex_devengo_control (
+            id_contrato INTEGER PRIMARY KEY,
+            devengado_hasta DATE NOT NULL,
+            fecha_inicio_kardex DATE,
+            FOREIGN KEY (id_contrato) REFERENCES contratos(id_contrato) ON DELETE CASCADE
+        )""",
+    ]),
+    (3, "Días laborables por jornada (cat_jornadas.dias_laborables)", [
+        # Máscara Lunes..Domingo en formato numpy.busday_count; por defecto Lunes a Viernes
+        _add_column("cat_jornadas", "dias_laborables", "TEXT NOT NULL DEFAULT '1111100'"),
+    ]),
+    (4, "Catálogo de feriados (cat_feriados)", [
+        """CREATE TABLE IF NOT EXISTS cat_feriados (
+            id_feriado INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha DATE NOT NULL UNIQUE,
+            descripcion TEXT NOT NULL
+        )""",
+    ]),
+    (5, "Saldos materializados de kardex por contrato y cuenta (kardex_saldos)", [
+        # Tabla derivada: la mantienen los triggers de kardex_vacaciones en cada INSERT/UPDATE/DELETE
+        # (incluye los borrados en cascada al eliminar un contrato). cuenta_tipo NULL cuenta como ORDINARIA.
+        # 'movimientos' permite borrar la fila al quedar sin movimientos (sin residuos de redondeo).
+        """CREATE TABLE IF NOT EXISTS kardex_saldos (
+            id_contrato INTEGER NOT NULL,
+            cuenta_tipo TEXT NOT NULL,
+            saldo REAL NOT NULL DEFAULT 0,
+            movimientos INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (id_contrato, cuenta_tipo)
+        ) WITHOUT ROWID""",
+        """CREATE TRIGGER IF NOT EXISTS trg_kardex_saldo_insert
+           AFTER INSERT ON kardex_vacaciones
+           BEGIN
+               INSERT INTO kardex_saldos (id_contrato, cuenta_tipo, saldo, movimientos)
+               VALUES (NEW.id_contrato, COALESCE(NEW.cuenta_tipo, 'ORDINARIA'), COALESCE(NEW.dias, 0), 1)
+               ON CONFLICT(id_contrato, cuenta_tipo) DO UPDATE SET
+                   saldo = saldo + excluded.saldo,
+                   movimientos = movimientos + 1;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_kardex_saldo_delete
+           AFTER DELETE ON kardex_vacaciones
+           BEGIN
+               UPDATE kardex_saldos
+               SET saldo = saldo - COALESCE(OLD.dias, 0), movimientos = movimientos - 1
+               WHERE id_contrato = OLD.id_contrato AND cuenta_tipo = COALESCE(OLD.cuenta_tipo, 'ORDINARIA');
+               DELETE FROM kardex_saldos
+               WHERE id_contrato = OLD.id_contrato AND cuenta_tipo = COALESCE(OLD.cuenta_tipo, 'ORDINARIA')
+               AND movimientos <= 0;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_kardex_saldo_update
+           AFTER UPDATE OF id_contrato, cuenta_tipo, dias ON kardex_vacaciones
+           BEGIN
+               UPDATE kardex_saldos
+               SET saldo = saldo - COALESCE(OLD.dias, 0), movimientos = movimientos - 1
+               WHERE id_contrato = OLD.id_contrato AND cuenta_tipo = COALESCE(OLD.cuenta_tipo, 'ORDINARIA');
+               DELETE FROM kardex_saldos
+               WHERE id_contrato = OLD.id_contrato AND cuenta_tipo = COALESCE(OLD.cuenta_tipo, 'ORDINARIA')
+               AND movimientos <= 0;
+               INSERT INTO kardex_saldos (id_contrato, cuenta_tipo, saldo, movimientos)
+               VALUES (NEW.id_contrato, COALESCE(NEW.cuenta_tipo, 'ORDINARIA'), COALESCE(NEW.dias, 0), 1)
+               ON CONFLICT(id_contrato, cuenta_tipo) DO UPDATE SET
+                   saldo = saldo + excluded.saldo,
+                   movimientos = movimientos + 1;
+           END""",
+        # Carga inicial desde el historial existente
+        "DELETE FROM kardex_saldos",
+        """INSERT INTO kardex_saldos (id_contrato, cuenta_tipo, saldo, movimientos)
+           SELECT id_contrato, COALESCE(cuenta_tipo, 'ORDINARIA'), COALESCE(SUM(dias), 0), COUNT(*)
+           FROM kardex_vacaciones
+           GROUP BY id_contrato, COALESCE(cuenta_tipo, 'ORDINARIA')""",
+    ]),
+    (6, "Cierres mensuales de saldo de kardex (kardex_cierres_mensuales)", [
+        # Saldo ORDINARIO acumulado al fin de cada mes con movimientos (incluye los del día de cierre).
+        # Lo escribe el proceso de devengos; un movimiento con fecha igual o anterior a un cierre lo
+        # invalida (triggers) y el siguiente proceso de devengos lo vuelve a calcular.
+        """CREATE TABLE IF NOT EXISTS kardex_cierres_mensuales (
+            id_contrato INTEGER NOT NULL,
+            fecha_cierre DATE NOT NULL,
+            saldo REAL NOT NULL,
+            PRIMARY KEY (id_contrato, fecha_cierre),
+            FOREIGN KEY (id_contrato) REFERENCES contratos(id_contrato) ON DELETE CASCADE
+        ) WITHOUT ROWID""",
+        """CREATE TRIGGER IF NOT EXISTS trg_kardex_cierre_insert
+           AFTER INSERT ON kardex_vacaciones
+           BEGIN
+               DELETE FROM kardex_cierres_mensuales
+               WHERE id_contrato = NEW.id_contrato AND fecha_cierre >= substr(NEW.fecha_movimiento, 1, 10);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_kardex_cierre_delete
+           AFTER DELETE ON kardex_vacaciones
+           BEGIN
+               DELETE FROM kardex_cierres_mensuales
+               WHERE id_contrato = OLD.id_contrato AND fecha_cierre >= substr(OLD.fecha_movimiento, 1, 10);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_kardex_cierre_update
+           AFTER UPDATE OF id_contrato, cuenta_tipo, dias, fecha_movimiento ON kardex_vacaciones
+           BEGIN
+               DELETE FROM kardex_cierres_mensuales
+               WHERE id_contrato = OLD.id_contrato AND fecha_cierre >= substr(OLD.fecha_movimiento, 1, 10);
+               DELETE FROM kardex_cierres_mensuales
+               WHERE id_contrato = NEW.id_contrato AND fecha_cierre >= substr(NEW.fecha_movimiento, 1, 10);
+           END""",
+    ]),
+    (7, "Búsqueda de texto completo de empleados y contratos (FTS5)", [
+        # Ver models/search_index.py. remove_diacritics: "pena" encuentra "Peña", "jose" a "José".
+        """CREATE VIRTUAL TABLE IF NOT EXISTS fts_empleados USING fts5(
+            codigo, dni, nombres, apellidos,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )""",
+        """CREATE VIRTUAL TABLE IF NOT EXISTS fts_contratos USING fts5(
+            codigo, dni, nombres, apellidos, puesto,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS trg_fts_empleado_insert
+           AFTER INSERT ON empleados
+           BEGIN
+               INSERT INTO fts_empleados (rowid, codigo, dni, nombres, apellidos)
+               VALUES (NEW.id_empleado, NEW.codigo, COALESCE(NEW.dni, '') || ' ' || replace(COALESCE(NEW.dni, ''), '-', ''), NEW.nombres, NEW.apellidos);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_fts_empleado_update
+           AFTER UPDATE OF id_empleado, codigo, dni, nombres, apellidos ON empleados
+           BEGIN
+               DELETE FROM fts_empleados WHERE rowid = OLD.id_empleado;
+               INSERT INTO fts_empleados (rowid, codigo, dni, nombres, apellidos)
+               VALUES (NEW.id_empleado, NEW.codigo, COALESCE(NEW.dni, '') || ' ' || replace(COALESCE(NEW.dni, ''), '-', ''), NEW.nombres, NEW.apellidos);
+               UPDATE fts_contratos
+               SET codigo = NEW.codigo, dni = COALESCE(NEW.dni, '') || ' ' || replace(COALESCE(NEW.dni, ''), '-', ''), nombres = NEW.nombres, apellidos = NEW.apellidos
+               WHERE rowid IN (SELECT id_contrato FROM contratos WHERE id_empleado = NEW.id_empleado);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_fts_empleado_delete
+           AFTER DELETE ON empleados
+           BEGIN
+               DELETE FROM fts_empleados WHERE rowid = OLD.id_empleado;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_fts_contrato_insert
+           AFTER INSERT ON contratos
+           BEGIN
+               INSERT INTO fts_contratos (rowid, codigo, dni, nombres, apellidos, puesto)
+               SELECT NEW.id_contrato, e.codigo, COALESCE(e.dni, '') || ' ' || replace(COALESCE(e.dni, ''), '-', ''),
+                      e.nombres, e.apellidos,
+                      (SELECT nombre_puesto FROM cat_puestos WHERE id_puesto = NEW.id_puesto)
+               FROM empleados e WHERE e.id_empleado = NEW.id_empleado;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_fts_contrato_update
+           AFTER UPDATE OF id_contrato, id_empleado, id_puesto ON contratos
+           BEGIN
+               DELETE FROM fts_contratos WHERE rowid = OLD.id_contrato;
+               INSERT INTO fts_contratos (rowid, codigo, dni, nombres, apellidos, puesto)
+               SELECT NEW.id_contrato, e.codigo, COALESCE(e.dni, '') || ' ' || replace(COALESCE(e.dni, ''), '-', ''),
+                      e.nombres, e.apellidos,
+                      (SELECT nombre_puesto FROM cat_puestos WHERE id_puesto = NEW.id_puesto)
+               FROM empleados e WHERE e.id_empleado = NEW.id_empleado;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_fts_contrato_delete
+           AFTER DELETE ON contratos
+           BEGIN
+               DELETE FROM fts_contratos WHERE rowid = OLD.id_contrato;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_fts_puesto_update
+           AFTER UPDATE OF nombre_puesto ON cat_puestos
+           BEGIN
+               UPDATE fts_contratos SET puesto = NEW.nombre_puesto
+               WHERE rowid IN (SELECT id_contrato FROM contratos WHERE id_puesto = NEW.id_puesto);
+           END""",
+        # Carga inicial desde los datos existentes
+        search_index.rebuild,
+    ]),
+]
+
+
+# Consultas representativas de las pantallas más usadas, para medir antes/después.
+# Parámetros (MigrationRunner._benchmark_params): :id_contrato es el contrato con más movimientos
+# de kardex; :id_empleado su empleado y :id_inasistencia un GOCE de ese contrato.
+BENCHMARK_QUERIES = [
+    ("Saldo kardex (AttendanceDAO.get_kardex_balance)",
+     """SELECT COALESCE(SUM(dias), 0.0) FROM kardex_vacaciones
+        WHERE id_contrato = :id_contrato AND (cuenta_tipo = 'ORDINARIA' OR cuenta_tipo IS NULL)"""),
+    ("Movimientos kardex (KardexDAO.get_kardex_ledger)",
+     """SELECT k.id_movimiento, k.fecha_movimiento, k.dias, i.fecha_inicio_real
+        FROM kardex_vacaciones k
+        LEFT JOIN inasistencias i ON k.id_referencia = i.id_inasistencia
+        WHERE k.id_contrato = :id_contrato AND (k.cuenta_tipo = 'ORDINARIA' OR k.cuenta_tipo IS NULL)
+        ORDER BY k.fecha_movimiento, k.id_movimiento"""),
+    ("Duplicado de devengo (VacationService._process_single_month)",
+     """SELECT id_movimiento FROM kardex_vacaciones
+        WHERE id_contrato = :id_contrato AND tipo_movimiento = 'ACUMULACION_MENSUAL'
+        AND fecha_movimiento >= '2000-01-01' AND fecha_movimiento < '2000-02-01'"""),
+    ("Reversión de GOCE (AttendanceDAO.delete_inasistencia)",
+     """SELECT id_movimiento FROM kardex_vacaciones
+        WHERE id_referencia = :id_inasistencia AND tipo_movimiento = 'GOCE'"""),
+    ("Contratos activos por empleado",
+     """SELECT id_contrato FROM contratos WHERE id_empleado = :id_empleado AND activo = 1"""),
+    ("Distribución de costos por contrato",
+     """SELECT id_unidad, porcentaje FROM distribucion_costos WHERE id_contrato = :id_contrato"""),
+]
+
+
+class MigrationRunner:
+    """
+    Aplica las migraciones pendientes según PRAGMA user_version.
+    Cada migración corre en su propia transacción: si falla, la BD queda en la versión anterior.
+    """
+
+    def __init__(self, db=None, benchmark_repeat=200):
+        self.db = db or DatabaseConnection()
+        self.benchmark_repeat = benchmark_repeat
+
+    @staticmethod
+    def latest_version():
+        return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+    def get_current_version(self):
+        conn = self.db.get_connection()
+        try:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            conn.close()
+
+    def run(self, verbose=True):
+        """
+        Ejecuta las migraciones pendientes.
+        Retorna (True/False, mensaje, reporte) donde reporte incluye tiempos antes/después.
+        """
+        conn = self.db.get_connection()
+        if not conn:
+            return False, "Sin conexión a BD.", {}
+
+        report = {"version_inicial": 0, "version_final": 0, "migraciones": [], "benchmark": []}
+        try:
+            cursor = conn.cursor()
+            current = cursor.execute("PRAGMA user_version").fetchone()[0]
+            report["version_inicial"] = report["version_final"] = current
+
+            pending = [m for m in MIGRATIONS if m[0] > current]
+            if not pending:
+                return True, f"Esquema al día (versión {current}).", report
+
+            # 1. Medición ANTES (solo cuando hay algo que aplicar: el arranque normal no paga esto)
+            before = self._benchmark(cursor)
+
+            # 2. Aplicar cada migración en su transacción
+            for version, description, steps in pending:
+                t0 = time.perf_counter()
+                try:
+                    cursor.execute("BEGIN")
+                    for step in steps:
+                        if callable(step):
+                            step(cursor)
+                        else:
+                            cursor.execute(step)
+                    cursor.execute(f"PRAGMA user_version = {int(version)}")
+                    conn.commit()
+                except Exception as e:
+                    conn.rollback()
+                    raise Exception(f"Migración {version} ({description}) falló: {e}")
+
+                elapsed_ms = (time.perf_counter() - t0) * 1000
+                report["migraciones"].append((version, description, elapsed_ms))
+                report["version_final"] = version
+
+            # 3. Estadísticas para que el planificador aproveche los índices nuevos
+            cursor.execute("PRAGMA optimize")
+
+            # 4. Medición DESPUÉS
+            after = self._benchmark(cursor)
+            report["benchmark"] = [
+                (name, b_ms, a_ms, b_plan, a_plan)
+                for (name, b_ms, b_plan), (_, a_ms, a_plan) in zip(before, after)
+            ]
+
+            if verbose:
+                print(self.format_report(report))
+            return True, f"Esquema migrado de la versión {current} a la {report['version_final']}.", report
+
+        except Exception as e:
+            print(f"Error en migraciones: {e}")
+            return False, str(e), report
+        finally:
+            conn.close()
+
+    # --------------------------------------------------------------------------
+    # HELPERS PRIVADOS
+    # --------------------------------------------------------------------------
+
+    def _benchmark(self, cursor):
+        """Mide cada consulta representativa (ms promedio) y resume su plan (SCAN/SEARCH)."""
+        params = self._benchmark_params(cursor)
+
+        results = []
+        for name, sql in BENCHMARK_QUERIES:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            plan = "; ".join(r[-1] for r in cursor.fetchall())
+
+            t0 = time.perf_counter()
+            for _ in range(self.benchmark_repeat):
+                cursor.execute(sql, params).fetchall()
+            avg_ms = (time.perf_counter() - t0) * 1000 / self.benchmark_repeat
+            results.append((name, avg_ms, plan))
+        return results
+
+    @staticmethod
+    def _benchmark_params(cursor):
+        """Ids reales y relacionados entre sí (con ids ajenos las consultas no encuentran nada)."""
+        cursor.execute("""
+            SELECT id_contrato FROM kardex_vacaciones
+            GROUP BY id_contrato ORDER BY COUNT(*) DESC LIMIT 1
+        """)
+        row = cursor.fetchone()
+        id_contrato = row[0] if row else 1
+
+        row = cursor.execute("SELECT id_empleado FROM contratos WHERE id_contrato = ?", (id_contrato,)).fetchone()
+        id_empleado = row[0] if row else 1
+
+        # Un GOCE del contrato (si no tiene, cualquier inasistencia suya)
+        row = cursor.execute("""
+            SELECT id_referencia FROM kardex_vacaciones
+            WHERE id_contrato = ? AND tipo_movimiento = 'GOCE' AND id_referencia IS NOT NULL
+            LIMIT 1
+        """, (id_contrato,)).fetchone()
+        if row is None:
+            row = cursor.execute("SELECT id_inasistencia FROM inasistencias WHERE id_contrato = ? LIMIT 1",
+                                 (id_contrato,)).fetchone()
+        id_inasistencia = row[0] if row else 1
+
+        return {"id_contrato": id_contrato, "id_empleado": id_empleado, "id_inasistencia": id_inasistencia}
+
+    @staticmethod
+    def format_report(report):
+        lines = [f"🛠 Migraciones: versión {report['version_inicial']} -> {report['version_final']}"]
+        for version, description, ms in report["migraciones"]:
+            lines.append(f"   v{version}: {description} ({ms:.1f} ms)")
+        if report["benchmark"]:
+            lines.append("   Consulta | antes (ms) | después (ms)")
+            for name, b_ms, a_ms, b_plan, a_plan in report["benchmark"]:
+                lines.append(f"   - {name}: {b_ms:.3f} -> {a_ms:.3f}")
+                if b_plan != a_plan:
+                    lines.append(f"       plan: {b_plan}  =>  {a_plan}")
+        return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # Permite migrar sin abrir la interfaz: python -m config.migrations
+    ok, msg, _ = MigrationRunner().run()
+    print(msg)
@@ -14,6 +14,64 @@ DB_NAME = "rrhh.db"
 # ruta de base de datos
 DB_PATH = BASE_DIR / DB_NAME
 
+# Pool de conexiones SQLite (config/db_connection.py)
+DB_POOL_SIZE = 5               # Máximo de conexiones abiertas a la vez (hilo UI + hilos de reportes)
+DB_POOL_TIMEOUT = 10           # Segundos de espera por una conexión libre antes de fallar
+DB_POOL_HEALTHCHECK_IDLE = 30  # Segundos de inactividad tras los cuales se valida la conexión
+
+# Trabajo de BD disparado desde la interfaz (views/task_executor.py)
+UI_EXECUTOR_WORKERS = 3        # Hilos compartidos por las vistas (menos que DB_POOL_SIZE: deja conexión al hilo UI)
+UI_EXECUTOR_POLL_MS = 30       # Cada cuánto el hilo de Tk recoge resultados mientras haya tareas pendientes
+
+# Perfil de PRAGMAs aplicado UNA vez por conexión física al crearla
+# "concurrente": WAL, los hilos de reportes leen sin bloquear la captura de datos
+# "compatible": journal clásico, para BD en carpetas de red donde WAL no es seguro
+DB_PRAGMA_PROFILE = "concurrente"
+DB_PRAGMA_PROFILES = {
+    "concurrente": {
+        "busy_timeout": 5000,         # ms de espera ante un bloqueo antes de fallar
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",      # En WAL es seguro ante caídas; evita un fsync por commit
+        "cache_size": -16000,         # Negativo = KiB (16 MB por conexión)
+        "mmap_size": 134217728,       # 128 MB de lectura mapeada en memoria
+        "temp_store": "MEMORY",
+        "wal_autocheckpoint": 1000,   # Páginas acumuladas en el -wal antes del checkpoint automático
+    },
+    "compatible": {
+        "busy_timeout": 5000,
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "cache_size": -8000,
+        "temp_store": "MEMORY",
+    },
+}
+
+# Política de checkpoint del WAL (solo aplica si el perfil usa journal_mode=WAL)
+DB_CHECKPOINT_INTERVAL = 300          # Segundos entre checkpoints PASSIVE oportunistas (no bloquean)
+DB_CHECKPOINT_ON_CLOSE = "TRUNCATE"   # Al cerrar la app: vuelca todo y deja el -wal en 0 bytes
+
+# Respaldo en caliente (logics/backup_service.py, API de backup de SQLite)
+BACKUP_DIR = BASE_DIR / "respaldos"   # Carpeta por defecto (job de consola y diálogo de guardado)
+BACKUP_PAGES_PER_STEP = 256           # Páginas copiadas por paso; entre pasos se liberan los bloqueos
+BACKUP_STEP_SLEEP = 0.005             # Segundos de pausa entre pasos para no acaparar el disco
+
+# Restauración desde Excel: parseo de hojas en paralelo (logics/excel_reader.py)
+RESTORE_PARALLEL_WORKERS = None               # None = min(4, núcleos); 1 = siempre secuencial
+RESTORE_PARALLEL_MIN_BYTES = 2 * 1024 * 1024  # Libros más chicos se parsean en secuencia (arrancar procesos cuesta)
+
+# Exportación masiva de kardex en ZIP: un libro por contrato generado en un pool de procesos
+KARDEX_EXPORT_WORKERS = None                  # None = min(4, núcleos); 1 = siempre secuencial
+KARDEX_EXPORT_PARALLEL_MIN = 50               # Con menos contratos se genera en secuencia
+
+# Pasivo de vacaciones (logics/vacation_liability_service.py): salario diario = salario mensual / divisor
+VACATION_DAILY_SALARY_DIVISOR = 30
+
+# Navegación: vistas de módulo que se mantienen vivas (ocultas) entre clics del menú (LRU)
+VIEW_CACHE_MAX = 5
+
+# Arranque: python main.py --startup-timing imprime fases e importaciones (config/startup_timing.py)
+STARTUP_TIMING_TOP = 15               # Paquetes/módulos más lentos que se listan
+
 # Ruta centralizada del Icono
 ICON_PATH = ASSETS_DIR / "blowfish_icon.ico"
 
@@ -0,0 +1,132 @@
+import sys
+import threading
+import time
+from collections import defaultdict
+
+# Bandera de línea de comandos: python main.py --startup-timing
+STARTUP_TIMING_FLAG = "--startup-timing"
+
+
+class StartupTimer:
+    """
+    Medición del arranque en frío (para detectar regresiones al agregar importaciones).
+    - phase(nombre): tiempo transcurrido desde la fase anterior (BD, ventana, primer dibujado...)
+    - Importaciones: un finder al inicio de sys.meta_path cronometra la carga de cada módulo
+      (propio y acumulado, como `python -X importtime`), también en el .exe empaquetado.
+    Desactivado (enabled=False) no instala nada y phase()/report() no hacen nada, así el
+    código de arranque lo usa sin condicionales.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.phases = []   # [(nombre, segundos)]
+        self.imports = {}  # {módulo: [propio, acumulado, profundidad]} en orden de carga
+        self._stack = []   # [[módulo, inicio, tiempo de hijos]]
+        self._thread = threading.get_ident() # Solo se mide el hilo principal
+        self._finder = None
+        self._start = self._last = time.perf_counter()
+        if enabled:
+            self._finder = _TimingFinder(self)
+            sys.meta_path.insert(0, self._finder)
+
+    @classmethod
+    def from_argv(cls, argv):
+        """Timer activo si se pasó la bandera (que se quita de argv), inactivo si no."""
+        if STARTUP_TIMING_FLAG in argv:
+            argv.remove(STARTUP_TIMING_FLAG)
+            return cls(enabled=True)
+        return cls(enabled=False)
+
+    def phase(self, name):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    def stop(self):
+        """Deja de medir importaciones (las vistas que se carguen después no cuentan como arranque)."""
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+        self._finder = None
+
+    def report(self, top=15):
+        """Texto con el desglose: fases, importaciones por paquete y los módulos más lentos."""
+        if not self.enabled:
+            return ""
+        total = self._last - self._start
+        lines = [f"Arranque en {total:.3f} s", "Fases:"]
+        for name, seconds in self.phases:
+            lines.append(f"  {name:<36} {seconds:8.3f} s")
+
+        por_paquete = defaultdict(float)
+        for module, (own, _, _) in self.imports.items():
+            por_paquete[module.split('.')[0]] += own
+        total_imports = sum(por_paquete.values())
+        lines.append(f"Importaciones por paquete (tiempo propio, total {total_imports:.3f} s):")
+        for package, seconds in sorted(por_paquete.items(), key=lambda kv: kv[1], reverse=True)[:top]:
+            lines.append(f"  {package:<36} {seconds:8.3f} s")
+
+        lines.append("Módulos más lentos (acumulado, como -X importtime):")
+        lines.append(f"  {'propio [ms]':>12} | {'acumulado [ms]':>14} | módulo")
+        slowest = sorted(self.imports.items(), key=lambda kv: kv[1][1], reverse=True)[:top]
+        for module, (own, cumulative, depth) in slowest:
+            lines.append(f"  {own * 1000:12.1f} | {cumulative * 1000:14.1f} | {'  ' * depth}{module}")
+        return "\n".join(lines)
+
+    # --- Cronometraje de módulos (lo llama el loader envuelto) ---
+
+    def _timed(self, module, step, *args):
+        if threading.get_ident() != self._thread:
+            return step(*args)
+        frame = [module, time.perf_counter(), 0.0]
+        self._stack.append(frame)
+        try:
+            return step(*args)
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - frame[1]
+            if self._stack:
+                self._stack[-1][2] += elapsed
+            # Extensiones C: create_module y exec_module suman en el mismo renglón
+            record = self.imports.setdefault(module, [0.0, 0.0, len(self._stack)])
+            record[0] += elapsed - frame[2]
+            record[1] += elapsed
+
+
+class _TimingFinder:
+    """Delegado de sys.meta_path: busca con los demás finders y envuelve el loader encontrado."""
+
+    def __init__(self, timer):
+        self.timer = timer
+
+    def find_spec(self, fullname, path=None, target=None):
+        for finder in sys.meta_path:
+            find_spec = getattr(finder, 'find_spec', None)
+            if finder is self or find_spec is None:
+                continue
+            spec = find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                spec.loader = _TimingLoader(spec.loader, self.timer)
+            return spec
+        return None
+
+
+class _TimingLoader:
+    """Loader original con create_module/exec_module cronometrados; el resto se delega."""
+
+    def __init__(self, loader, timer):
+        self._loader = loader
+        self._timer = timer
+
+    def create_module(self, spec):
+        # Las extensiones C (numpy, pandas._libs) se inicializan aquí, no en exec_module
+        return self._timer._timed(spec.name, self._loader.create_module, spec)
+
+    def exec_module(self, module):
+        return self._timer._timed(module.__name__, self._loader.exec_module, module)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
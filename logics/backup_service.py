@@ -0,0 +1,219 @@
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from config import settings
+from config.db_connection import DatabaseConnection
+from config.migrations import MigrationRunner
+from logics.vacation_rules import VacationRuleCache
+from logics.business_calendar import BusinessCalendar
+from models.catalogs_dao import CatalogCache
+from logics.data_events import DataEvents
+
+
+class BackupService:
+    """
+    Respaldo binario de la BD con la API de backup de SQLite (sqlite3.Connection.backup).
+    - Copia por pasos de N páginas: entre pasos se liberan los bloqueos, así la captura de
+      datos sigue funcionando mientras se respalda (en WAL los lectores nunca bloquean).
+    - Opcionalmente comprime con gzip (extensión .gz).
+    - La restauración valida el archivo y reemplaza la BD con un rename atómico.
+    El respaldo a Excel (PercExportService.export_database_to_excel) queda como volcado legible.
+    """
+
+    def __init__(self):
+        self.db = DatabaseConnection()
+
+    @staticmethod
+    def default_backup_name(compress=True):
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+        return f"BACKUP_RRHH_{timestamp}.db" + (".gz" if compress else "")
+
+    # --------------------------------------------------------------------------
+    # 1. RESPALDO
+    # --------------------------------------------------------------------------
+
+    def create_backup(self, output_path, compress=None, progress_callback=None):
+        """
+        Copia la BD viva a output_path. Si compress es None se decide por la extensión (.gz).
+        progress_callback(actual, total, mensaje) se invoca desde el hilo que ejecuta el respaldo.
+        Retorna: (True/False, mensaje)
+        """
+        output_path = Path(output_path)
+        if compress is None:
+            compress = output_path.suffix.lower() == ".gz"
+
+        def report(actual, total, mensaje):
+            if progress_callback:
+                progress_callback(actual, total, mensaje)
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        # Todo se escribe en temporales junto al destino: el archivo final aparece completo o no aparece
+        tmp_db = self._temp_path(output_path.parent, ".db")
+        tmp_out = self._temp_path(output_path.parent, output_path.suffix)
+
+        src = self.db.get_connection()
+        if not src:
+            return False, "Sin conexión a BD."
+
+        t0 = time.perf_counter()
+        try:
+            dst = sqlite3.connect(tmp_db)
+            try:
+                def on_step(status, remaining, total):
+                    report(total - remaining, total, f"Copiando páginas {total - remaining} de {total}...")
+
+                src.backup(dst, pages=settings.BACKUP_PAGES_PER_STEP, progress=on_step,
+                           sleep=settings.BACKUP_STEP_SLEEP)
+
+                # La copia debe ser autocontenida (sin -wal) y sana antes de entregarla
+                dst.execute("PRAGMA journal_mode = DELETE")
+                check = dst.execute("PRAGMA quick_check").fetchone()[0]
+                if check != "ok":
+                    raise Exception(f"La copia no pasó la verificación de integridad: {check}")
+            finally:
+                dst.close()
+        except Exception as e:
+            self._remove_quietly(tmp_db)
+            return False, f"Error creando respaldo: {e}"
+        finally:
+            src.close()
+
+        try:
+            if compress:
+                report(1, 1, "Comprimiendo respaldo...")
+                with open(tmp_db, "rb") as f_in, gzip.open(tmp_out, "wb", compresslevel=6) as f_out:
+                    shutil.copyfileobj(f_in, f_out, length=1024 * 1024)
+                self._remove_quietly(tmp_db)
+            else:
+                os.replace(tmp_db, tmp_out)
+            os.replace(tmp_out, output_path)
+        except Exception as e:
+            self._remove_quietly(tmp_db)
+            self._remove_quietly(tmp_out)
+            return False, f"Error guardando respaldo: {e}"
+
+        size_mb = output_path.stat().st_size / (1024 * 1024)
+        elapsed = time.perf_counter() - t0
+        report(1, 1, "Respaldo completado.")
+        return True, f"Respaldo creado en {elapsed:.1f} s ({size_mb:.1f} MB):\n{output_path}"
+
+    # --------------------------------------------------------------------------
+    # 2. RESTAURACIÓN
+    # --------------------------------------------------------------------------
+
+    def restore_backup(self, input_path, progress_callback=None):
+        """
+        Reemplaza la BD actual por un respaldo (.db o .db.gz).
+        1. Descomprime/copia a un temporal en la carpeta de la BD y valida su integridad.
+        2. Guarda la BD actual como <bd>.pre_restore (red de seguridad).
+        3. Cierra el pool (solo si está libre, sin dejar abrir otro) y reemplaza el archivo con
+           os.replace (atómico en el mismo disco), conservando los permisos del original.
+        4. Aplica migraciones pendientes (el respaldo puede ser de una versión anterior).
+        Retorna: (True/False, mensaje)
+        """
+        input_path = Path(input_path)
+        db_path = Path(self.db.db_path)
+
+        def report(actual, total, mensaje):
+            if progress_callback:
+                progress_callback(actual, total, mensaje)
+
+        if not input_path.exists():
+            return False, f"No se encontró el archivo: {input_path}"
+
+        tmp_db = self._temp_path(db_path.parent, ".db")
+        try:
+            # 1. Preparar y validar la copia
+            report(0, 4, "Preparando archivo de respaldo...")
+            if input_path.suffix.lower() == ".gz":
+                with gzip.open(input_path, "rb") as f_in, open(tmp_db, "wb") as f_out:
+                    shutil.copyfileobj(f_in, f_out, length=1024 * 1024)
+            else:
+                shutil.copyfile(input_path, tmp_db)
+
+            report(1, 4, "Verificando integridad...")
+            ok, msg = self._validate_database(tmp_db)
+            if not ok:
+                self._remove_quietly(tmp_db)
+                return False, msg
+
+            # 2. Red de seguridad: copia en caliente de la BD actual
+            report(2, 4, "Guardando copia de seguridad de la base actual...")
+            safety_path = db_path.with_name(db_path.name + ".pre_restore")
+            ok, msg = self.create_backup(safety_path, compress=False)
+            if not ok:
+                self._remove_quietly(tmp_db)
+                return False, f"No se pudo respaldar la base actual, restauración cancelada.\n{msg}"
+
+            # 3. Reemplazo atómico
+            report(3, 4, "Reemplazando base de datos...")
+            # mkstemp crea el temporal con permisos 0600: el archivo restaurado conserva los del original
+            if db_path.exists():
+                shutil.copymode(db_path, tmp_db)
+
+            # Cierre del pool (checkpoint final) solo si nadie tiene una conexión, y sin que otro
+            # hilo (tareas de las vistas) pueda abrir una hasta terminar el reemplazo
+            with self.db.exclusive() as idle:
+                if not idle:
+                    self._remove_quietly(tmp_db)
+                    return False, "Hay operaciones en curso usando la base de datos. Intente de nuevo en unos segundos."
+                # El -wal/-shm que quede pertenece a la BD anterior: aplicado sobre la nueva la corrompería
+                for suffix in ("-wal", "-shm"):
+                    self._remove_quietly(db_path.with_name(db_path.name + suffix))
+                os.replace(tmp_db, db_path)
+
+        except Exception as e:
+            self._remove_quietly(tmp_db)
+            return False, f"Error restaurando respaldo: {e}"
+
+        # 4. Esquema al día y cachés recargadas desde la BD restaurada
+        VacationRuleCache.invalidate()
+        BusinessCalendar.invalidate()
+        CatalogCache.invalidate()
+        DataEvents.notify()
+        ok, msg, _ = MigrationRunner().run(verbose=False)
+        report(4, 4, "Restauración completada.")
+        if not ok:
+            return False, f"Respaldo restaurado, pero falló la migración de esquema: {msg}"
+        return True, f"Base de datos restaurada desde:\n{input_path}\n\nCopia de la base anterior: {safety_path.name}"
+
+    # --------------------------------------------------------------------------
+    # HELPERS PRIVADOS
+    # --------------------------------------------------------------------------
+
+    @staticmethod
+    def _validate_database(path):
+        try:
+            conn = sqlite3.connect(path)
+            try:
+                check = conn.execute("PRAGMA integrity_check").fetchone()[0]
+                if check != "ok":
+                    return False, f"El respaldo está dañado: {check}"
+                tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+                if not {"empleados", "contratos"} <= tables:
+                    return False, "El archivo no es un respaldo de este sistema (faltan tablas principales)."
+                # Sin -wal junto al temporal: el os.replace mueve un archivo autocontenido
+                conn.execute("PRAGMA journal_mode = DELETE")
+            finally:
+                conn.close()
+            return True, "ok"
+        except sqlite3.DatabaseError as e:
+            return False, f"El archivo no es una base de datos SQLite válida: {e}"
+
+    @staticmethod
+    def _temp_path(directory, suffix):
+        fd, path = tempfile.mkstemp(prefix=".rrhh_tmp_", suffix=suffix, dir=directory)
+        os.close(fd)
+        return path
+
+    @staticmethod
+    def _remove_quietly(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
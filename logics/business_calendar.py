@@ -0,0 +1,132 @@
+import threading
+from datetime import date, datetime, timedelta
+from config.db_connection import DatabaseConnection
+
+# Máscara semanal Lunes..Domingo (mismo formato que numpy.busday_count): '1' = día laborable.
+# Es el valor por defecto de cat_jornadas.dias_laborables (Lunes a Viernes).
+DEFAULT_WEEKMASK = "1111100"
+
+
+def normalize_weekmask(weekmask=None):
+    """Valida una máscara 'LMMJVSD' de 7 caracteres 0/1. None o vacío -> Lunes a Viernes."""
+    mask = str(weekmask).strip() if weekmask else DEFAULT_WEEKMASK
+    if len(mask) != 7 or any(ch not in "01" for ch in mask):
+        raise ValueError(f"Máscara de días laborables inválida: '{weekmask}' (use 7 dígitos 0/1, Lunes a Domingo)")
+    return mask
+
+
+class BusinessCalendar:
+    """
+    Calendario laboral precalculado de UN año para UNA jornada (su máscara de días laborables),
+    descontando los feriados de cat_feriados.
+    Guarda sumas acumuladas por día del año:
+        acum[i] = días laborables entre el 1 de enero y el día i-1
+    así cualquier rango dentro del año se responde con una resta (O(1)).
+    Las instancias se memorizan por (año, máscara) para todo el proceso;
+    CatalogsDAO.crud_feriado / crud_jornada llaman a invalidate() después de cada escritura.
+    """
+    _lock = threading.Lock()
+    _calendars = {}   # {(anio, mascara): BusinessCalendar}
+    _feriados = None  # {anio: set(date)}
+    _version = 0
+
+    def __init__(self, anio, weekmask, feriados):
+        self.anio = anio
+        self.weekmask = weekmask
+        self.feriados = feriados # Solo los del año
+
+        inicio = date(anio, 1, 1)
+        self._ordinal_inicio = inicio.toordinal()
+        total_dias = (date(anio + 1, 1, 1) - inicio).days
+
+        acum = [0] * (total_dias + 1)
+        dia = inicio
+        for i in range(total_dias):
+            laborable = weekmask[dia.weekday()] == "1" and dia not in feriados
+            acum[i + 1] = acum[i] + laborable
+            dia += timedelta(days=1)
+        self._acum = acum
+
+    # --- CONSULTAS O(1) SOBRE EL AÑO ---
+    def count(self, start, end):
+        """Días laborables entre start y end (inclusive). Ambos deben pertenecer al año del calendario."""
+        i = start.toordinal() - self._ordinal_inicio
+        j = end.toordinal() - self._ordinal_inicio
+        if j < i: return 0
+        return self._acum[j + 1] - self._acum[i]
+
+    def dias_laborables_mes(self, mes):
+        """Días laborables del mes (ya sin feriados)."""
+        inicio = date(self.anio, mes, 1)
+        fin = date(self.anio + (mes == 12), mes % 12 + 1, 1) - timedelta(days=1)
+        return self.count(inicio, fin)
+
+    def total_dias_laborables(self):
+        return self._acum[-1]
+
+    # --- ACCESO MEMORIZADO ---
+    @classmethod
+    def get(cls, anio, weekmask=None):
+        """Calendario del año para la máscara de la jornada (se construye una sola vez)."""
+        key = (int(anio), normalize_weekmask(weekmask))
+        calendar = cls._calendars.get(key)
+        if calendar is None:
+            with cls._lock:
+                calendar = cls._calendars.get(key)
+                if calendar is None:
+                    feriados = cls._get_feriados_locked().get(key[0], frozenset())
+                    calendar = cls(key[0], key[1], feriados)
+                    cls._calendars[key] = calendar
+        return calendar
+
+    @classmethod
+    def count_business_days(cls, start, end, weekmask=None):
+        """
+        Días laborables entre start y end (date/datetime, inclusive) descontando feriados.
+        Un rango que cruza años suma un tramo por año (cada uno O(1)).
+        """
+        if isinstance(start, datetime): start = start.date()
+        if isinstance(end, datetime): end = end.date()
+        if start > end: return 0
+
+        total = 0
+        for anio in range(start.year, end.year + 1):
+            tramo_ini = start if anio == start.year else date(anio, 1, 1)
+            tramo_fin = end if anio == end.year else date(anio, 12, 31)
+            total += cls.get(anio, weekmask).count(tramo_ini, tramo_fin)
+        return total
+
+    @classmethod
+    def get_feriados(cls):
+        """Todas las fechas feriadas registradas (lista ordenada de date), p. ej. para numpy.busday_count."""
+        with cls._lock:
+            feriados = cls._get_feriados_locked()
+        return sorted(d for por_anio in feriados.values() for d in por_anio)
+
+    @classmethod
+    def invalidate(cls):
+        """Descarta calendarios y feriados; la próxima consulta recarga desde la BD."""
+        with cls._lock:
+            cls._calendars = {}
+            cls._feriados = None
+            cls._version += 1
+
+    @classmethod
+    def version(cls):
+        return cls._version
+
+    @classmethod
+    def _get_feriados_locked(cls):
+        if cls._feriados is None:
+            conn = DatabaseConnection().get_connection()
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT fecha FROM cat_feriados")
+                feriados = {}
+                for (fecha,) in cursor.fetchall():
+                    dia = datetime.strptime(str(fecha)[:10], '%Y-%m-%d').date()
+                    feriados.setdefault(dia.year, set()).add(dia)
+            finally:
+                conn.close()
+            cls._feriados = {anio: frozenset(dias) for anio, dias in feriados.items()}
+        return cls._feriados
@@ -0,0 +1,27 @@
+import threading
+
+# Áreas de datos que las pantallas muestran. Los DAO/servicios avisan cuál modificaron.
+TOPICS = ('empleados', 'contratos', 'nominas', 'inasistencias', 'kardex', 'catalogos')
+
+
+class DataEvents:
+    """
+    Avisos de cambio de datos, compartidos por todo el proceso: un contador de versión por área.
+    Quien escribe llama notify('contratos') después del commit (desde cualquier hilo: solo
+    incrementa un contador, no toca la interfaz). Las vistas que se mantienen vivas
+    (views/view_registry.py) comparan snapshot() al mostrarse y se refrescan solo si su área cambió.
+    """
+    _lock = threading.Lock()
+    _versions = {}
+
+    @classmethod
+    def notify(cls, *topics):
+        """Marca las áreas como modificadas (todas si no se indica ninguna, p. ej. tras restaurar la BD)."""
+        with cls._lock:
+            for topic in topics or TOPICS:
+                cls._versions[topic] = cls._versions.get(topic, 0) + 1
+
+    @classmethod
+    def snapshot(cls, topics):
+        """Versiones actuales de las áreas indicadas (tupla comparable)."""
+        return tuple(cls._versions.get(topic, 0) for topic in topics)
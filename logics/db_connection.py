@@ -1,6 +1,8 @@
 import sqlite3
 import pandas as pd
 from pathlib import Path
+from logics.excel_writer import StreamingExcelWriter
+from models import search_index
 
 
 
@@ -32,19 +34,12 @@ def export_sqlite_to_excel(db_path: str, output_excel: str):
         if tables.empty:
             raise ValueError("La base de datos no contiene tablas.")
 
-        # Crear Excel
-        with pd.ExcelWriter(output_excel, engine="openpyxl") as writer:
+        # Crear Excel (el writer recorta el nombre de hoja a 31 caracteres)
+        with StreamingExcelWriter(output_excel) as writer:
             for table_name in tables["name"]:
-                df = pd.read_sql(f"SELECT * FROM {table_name}", conn)
-
-                # Excel limita el nombre de hojas a 31 caracteres
-                sheet_name = table_name[:31]
-
-                df.to_excel(
-                    writer,
-                    sheet_name=sheet_name,
-                    index=False
-                )
+                if search_index.is_index_table(table_name):
+                    continue # Índice FTS: derivado (BLOBs internos de SQLite), se reconstruye solo
+                writer.write_query(conn, f"SELECT * FROM {table_name}", table_name)
 
         print(f"Archivo Excel generado correctamente: {output_excel}")
 
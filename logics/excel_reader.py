@@ -0,0 +1,83 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import pandas as pd
+from config import settings
+
+# Módulo liviano a propósito: los procesos hijos (spawn) lo importan para ejecutar read_sheet,
+# así que no debe arrastrar conexiones ni servicios.
+
+
+# Libro abierto una sola vez por proceso del pool. Abrir el libro es lo caro: los archivos
+# generados en modo write_only no declaran <dimension>, y openpyxl recorre el XML de TODAS
+# las hojas para calcularla cada vez que se carga el libro.
+_worker_book = None
+
+
+def _init_worker(input_path):
+    global _worker_book
+    _worker_book = pd.ExcelFile(input_path)
+
+
+def read_sheet(sheet_name, converters=None):
+    """Parsea UNA hoja del libro ya abierto. Se ejecuta dentro de los procesos del pool."""
+    return sheet_name, _worker_book.parse(sheet_name, converters=converters)
+
+
+def get_sheet_names(input_path):
+    """Nombres de hoja sin parsear las celdas (openpyxl en modo solo lectura)."""
+    with pd.ExcelFile(input_path) as xls:
+        return list(xls.sheet_names)
+
+
+def _worker_count(total_sheets, file_size):
+    workers = settings.RESTORE_PARALLEL_WORKERS
+    if workers is None:
+        workers = min(4, os.cpu_count() or 1)
+    # Levantar procesos cuesta (cada hijo importa pandas): en libros chicos no compensa
+    if file_size < settings.RESTORE_PARALLEL_MIN_BYTES:
+        return 1
+    return max(1, min(int(workers), total_sheets))
+
+
+def iter_sheets(input_path, sheet_names, converters=None):
+    """
+    Genera (nombre_hoja, DataFrame) a medida que cada hoja termina de parsearse.
+    - Libros grandes: las hojas se parsean en paralelo en un pool de procesos (openpyxl es
+      CPU-bound y el GIL impide aprovechar hilos); el consumidor puede ir insertando la primera
+      hoja lista mientras las demás siguen parseándose.
+    - Libros chicos, un solo núcleo o pool no disponible: parseo secuencial en este proceso.
+    El orden de sheet_names es el orden de envío (conviene pasar los padres primero).
+    """
+    workers = _worker_count(len(sheet_names), os.path.getsize(input_path))
+    if workers <= 1:
+        yield from _iter_serial(input_path, sheet_names, converters)
+        return
+
+    pending = list(sheet_names)
+    try:
+        # spawn: seguro aunque el proceso tenga hilos vivos (Tk, pool de conexiones)
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_init_worker, initargs=(str(input_path),)) as pool:
+            futures = [pool.submit(read_sheet, name, converters) for name in sheet_names]
+            try:
+                for future in as_completed(futures):
+                    name, df = future.result()
+                    pending.remove(name)
+                    yield name, df
+            finally:
+                # Si el consumidor abortó (p. ej. error al insertar), no seguimos parseando
+                for future in futures:
+                    future.cancel()
+    except (BrokenProcessPool, OSError) as e:
+        print(f"Aviso: parseo paralelo no disponible ({e}); se continúa en secuencial.")
+        yield from _iter_serial(input_path, pending, converters)
+
+
+def _iter_serial(input_path, sheet_names, converters=None):
+    # Un único ExcelFile para todas las hojas (el libro se carga una vez, no una por hoja)
+    with pd.ExcelFile(input_path) as xls:
+        for name in list(sheet_names):
+            yield name, xls.parse(name, converters=converters)
@@ -0,0 +1,201 @@
+import math
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+# Filas que se retienen por hoja para calcular anchos antes de empezar a escribir.
+# En modo write_only las columnas se declaran antes de la primera fila, así que el ancho
+# se mide sobre el encabezado + esta muestra; el resto de filas se escribe directo a disco.
+WIDTH_SAMPLE_ROWS = 500
+MIN_COLUMN_WIDTH = 8
+MAX_COLUMN_WIDTH = 60
+
+# Caracteres que Excel no permite en nombres de hoja
+INVALID_SHEET_CHARS = ['[', ']', ':', '*', '?', '/', '\\']
+
+HEADER_FONT = Font(bold=True)
+
+# Límite de caracteres por celda en Excel
+MAX_CELL_CHARS = 32767
+
+
+def clean_sheet_title(name):
+    """Quita caracteres prohibidos y recorta a 31 caracteres (límite de Excel)."""
+    clean = str(name)
+    for char in INVALID_SHEET_CHARS:
+        clean = clean.replace(char, '')
+    return clean[:31] or "Hoja"
+
+
+def _clean_value(value):
+    """
+    NaN/NaT de pandas -> celda vacía (igual que DataFrame.to_excel).
+    BLOB (bytes/memoryview) -> texto hexadecimal: openpyxl no acepta bytes en una celda.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return ("0x" + bytes(value).hex())[:MAX_CELL_CHARS]
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if type(value).__name__ == "NaTType":
+        return None
+    return value
+
+
+class StreamingSheet:
+    """
+    Hoja en modo streaming. Las primeras filas se retienen solo para medir anchos;
+    al superar la muestra (o al cerrar) se fijan las columnas y todo se escribe en orden.
+    """
+
+    def __init__(self, worksheet, column_widths=None, sample_rows=WIDTH_SAMPLE_ROWS):
+        self.ws = worksheet
+        self.sample_rows = sample_rows
+        self.fixed_widths = column_widths
+        self.widths = []
+        self.row_count = 0
+        self._pending = [] # [(valores, font, fill)] mientras dura la muestra
+        self._flushed = False
+        self.closed = False
+        if column_widths:
+            self.flush() # Anchos ya conocidos: no hace falta retener muestra
+
+    def append(self, values, font=None, fill=None):
+        values = [_clean_value(v) for v in values]
+        self.row_count += 1
+
+        if self._flushed:
+            self._write(values, font, fill)
+            return
+
+        self._measure(values)
+        self._pending.append((values, font, fill))
+        if len(self._pending) >= self.sample_rows:
+            self.flush()
+
+    def append_rows(self, rows, font=None, fill=None):
+        for row in rows:
+            self.append(row, font, fill)
+
+    def flush(self):
+        """Fija los anchos calculados y vuelca la muestra retenida."""
+        if self._flushed:
+            return
+        widths = self.fixed_widths or [
+            min(max(w + 2, MIN_COLUMN_WIDTH), MAX_COLUMN_WIDTH) for w in self.widths
+        ]
+        for i, width in enumerate(widths, 1):
+            self.ws.column_dimensions[get_column_letter(i)].width = width
+
+        self._flushed = True
+        for values, font, fill in self._pending:
+            self._write(values, font, fill)
+        self._pending = []
+
+    def close(self):
+        """
+        Termina la hoja y libera su archivo temporal. Útil en libros con muchas hojas:
+        openpyxl mantiene abierto un temporal por hoja hasta cerrarla o guardar el libro.
+        """
+        if self.closed:
+            return
+        self.flush()
+        self.ws.close()
+        self.closed = True
+
+    def _measure(self, values):
+        # Ancho incremental: máximo largo de texto visto por columna
+        for i, value in enumerate(values):
+            length = len(str(value)) if value is not None else 0
+            if i < len(self.widths):
+                if length > self.widths[i]:
+                    self.widths[i] = length
+            else:
+                self.widths.append(length)
+
+    def _write(self, values, font, fill):
+        if font is None and fill is None:
+            self.ws.append(values)
+            return
+        cells = []
+        for value in values:
+            cell = WriteOnlyCell(self.ws, value=value)
+            if font is not None: cell.font = font
+            if fill is not None: cell.fill = fill
+            cells.append(cell)
+        self.ws.append(cells)
+
+
+class StreamingExcelWriter:
+    """
+    Escritor Excel compartido por todas las exportaciones (openpyxl write_only).
+    Memoria constante: cada hoja se escribe a disco a medida que llegan las filas,
+    y los anchos de columna se calculan sobre la marcha (sin recorrer celdas al final).
+    Uso:
+        with StreamingExcelWriter(ruta) as writer:
+            writer.write_dataframe(df, "Empleado")
+            writer.write_query(conn, "SELECT * FROM contratos", "contratos")
+    """
+
+    def __init__(self, filepath, sample_rows=WIDTH_SAMPLE_ROWS):
+        self.filepath = filepath
+        self.sample_rows = sample_rows
+        self.wb = Workbook(write_only=True)
+        self.sheets = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Si hubo error no guardamos un archivo a medias
+        if exc_type is None:
+            self.close()
+        return False
+
+    def add_sheet(self, title, headers=None, column_widths=None, header_font=HEADER_FONT, header_fill=None):
+        sheet = StreamingSheet(self.wb.create_sheet(clean_sheet_title(title)), column_widths, self.sample_rows)
+        if headers is not None:
+            sheet.append(list(headers), font=header_font, fill=header_fill)
+        self.sheets.append(sheet)
+        return sheet
+
+    def write_dataframe(self, df, sheet_name, chunksize=5000):
+        """Equivalente a df.to_excel(index=False), por bloques."""
+        sheet = self.add_sheet(sheet_name, [str(c) for c in df.columns])
+        for start in range(0, len(df), chunksize):
+            chunk = df.iloc[start:start + chunksize]
+            sheet.append_rows(chunk.itertuples(index=False, name=None))
+        return sheet
+
+    def write_query(self, conn, query, sheet_name, params=(), chunksize=2000):
+        """Vuelca el resultado de una consulta directo desde el cursor (fetchmany, sin DataFrame)."""
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query, params)
+            sheet = self.add_sheet(sheet_name, [d[0] for d in cursor.description])
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if not rows:
+                    break
+                sheet.append_rows(rows)
+        finally:
+            cursor.close()
+        return sheet
+
+    def close(self):
+        if self.wb is None:
+            return
+        if not self.sheets:
+            self.add_sheet("Hoja") # Un libro sin hojas no es válido
+        for sheet in self.sheets:
+            if not sheet.closed:
+                sheet.flush()
+        self.wb.save(self.filepath)
+        self.wb = None
+
+
+def solid_fill(color):
+    """Relleno sólido (atajo para estilos de filas)."""
+    return PatternFill(start_color=color, end_color=color, fill_type="solid")
@@ -0,0 +1,87 @@
+"""
+Tareas de mantenimiento ejecutables sin abrir la interfaz (cierres, verificaciones).
+Uso:
+    python -m logics.jobs            -> lista las tareas disponibles
+    python -m logics.jobs devengos   -> cierre mensual de vacaciones
+    python -m logics.jobs respaldo   -> respaldo comprimido en settings.BACKUP_DIR
+    python -m logics.jobs saldos     -> verifica (y repara) los saldos materializados del kardex
+    python -m logics.jobs cierres    -> recalcula los cierres mensuales de saldo del kardex
+"""
+import sys
+from config import settings
+from config.migrations import MigrationRunner
+from logics.vacation_service import VacationService
+from logics.backup_service import BackupService
+from models.kardex_dao import KardexDAO
+
+
+def print_progress(actual, total, mensaje):
+    """Callback de progreso para consola (misma firma que usan las vistas)."""
+    pct = (actual * 100 / total) if total else 100
+    print(f"\r[{pct:5.1f}%] {mensaje:<60}", end="", flush=True)
+
+
+def run_accruals_job(progress_callback=print_progress):
+    """Cierre mensual: acumulaciones pendientes de todos los contratos activos."""
+    return VacationService().process_all_monthly_accruals(progress_callback)
+
+
+def run_backup_job(progress_callback=print_progress):
+    """Respaldo en caliente (API de backup de SQLite), comprimido y con fecha en el nombre."""
+    output_path = settings.BACKUP_DIR / BackupService.default_backup_name(compress=True)
+    return BackupService().create_backup(output_path, progress_callback=progress_callback)
+
+
+def run_balance_check_job(progress_callback=print_progress):
+    """
+    Compara kardex_saldos con la suma completa de kardex_vacaciones.
+    Si hay diferencias las reporta y reconstruye la tabla; el job termina en error igual,
+    porque un desvío indica una escritura que saltó los triggers.
+    """
+    progress_callback(0, 1, "Verificando saldos de kardex...")
+    diferencias, total = KardexDAO().verify_balances(repair=True)
+    progress_callback(1, 1, "Verificación terminada.")
+    if not diferencias:
+        return True, f"Saldos de kardex consistentes ({total} cuentas verificadas)."
+
+    lines = [f"{len(diferencias)} de {total} cuentas no coincidían (se reconstruyó kardex_saldos):"]
+    for id_contrato, cuenta, guardado, real in diferencias[:20]:
+        lines.append(f"  contrato {id_contrato} / {cuenta}: guardado={guardado} real={real}")
+    if len(diferencias) > 20:
+        lines.append(f"  ... y {len(diferencias) - 20} más")
+    return False, "\n".join(lines)
+
+
+def run_snapshot_rebuild_job(progress_callback=print_progress):
+    """Recalcula todos los cierres mensuales (tras correcciones masivas con fecha pasada)."""
+    return KardexDAO().rebuild_all_month_snapshots(VacationService.last_closed_month_end(), progress_callback)
+
+
+# Nombre CLI -> (función, descripción)
+JOBS = {
+    "devengos": (run_accruals_job, "Cierre mensual de vacaciones (todos los contratos activos)"),
+    "respaldo": (run_backup_job, "Respaldo comprimido de la base de datos (sin detener la aplicación)"),
+    "saldos": (run_balance_check_job, "Verifica los saldos materializados del kardex contra el historial"),
+    "cierres": (run_snapshot_rebuild_job, "Recalcula los cierres mensuales de saldo del kardex"),
+}
+
+
+def main(argv):
+    if len(argv) < 2 or argv[1] not in JOBS:
+        print("Tareas disponibles:")
+        for name, (_, description) in JOBS.items():
+            print(f"  {name:<20} {description}")
+        return 1
+
+    # El job puede depender de tablas/índices nuevos: aseguramos el esquema primero
+    MigrationRunner().run(verbose=False)
+
+    job, _ = JOBS[argv[1]]
+    success, message = job()
+    print()
+    print(("✅ " if success else "❌ ") + message)
+    return 0 if success else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,69 @@
+import io
+from openpyxl.styles import Font
+from logics.excel_writer import StreamingExcelWriter, solid_fill
+
+# Módulo liviano a propósito: los procesos del pool de exportación masiva (spawn) lo importan
+# para ejecutar render_kardex_workbook, así que no debe arrastrar conexiones ni servicios.
+
+KARDEX_HEADERS = ["Fecha", "Tipo Movimiento", "Detalle / Observación", "Debe (Devengado)", "Haber (Ganado)", "Saldo"]
+KARDEX_COLUMN_WIDTHS = [12, 25, 40, 15, 15, 15]
+
+HEADER_FONT = Font(bold=True, color="FFFFFF")
+HEADER_FILL = solid_fill("4F81BD")
+BOLD_FONT = Font(bold=True)
+PROJECTION_FONT = Font(italic=True, color="555555")
+TOTAL_FILL = solid_fill("DCE6F1")
+
+
+def write_kardex_sheet(writer, title, data, f_ini=None):
+    """
+    Escribe una hoja de kardex (mismo formato que la pantalla de saldos) en un StreamingExcelWriter.
+    data tiene la estructura de ReportService.get_kardex_report_data.
+    """
+    ws = writer.add_sheet(
+        title, KARDEX_HEADERS,
+        column_widths=KARDEX_COLUMN_WIDTHS,
+        header_font=HEADER_FONT, header_fill=HEADER_FILL
+    )
+
+    # FILA SALDO ANTERIOR (Si aplica)
+    if data["saldo_anterior"] != 0 or f_ini:
+        ws.append([
+            f_ini if f_ini else "---",
+            "SALDO ANTERIOR",
+            "Arrastre de periodo previo",
+            "",
+            "",
+            data['saldo_anterior']
+        ], font=BOLD_FONT)
+
+    # MOVIMIENTOS (Si es proyección, en cursiva)
+    for row in data["movimientos"]:
+        ws.append([
+            row['fecha'],
+            row['tipo'],
+            row['detalle'],
+            row['debe'] if row['debe'] > 0 else "",
+            row['haber'] if row['haber'] > 0 else "",
+            row['saldo']
+        ], font=PROJECTION_FONT if row.get('es_proyeccion') else None)
+
+    # TOTALES
+    tot = data["totales"]
+    ws.append([
+        "",
+        "TOTALES",
+        "",
+        tot['debe'],
+        tot['haber'],
+        tot['saldo_final']
+    ], font=BOLD_FONT, fill=TOTAL_FILL)
+    return ws
+
+
+def render_kardex_workbook(filename, title, data, f_ini=None):
+    """Libro de UN contrato en memoria. Se ejecuta dentro de los procesos del pool: retorna (nombre, bytes)."""
+    buffer = io.BytesIO()
+    with StreamingExcelWriter(buffer) as writer:
+        write_kardex_sheet(writer, title, data, f_ini)
+    return filename, buffer.getvalue()
@@ -0,0 +1,40 @@
+import importlib
+import threading
+
+
+class LazyService:
+    """
+    Servicio que se importa e instancia en su primer uso y no al construir la vista.
+    Los servicios de reportes/importación arrastran pandas, numpy y openpyxl (cientos de ms):
+    con esto la pantalla se dibuja al instante y el costo lo paga la primera operación,
+    normalmente ya dentro del hilo de trabajo.
+        service = LazyService('logics.report_service', 'ReportService')
+        service.export_all_kardex(...)            # importa aquí, la primera vez
+        callback = service.method('export_x')     # ni siquiera importa hasta llamarse
+    """
+
+    def __init__(self, module_name, class_name):
+        self._module_name = module_name
+        self._class_name = class_name
+        self._instance = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """La instancia real (importando el módulo la primera vez, desde cualquier hilo)."""
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    module = importlib.import_module(self._module_name)
+                    self._instance = getattr(module, self._class_name)()
+        return self._instance
+
+    def method(self, name):
+        """Callable que resuelve el método recién al llamarse (para callbacks armados con la pantalla)."""
+        def call(*args, **kwargs):
+            return getattr(self.get(), name)(*args, **kwargs)
+        return call
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
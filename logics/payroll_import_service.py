@@ -2,6 +2,7 @@ import pandas as pd
 from datetime import datetime
 from config.db_connection import DatabaseConnection
 from models.payroll_dao import PayrollDAO
+from logics.excel_writer import StreamingExcelWriter
 
 class PayrollImportService:
     def __init__(self):
@@ -57,9 +58,8 @@ class PayrollImportService:
             df = df[cols_order]
 
             # 4. Exportar a Excel con formato
-            with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False, sheet_name='Plantilla_Nomina')
-                # Aquí podrías agregar lógica de OpenPyXL para bloquear la columna id_contrato si quisieras
+            with StreamingExcelWriter(filepath) as writer:
+                writer.write_dataframe(df, 'Plantilla_Nomina')
             
             return True, f"Plantilla generada exitosamente en: {filepath}"
 
@@ -71,56 +71,105 @@ class PayrollImportService:
     def process_payroll_import(self, filepath):
         """
         Lee la plantilla llena e inserta/actualiza en nominas_mensuales.
+        Validación por columnas (vectorizada) + un único UPSERT masivo en una transacción.
+        Retorna: (True/False, mensaje, errores) donde errores es el reporte por fila:
+            [{'fila': nº de fila en Excel, 'id_contrato': ..., 'error': motivo}, ...]
         """
         try:
             df = pd.read_excel(filepath)
-            
-            # Validar columnas críticas
-            required_cols = ['id_contrato', 'ANIO_PROCESO', 'MES_PROCESO', 'SALARIO_DEVENGADO']
-            if not all(col in df.columns for col in required_cols):
-                return False, "El archivo no tiene el formato correcto (faltan columnas clave)."
+        except Exception as e:
+            return False, f"Error leyendo archivo: {e}", []
 
-            exito = 0
-            errores = 0
-            
-            for index, row in df.iterrows():
-                try:
-                    # Datos
-                    id_c = row['id_contrato']
-                    anio = row['ANIO_PROCESO']
-                    mes = row['MES_PROCESO']
-                    sal = row['SALARIO_DEVENGADO'] if pd.notnull(row['SALARIO_DEVENGADO']) else 0
-                    bon = row['BONIFICACIONES'] if pd.notnull(row['BONIFICACIONES']) else 0
-                    ben = row['BENEFICIOS_LABORALES'] if pd.notnull(row['BENEFICIOS_LABORALES']) else 0
-                    ded = row['DEDUCCIONES'] if pd.notnull(row['DEDUCCIONES']) else 0
-                    obs = row['OBSERVACIONES'] if pd.notnull(row['OBSERVACIONES']) else ""
-
-                    # Validación básica
-                    if pd.isna(id_c) or pd.isna(anio) or pd.isna(mes):
-                        continue # Saltar filas vacías
-
-                    # Lógica de UPSERT (Insertar o Actualizar)
-                    # Verificamos si existe
-                    if self.dao.exists_payroll(id_c, anio, mes):
-                        # Opción A: Actualizar (Recomendado para correcciones)
-                        # Necesitamos el id_nomina, lo buscamos rápido
-                        # (Podrías optimizar esto en el DAO, pero por ahora:)
-                        payroll_rows = self.dao.get_payrolls_by_contract(id_c, anio)
-                        # Filtramos en Python (ineficiente si son millones, ok para 500)
-                        target_row = next((r for r in payroll_rows if r[2] == mes), None) # r[2] es mes
-                        
-                        if target_row:
-                            self.dao.update_payroll_record(target_row[0], sal, bon, ben, ded, obs)
-                    else:
-                        # Insertar
-                        self.dao.insert_payroll_record(id_c, anio, mes, sal, bon, ben, ded, obs)
-                    
-                    exito += 1
-                except Exception as e:
-                    print(f"Error en fila {index}: {e}")
-                    errores += 1
-
-            return True, f"Proceso completado. Procesados: {exito}, Errores: {errores}"
+        # Validar columnas críticas
+        required_cols = ['id_contrato', 'ANIO_PROCESO', 'MES_PROCESO', 'SALARIO_DEVENGADO']
+        if not all(col in df.columns for col in required_cols):
+            return False, "El archivo no tiene el formato correcto (faltan columnas clave).", []
 
+        try:
+            rows, errores = self._validate_payroll_frame(df)
         except Exception as e:
-            return False, f"Error leyendo archivo: {e}"
\ No newline at end of file
+            return False, f"Error validando archivo: {e}", []
+
+        if rows:
+            ok, result = self.dao.bulk_upsert_payroll(rows)
+            if not ok:
+                return False, result, errores
+
+        msg = f"Proceso completado. Procesados: {len(rows)}, Errores: {len(errores)}"
+        if errores:
+            msg += "\n\n" + self.format_error_report(errores)
+        return True, msg, errores
+
+    def _validate_payroll_frame(self, df):
+        """
+        Valida la plantilla columna por columna (sin iterrows).
+        Retorna (filas listas para el UPSERT, reporte de errores por fila).
+        """
+        # Filas sin llaves (id_contrato, año, mes) son renglones vacíos: se saltan sin error
+        df = df.dropna(subset=['id_contrato', 'ANIO_PROCESO', 'MES_PROCESO'], how='all')
+        if df.empty:
+            return [], []
+
+        fila_excel = df.index.to_series() + 2 # +1 encabezado, +1 base 1
+        motivos = pd.Series("", index=df.index)
+
+        def marcar(mask, motivo):
+            motivos[mask] = motivos[mask] + motivo + "; "
+
+        # 1. Llaves: numéricas, enteras y en rango
+        llaves = {}
+        for col, nombre in (('id_contrato', 'id_contrato'), ('ANIO_PROCESO', 'año'), ('MES_PROCESO', 'mes')):
+            valores = pd.to_numeric(df[col], errors='coerce')
+            marcar(valores.isna() | (valores % 1 != 0), f"{nombre} vacío o no numérico")
+            llaves[col] = valores
+
+        marcar(llaves['MES_PROCESO'].notna() & ~llaves['MES_PROCESO'].between(1, 12), "mes fuera de rango (1-12)")
+        contratos = self.dao.get_existing_contract_ids()
+        marcar(llaves['id_contrato'].notna() & ~llaves['id_contrato'].isin(list(contratos)), "contrato inexistente")
+
+        # 2. Montos: vacío = 0 (como antes); texto no numérico = error
+        montos = {}
+        for col in ('SALARIO_DEVENGADO', 'BONIFICACIONES', 'BENEFICIOS_LABORALES', 'DEDUCCIONES'):
+            if col not in df.columns:
+                montos[col] = pd.Series(0.0, index=df.index)
+                continue
+            valores = pd.to_numeric(df[col], errors='coerce')
+            marcar(valores.isna() & df[col].notna(), f"{col} no numérico")
+            montos[col] = valores.fillna(0.0)
+
+        obs = df['OBSERVACIONES'] if 'OBSERVACIONES' in df.columns else pd.Series("", index=df.index)
+        obs = obs.where(obs.notna(), "").astype(str)
+
+        # 3. Separar válidas / con error
+        validas = motivos == ""
+        errores = [
+            {'fila': int(fila), 'id_contrato': id_c, 'error': motivo.rstrip("; ")}
+            for fila, id_c, motivo in zip(fila_excel[~validas], df.loc[~validas, 'id_contrato'], motivos[~validas])
+        ]
+
+        rows = list(zip(
+            llaves['id_contrato'][validas].astype(int).tolist(),
+            llaves['ANIO_PROCESO'][validas].astype(int).tolist(),
+            llaves['MES_PROCESO'][validas].astype(int).tolist(),
+            montos['SALARIO_DEVENGADO'][validas].astype(float).tolist(),
+            montos['BONIFICACIONES'][validas].astype(float).tolist(),
+            montos['BENEFICIOS_LABORALES'][validas].astype(float).tolist(),
+            montos['DEDUCCIONES'][validas].astype(float).tolist(),
+            obs[validas].tolist(),
+        ))
+        return rows, errores
+
+    @staticmethod
+    def format_error_report(errores, limite=10):
+        """Resumen legible del reporte de errores (primeras 'limite' filas)."""
+        def contrato(id_c):
+            if id_c is None or pd.isna(id_c):
+                return "sin contrato"
+            if isinstance(id_c, float) and id_c.is_integer():
+                id_c = int(id_c) # Pandas lee la columna como float si tiene vacíos
+            return f"contrato {id_c}"
+
+        lineas = [f"Fila {e['fila']} ({contrato(e['id_contrato'])}): {e['error']}" for e in errores[:limite]]
+        if len(errores) > limite:
+            lineas.append(f"... y {len(errores) - limite} filas más con errores.")
+        return "\n".join(lineas)
@@ -5,6 +5,22 @@ import sqlite3
 import re
 import numpy as np
 from config import settings
+from logics.vacation_rules import VacationRuleCache
+from logics.vacation_service import VacationService
+from logics.business_calendar import BusinessCalendar
+from logics.excel_writer import StreamingExcelWriter
+from logics.excel_reader import get_sheet_names, iter_sheets
+from models.kardex_dao import KardexDAO
+from models import search_index
+from models.catalogs_dao import CatalogCache
+from logics.data_events import DataEvents
+from graphlib import TopologicalSorter, CycleError
+
+# Restauración desde Excel: columnas de códigos que se leen como texto (preserva ceros a la izquierda)
+RESTORE_CODE_COLUMNS = ['dni', 'codigo', 'dni_perc', 'codigo_up', 'codigo_interno']
+RESTORE_TEXT_COLUMNS = {col: str for col in RESTORE_CODE_COLUMNS + ['Identificación']} # Por si importas reportes exportados
+# Tablas derivadas: no se exportan ni se cargan desde Excel; se recalculan tras restaurar
+DERIVED_TABLES = {'kardex_saldos', 'kardex_cierres_mensuales'}
 
 class PercExportService:
     def __init__(self):
@@ -63,13 +79,8 @@ class PercExportService:
             df['Categoría de Empleado'] = df['Categoría de Empleado'].astype(str).str.zfill(5)
 
             # 4. Exportar
-            with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False, sheet_name='Empleado')
-                
-                worksheet = writer.sheets['Empleado']
-                for column_cells in worksheet.columns:
-                    length = max(len(str(cell.value)) for cell in column_cells)
-                    worksheet.column_dimensions[column_cells[0].column_letter].width = length + 2
+            with StreamingExcelWriter(filepath) as writer:
+                writer.write_dataframe(df, 'Empleado')
 
             return True, f"Reporte generado exitosamente en:\n{filepath}"
 
@@ -82,6 +93,8 @@ class PercExportService:
     def generate_programacion_horas_perc_excel(self, year, month, filepath, input_path, dias_feriado=0, cant_horas_diarias=8):
         """
         Procesa el archivo de programación de horas.
+        Los feriados salen del catálogo (cat_feriados); dias_feriado solo agrega días
+        no laborables adicionales que no estén registrados allí.
         """
         try:
             # 1. Importar el archivo cargado por el usuario
@@ -94,11 +107,8 @@ class PercExportService:
 
             # --- Función interna de cálculo ---
             def obtener_horas_programadas(anio, mes, feriados, horas_dia):
-                num_dias = calendar.monthrange(int(anio), int(mes))[1]
-                dias_laborales = 0
-                for dia in range(1, num_dias + 1):
-                    if calendar.weekday(int(anio), int(mes), dia) < 5: # Lunes a Viernes
-                        dias_laborales += 1
+                # Calendario laboral precalculado (Lunes a Viernes, sin feriados del catálogo): O(1)
+                dias_laborales = BusinessCalendar.get(int(anio)).dias_laborables_mes(int(mes))
                 return (dias_laborales - int(feriados)) * int(horas_dia)
 
             horas_totales = obtener_horas_programadas(year, month, dias_feriado, cant_horas_diarias)
@@ -132,13 +142,8 @@ class PercExportService:
             ).reset_index()
 
             # 4. Exportar
-            with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-                df_pivot[df_pivot['Empleado'].notna()].to_excel(writer, index=False, sheet_name='Programación Hora')
-                
-                worksheet = writer.sheets['Programación Hora']
-                for column_cells in worksheet.columns:
-                    length = max(len(str(cell.value)) for cell in column_cells)
-                    worksheet.column_dimensions[column_cells[0].column_letter].width = length + 2
+            with StreamingExcelWriter(filepath) as writer:
+                writer.write_dataframe(df_pivot[df_pivot['Empleado'].notna()], 'Programación Hora')
 
             return True, f"Reporte procesado y guardado en:\n{filepath}"
 
@@ -154,7 +159,9 @@ class PercExportService:
         if not db_path.exists():
             return False, f"No se encontró la base de datos en: {db_path}"
 
-        conn = sqlite3.connect(db_path)
+        conn = self.db.get_connection()
+        if not conn:
+            return False, "No hay conexión a base de datos."
 
         try:
             # 1. Obtener lista de tablas
@@ -164,19 +171,12 @@ class PercExportService:
             if tables.empty:
                 return False, "La base de datos está vacía (no tiene tablas)."
 
-            # 2. Escribir Excel
-            with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
+            # 2. Escribir Excel (cada tabla va del cursor al archivo sin cargarse completa en memoria)
+            with StreamingExcelWriter(output_path) as writer:
                 for table_name in tables["name"]:
-                    df = pd.read_sql(f"SELECT * FROM {table_name}", conn)
-                    sheet_name = table_name[:31]
-                    df.to_excel(writer, sheet_name=sheet_name, index=False)
-                    
-                    # Ajuste ancho columnas
-                    worksheet = writer.sheets[sheet_name]
-                    for column_cells in worksheet.columns:
-                        length = max(len(str(cell.value)) for cell in column_cells)
-                        if length > 0:
-                            worksheet.column_dimensions[column_cells[0].column_letter].width = length + 2
+                    if table_name in DERIVED_TABLES or search_index.is_index_table(table_name):
+                        continue
+                    writer.write_query(conn, f"SELECT * FROM {table_name}", table_name)
 
             return True, f"Base de datos exportada correctamente en:\n{output_path}"
 
@@ -192,87 +192,111 @@ class PercExportService:
     def import_database_from_excel(self, input_path):
             """
             Restaura la BD aplicando limpieza, validación de esquema y manejo de columnas generadas.
-            Incluye verificación final de integridad referencial.
+            Motor de carga masiva:
+            - Limpieza vectorizada (operaciones de columna de pandas, sin lambdas por celda).
+            - Hojas parseadas en paralelo (logics.excel_reader) e insertadas a medida que terminan.
+            - executemany preparado por tabla (las hojas se envían en orden de dependencias).
+            - Índices secundarios eliminados antes de la carga y reconstruidos una sola vez al final.
+            - Triggers de las tablas cargadas apagados durante la carga; las tablas derivadas
+              (DERIVED_TABLES) se recalculan una vez al final.
+            - foreign_key_check solo sobre las tablas tocadas (y las que las referencian).
+            Todo en una transacción: si algo falla, la BD queda como estaba.
             """
             conn = self.db.get_connection()
             if not conn: return False, "Sin conexión a BD."
 
             try:
-                # 1. Leer Excel completo con Conversión de Tipos
+                # 1. Hojas del libro (sin parsear todavía las celdas)
                 try:
-                    # Diccionario de seguridad para preservar ceros a la izquierda
-                    text_cols = {
-                        'dni': str,
-                        'codigo': str,
-                        'dni_perc': str,
-                        'codigo_up': str,       # Unidades de producción
-                        'codigo_interno': str,  # Departamentos
-                        'Identificación': str   # Por si importas reportes exportados
-                    }
-                    
-                    # converters=text_cols fuerza a Pandas a leer esas columas como Texto puro
-                    xls_dict = pd.read_excel(input_path, sheet_name=None, converters=text_cols)
+                    sheet_names = get_sheet_names(input_path)
                 except Exception as e:
                     return False, f"No se pudo leer el archivo Excel: {e}"
 
                 cursor = conn.cursor()
+
+                # Obtener tablas que REALMENTE existen en la BD (Target)
+                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
+                # (sin el índice de búsqueda FTS: es derivado y se reconstruye al final)
+                db_tables = [row[0] for row in cursor.fetchall() if not search_index.is_index_table(row[0])]
+
+                # Tabla destino -> hoja de origen, y orden de dependencias (padres primero)
+                sheet_by_table = {}
+                for sheet_name in sheet_names:
+                    if sheet_name.strip() in db_tables and sheet_name.strip() not in DERIVED_TABLES:
+                        sheet_by_table[sheet_name.strip()] = sheet_name
+                if not sheet_by_table:
+                    return False, "El Excel no contiene ninguna hoja que coincida con las tablas del sistema."
+                load_order = self._dependency_order(cursor, list(sheet_by_table))
                 
                 # 2. Configuración para Inserción Masiva
                 cursor.execute("PRAGMA foreign_keys = OFF") # Apagamos validación temporalmente
                 cursor.execute("BEGIN TRANSACTION")         # Iniciamos bloque atómico
 
-                # Obtener tablas que REALMENTE existen en la BD (Target)
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
-                db_tables = [row[0] for row in cursor.fetchall()]
+                # 3. Índices secundarios fuera durante la carga (se reconstruyen una vez al final)
+                dropped_indexes = self._drop_secondary_indexes(cursor, load_order)
+                # Igual con los triggers (p. ej. saldos de kardex): una fila derivada por fila cargada
+                # no tiene sentido si al final se recalcula todo de una vez
+                dropped_triggers = self._drop_triggers(cursor, load_order)
+
+                # C. Wipe: hijos antes que padres
+                for table_name in reversed(load_order):
+                    cursor.execute(f"DELETE FROM {table_name}")
 
                 tables_processed = 0
                 logs = []
+                touched = []
 
-                for sheet_name, df in xls_dict.items():
+                # Las hojas se parsean en paralelo (libros grandes) y cada una se inserta apenas
+                # está lista, dentro de esta única transacción (un solo escritor)
+                sheets = iter_sheets(input_path, [sheet_by_table[t] for t in load_order], RESTORE_TEXT_COLUMNS)
+                for sheet_name, df in sheets:
                     table_name = sheet_name.strip()
 
-                    if table_name in db_tables:
-                        # A. Limpieza de Datos (Quitar espacios, formatear fechas, NaN -> None)
-                        df = self._clean_dataframe(df)
-
-                        # B. Análisis de Columnas
-                        # Obtenemos las columnas válidas de la tabla destino (sin generadas)
-                        valid_columns = self._get_writable_columns(cursor, table_name)
-                        
-                        # Intersección: Solo columnas que existen en Excel Y en BD
-                        cols_to_import = [c for c in df.columns if c in valid_columns]
-                        
-                        if not cols_to_import:
-                            logs.append(f"⚠ {table_name}: Se omitió (sin columnas coincidentes).")
-                            continue
-
-                        # Filtramos el DF final
-                        df_final = df[cols_to_import]
-
-                        # C. Wipe & Load (Borrar y Cargar)
-                        cursor.execute(f"DELETE FROM {table_name}")
-                        
-                        # Insertar (usamos chunksize para prevenir errores de memoria)
-                        df_final.to_sql(table_name, conn, if_exists='append', index=False, chunksize=500)
-                        
-                        tables_processed += 1
-                        logs.append(f"✅ {table_name}: {len(df_final)} registros importados.")
-
-                # 3. Validación preliminar
+                    # A. Limpieza de Datos (Quitar espacios, formatear fechas, NaN -> None)
+                    df = self._clean_dataframe(df)
+
+                    # B. Análisis de Columnas
+                    # Obtenemos las columnas válidas de la tabla destino (sin generadas)
+                    valid_columns = self._get_writable_columns(cursor, table_name)
+                    
+                    # Intersección: Solo columnas que existen en Excel Y en BD
+                    cols_to_import = [c for c in df.columns if c in valid_columns]
+                    
+                    if not cols_to_import:
+                        logs.append(f"⚠ {table_name}: Se omitió (sin columnas coincidentes).")
+                        continue
+
+                    # D. Load: un executemany preparado por tabla
+                    total = self._bulk_insert(cursor, table_name, df[cols_to_import])
+                    
+                    tables_processed += 1
+                    touched.append(table_name)
+                    logs.append(f"✅ {table_name}: {total} registros importados.")
+
+                # 4. Validación preliminar
                 if tables_processed == 0:
                     conn.rollback()
                     return False, "El Excel no contiene ninguna hoja que coincida con las tablas del sistema."
 
+                # Reconstrucción de índices (un solo ordenamiento por índice en vez de uno por fila)
+                for index_sql in dropped_indexes:
+                    cursor.execute(index_sql)
+                for trigger_sql in dropped_triggers:
+                    cursor.execute(trigger_sql)
+
+                # Tablas derivadas del kardex restaurado (los cierres mensuales los regenera el devengo)
+                KardexDAO.rebuild_balances(cursor)
+                KardexDAO.reset_month_snapshots(cursor)
+                search_index.rebuild(cursor) # Índice de búsqueda de empleados/contratos
+
+                # Las marcas de agua de devengos son derivadas del kardex restaurado: se recalculan
+                VacationService.reset_accrual_watermarks(cursor)
+
                 # ------------------------------------------------------------------
-                # 4. VERIFICACIÓN DE INTEGRIDAD REFERENCIAL (CRÍTICO)
+                # 5. VERIFICACIÓN DE INTEGRIDAD REFERENCIAL (CRÍTICO)
                 # ------------------------------------------------------------------
-                # Antes de hacer COMMIT, reactivamos las llaves foráneas y buscamos huérfanos.
-                
-                cursor.execute("PRAGMA foreign_keys = ON")
-                
-                # foreign_key_check revisa toda la BD buscando violaciones
-                cursor.execute("PRAGMA foreign_key_check")
-                integrity_errors = cursor.fetchall()
+                # Antes de hacer COMMIT buscamos huérfanos, solo donde la carga pudo crearlos
+                integrity_errors = self._check_foreign_keys(cursor, touched, db_tables)
 
                 if integrity_errors:
                     # Si hay errores, construimos un reporte y cancelamos todo.
@@ -292,18 +316,24 @@ class PercExportService:
                     # Lanzamos excepción manual para activar el rollback en el bloque except
                     raise Exception(error_msg)
 
-                # 5. Finalización Exitosa
+                # 6. Finalización Exitosa
                 conn.commit() # ¡Solo guardamos si pasó la prueba de integridad!
+                cursor.execute("PRAGMA foreign_keys = ON")
+                VacationRuleCache.invalidate() # Las reglas pudieron venir en el respaldo
+                BusinessCalendar.invalidate()  # Igual que feriados y jornadas
+                CatalogCache.invalidate()      # Y todos los catálogos de las pantallas
+                DataEvents.notify()            # Todas las pantallas abiertas muestran datos viejos
                 
-                # Mantenimiento
-                try: cursor.execute("VACUUM") 
-                except: pass
+                # Mantenimiento liviano: estadísticas para el planificador tras la carga masiva
+                # (VACUUM reescribía el archivo completo en cada restauración)
+                try: cursor.execute("PRAGMA optimize")
+                except sqlite3.Error: pass
 
                 return True, "Restauración completada y verificada con éxito.\n\nDetalle:\n" + "\n".join(logs)
 
             except Exception as e:
                 if conn:
-                    conn.rollback() # Revertimos cualquier cambio a la BD
+                    conn.rollback() # Revertimos cualquier cambio a la BD (incluye los índices)
                     try: conn.execute("PRAGMA foreign_keys = ON") # Restauramos seguridad
                     except: pass
                 return False, f"Error CRÍTICO durante la restauración:\n{str(e)}"
@@ -315,38 +345,109 @@ class PercExportService:
     # --------------------------------------------------------------------------
 
     def _clean_dataframe(self, df):
-        """Aplica limpieza estándar a todo el DataFrame antes de insertar"""
+        """Aplica limpieza estándar a todo el DataFrame antes de insertar (operaciones por columna)"""
 
         # 0. Lista de columnas forzadas a String (Limpieza profunda)
-        target_string_cols = ['dni', 'codigo', 'dni_perc', 'codigo_up', 'codigo_interno']
-        
-        for col in target_string_cols:
+        for col in RESTORE_CODE_COLUMNS:
             if col in df.columns:
-                # Asegurar string
-                df[col] = df[col].astype(str)
-                # Si Pandas leyó "nan" (texto) donde había nulos, lo corregimos
-                df[col] = df[col].replace({'nan': None, 'None': None, '<NA>': None})
+                nulos = df[col].isna()
+                # Asegurar string sin espacios (los nulos se marcan aparte)
+                texto = df[col].where(~nulos, "").astype(str).str.strip()
                 # Eliminar decimales fantasmas (ej: "0801.0" -> "0801")
-                df[col] = df[col].apply(lambda x: x.split('.')[0] if x and '.' in x else x)
+                texto = texto.str.split('.', n=1).str[0]
+                # Si Pandas leyó "nan" (texto) donde había nulos, lo corregimos
+                nulos |= texto.isin(['nan', 'None', '<NA>'])
+                df[col] = texto.where(~nulos, None)
 
-        # 1. Quitar espacios en strings
-        df_obj = df.select_dtypes(['object'])
-        if not df_obj.empty:
-            df[df_obj.columns] = df_obj.apply(lambda x: x.str.strip() if x.dtype == "object" else x)
+        # 1. Quitar espacios en strings (los valores que no son texto se conservan)
+        for col in df.select_dtypes(['object', 'string']).columns:
+            try:
+                limpio = df[col].str.strip()
+            except AttributeError:
+                continue # Columna object sin textos (p. ej. solo nulos)
+            df[col] = limpio.where(limpio.notna(), df[col])
 
-        # 2. Manejo de Nulos: Reemplazar NaN de numpy por None (para que sea NULL en SQLite)
-        df = df.replace({np.nan: None})
-        
-        # 3. Limpieza de Fechas Genérica
+        # 2. Limpieza de Fechas Genérica
         for col in df.columns:
-            if 'fecha' in col.lower() or 'date' in col.lower():
+            if 'fecha' in str(col).lower() or 'date' in str(col).lower():
                 try:
                     # Convertir a datetime y luego a string ISO (YYYY-MM-DD)
                     df[col] = pd.to_datetime(df[col], errors='coerce').dt.strftime('%Y-%m-%d')
-                    df[col] = df[col].replace({np.nan: None})
-                except:
-                    pass 
-        return df
+                except (ValueError, TypeError):
+                    pass
+
+        # 3. Manejo de Nulos: NaN/NaT -> None (para que sea NULL en SQLite).
+        # astype(object) además convierte los escalares numpy a int/float de Python (bindables).
+        return df.astype(object).where(df.notna(), None)
+
+    def _bulk_insert(self, cursor, table_name, df):
+        """INSERT preparado + executemany con las filas del DataFrame ya limpio. Retorna filas insertadas."""
+        cols = list(df.columns)
+        col_sql = ", ".join(f'"{c}"' for c in cols)
+        placeholders = ", ".join("?" for _ in cols)
+        cursor.executemany(
+            f'INSERT INTO "{table_name}" ({col_sql}) VALUES ({placeholders})',
+            df.itertuples(index=False, name=None)
+        )
+        return len(df)
+
+    def _dependency_order(self, cursor, tables):
+        """Ordena las tablas para que los padres (referenciados por FK) se carguen antes que los hijos."""
+        graph = {}
+        for table in tables:
+            cursor.execute(f"PRAGMA foreign_key_list({table})")
+            graph[table] = {row[2] for row in cursor.fetchall() if row[2] in tables and row[2] != table}
+        try:
+            return list(TopologicalSorter(graph).static_order())
+        except CycleError:
+            return list(tables) # Ciclo de FKs: con las FK apagadas el orden original también sirve
+
+    def _drop_secondary_indexes(self, cursor, tables):
+        """Elimina los índices explícitos de las tablas a cargar; retorna su DDL para recrearlos."""
+        if not tables:
+            return []
+        marks = ", ".join("?" for _ in tables)
+        # sql IS NULL = índices automáticos de PRIMARY KEY/UNIQUE (no se pueden eliminar)
+        cursor.execute(f"""
+            SELECT name, sql FROM sqlite_master
+            WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({marks})
+        """, tables)
+        indexes = cursor.fetchall()
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX "{name}"')
+        return [sql for _, sql in indexes]
+
+    def _drop_triggers(self, cursor, tables):
+        """Elimina los triggers de las tablas a cargar; retorna su DDL para recrearlos."""
+        if not tables:
+            return []
+        marks = ", ".join("?" for _ in tables)
+        cursor.execute(f"""
+            SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name IN ({marks})
+        """, tables)
+        triggers = cursor.fetchall()
+        for name, _ in triggers:
+            cursor.execute(f'DROP TRIGGER "{name}"')
+        return [sql for _, sql in triggers]
+
+    def _check_foreign_keys(self, cursor, touched, db_tables):
+        """
+        foreign_key_check solo donde la carga pudo romper referencias:
+        las tablas cargadas y las que apuntan a alguna de ellas.
+        """
+        to_check = set(touched)
+        for table in db_tables:
+            if table in to_check:
+                continue
+            cursor.execute(f"PRAGMA foreign_key_list({table})")
+            if any(row[2] in touched for row in cursor.fetchall()):
+                to_check.add(table)
+
+        errors = []
+        for table in sorted(to_check):
+            cursor.execute(f"PRAGMA foreign_key_check({table})")
+            errors.extend(cursor.fetchall())
+        return errors
 
     def _get_writable_columns(self, cursor, table_name):
         """
@@ -1,91 +1,112 @@
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+from config import settings
 from models.kardex_dao import KardexDAO
 from logics.vacation_service import VacationService
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Border, Side
-from openpyxl.utils import get_column_letter
+from logics import vacation_projection
+
+
+class _ParallelUnavailable(Exception):
+    """El pool de procesos no pudo arrancar o se rompió (no incluye errores al escribir el ZIP)."""
+
 
 class ReportService:
     def __init__(self):
         self.kardex_dao = KardexDAO()
         self.vac_service = VacationService()
 
-    def get_kardex_report_data(self, id_contrato, fecha_ini=None, fecha_fin=None):
+    def get_kardex_report_data(self, id_contrato, fecha_ini=None, fecha_fin=None, limit=None, offset=0):
         """
         Genera la estructura de datos completa para el reporte de Kardex.
         Agnóstico de la UI (sirve para Tkinter, Excel, PDF, JSON API).
+        Debe/haber/saldo corrido y totales los calcula SQLite (KardexDAO.get_kardex_statement).
+        limit/offset devuelven solo una página de movimientos (los totales son siempre del rango
+        completo); las proyecciones se agregan en la página que llega al final del historial.
         """
         response = {
             "saldo_anterior": 0.0,
             "movimientos": [], # Lista de dicts
-            "totales": {"debe": 0.0, "haber": 0.0, "saldo_final": 0.0}
+            "totales": {"debe": 0.0, "haber": 0.0, "saldo_final": 0.0},
+            "total_movimientos": 0, # Movimientos reales del rango (para paginar)
+            "total_proyecciones": 0, # Se listan solo en la última página, pero se cuentan siempre
+            "proyecciones": [] # Filas de proyección (con saldo) de cualquier página: la tabla paginada
+                               # las conserva y las siguientes páginas solo leen el libro
         }
 
         # 1. Procesar devengos automáticos hasta hoy (Write to BD)
-        try:
-            self.vac_service.process_monthly_accruals(id_contrato)
-        except Exception as e:
-            print(f"Error procesando devengos automáticos: {e}")
+        # Solo en la primera página: las siguientes leen lo que esta ya dejó al día
+        if not offset:
+            try:
+                self.vac_service.process_monthly_accruals(id_contrato)
+            except Exception as e:
+                print(f"Error procesando devengos automáticos: {e}")
 
-        # 2. Obtener datos históricos (Read from BD)
-        saldo_ant, raw_movs = self.kardex_dao.get_kardex_report(id_contrato, fecha_ini, fecha_fin)
+        # 2. Obtener datos históricos ya acumulados (Read from BD)
+        saldo_ant, filas, totales = self.kardex_dao.get_kardex_statement(id_contrato, fecha_ini, fecha_fin, limit, offset)
+        cantidad, total_debe, total_haber, current_balance = totales
         response["saldo_anterior"] = saldo_ant
-        
-        current_balance = saldo_ant
-        total_debe = 0.0
-        total_haber = 0.0
-
-        # 3. Procesar filas históricas
-        # raw_movs estructura: (id, fecha, tipo, obs, dias, f_ini_real, f_fin_real)
-        for m in raw_movs:
-            dias = m[4]
-            current_balance += dias
-            
-            # Formatear detalle
-            detalle = m[3]
-            if m[5] and m[6]:
-                detalle = f"{detalle} [Del {m[5]} al {m[6]}]"
-
-            # Clasificar Debe/Haber
-            debe = abs(dias) if dias < 0 else 0.0
-            haber = dias if dias > 0 else 0.0
-            
-            total_debe += debe
-            total_haber += haber
-
-            response["movimientos"].append({
-                "fecha": m[1],
-                "tipo": m[2],
+        response["total_movimientos"] = cantidad
+
+        # 3. Filas históricas: (id, fecha, tipo, detalle, debe, haber, saldo)
+        response["movimientos"] = [
+            {
+                "fecha": fecha,
+                "tipo": tipo,
                 "detalle": detalle,
                 "debe": debe,
                 "haber": haber,
-                "saldo": current_balance,
+                "saldo": saldo,
                 "es_proyeccion": False
+            }
+            for _, fecha, tipo, detalle, debe, haber, saldo in filas
+        ]
+
+        ultima_pagina = limit is None or offset + len(filas) >= cantidad
+
+        # 4. Proyecciones (Si hay fecha fin futura) y totales finales
+        proyecciones = self.vac_service.get_future_projections(id_contrato, fecha_fin) if fecha_fin else []
+        self._close_statement(response, proyecciones, total_debe, total_haber, current_balance,
+                              mostrar_proyecciones=ultima_pagina)
+        return response
+
+    @staticmethod
+    def _close_statement(response, proyecciones, total_debe, total_haber, saldo, mostrar_proyecciones=True):
+        """
+        Agrega las proyecciones al estado de cuenta y fija los totales.
+        Las proyecciones siempre cuentan en los totales y quedan en response["proyecciones"]; en
+        movimientos solo se listan si mostrar_proyecciones (en modo paginado, en la página que llega
+        al final del historial).
+        """
+        filas = []
+        for p in proyecciones:
+            dias = p['dias']
+            saldo += dias
+            total_haber += dias # Proyección siempre suma (es ganancia futura)
+            filas.append({
+                "fecha": p['fecha'],
+                "tipo": "PROYECCION",
+                "detalle": p['detalle'],
+                "debe": 0.0,
+                "haber": dias,
+                "saldo": saldo,
+                "es_proyeccion": True
             })
 
-        # 4. Procesar Proyecciones (Si hay fecha fin futura)
-        if fecha_fin:
-            proyecciones = self.vac_service.get_future_projections(id_contrato, fecha_fin)
-            for p in proyecciones:
-                dias = p['dias']
-                current_balance += dias
-                total_haber += dias # Proyección siempre suma (es ganancia futura)
-                
-                response["movimientos"].append({
-                    "fecha": p['fecha'],
-                    "tipo": "PROYECCION",
-                    "detalle": p['detalle'],
-                    "debe": 0.0,
-                    "haber": dias,
-                    "saldo": current_balance,
-                    "es_proyeccion": True
-                })
-
-        # 5. Totales Finales
+        response["proyecciones"] = filas
+        if mostrar_proyecciones:
+            response["movimientos"].extend(filas)
+
+        response["total_proyecciones"] = len(proyecciones)
         response["totales"]["debe"] = total_debe
         response["totales"]["haber"] = total_haber
-        response["totales"]["saldo_final"] = current_balance
-        
-        return response
+        response["totales"]["saldo_final"] = saldo
     
     def export_kardex_excel(self, id_contrato, f_ini, f_fin, filepath, employee_name="Kardex"):
         """
@@ -95,91 +116,216 @@ class ReportService:
             # 1. REUTILIZAR LA LÓGICA DE CÁLCULO
             # Usamos el mismo método que alimenta la vista para asegurar consistencia
             data = self.get_kardex_report_data(id_contrato, f_ini, f_fin)
-            
-            # 2. CREAR LIBRO Y HOJA
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            # ws.title = "Kardex Vacaciones"
-
-                        # --- LIMPIEZA DEL NOMBRE DE LA HOJA ---
-            # Quitamos caracteres prohibidos por Excel: [ ] : * ? / \
-            invalid_chars = ['[', ']', ':', '*', '?', '/', '\\']
-            clean_name = employee_name
-            for char in invalid_chars:
-                clean_name = clean_name.replace(char, '')
-            
-            # Excel limita el nombre de la hoja a 31 caracteres
-            ws.title = clean_name[:30] 
-            
-            # 3. ESTILOS
-            header_font = Font(bold=True, color="FFFFFF")
-            header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-            bold_font = Font(bold=True)
-            
-            # 4. ENCABEZADOS
-            headers = ["Fecha", "Tipo Movimiento", "Detalle / Observación", "Debe (Devengado)", "Haber (Ganado)", "Saldo"]
-            ws.append(headers)
-            
-            for col_num, header in enumerate(headers, 1):
-                cell = ws.cell(row=1, column=col_num)
-                cell.font = header_font
-                cell.fill = header_fill
-
-            # 5. FILA SALDO ANTERIOR (Si aplica)
-            if data["saldo_anterior"] != 0 or f_ini:
-                ws.append([
-                    f_ini if f_ini else "---",
-                    "SALDO ANTERIOR",
-                    "Arrastre de periodo previo",
-                    "",
-                    "",
-                    data['saldo_anterior']
-                ])
-                # Poner en negrita la fila del saldo anterior
-                for cell in ws[ws.max_row]:
-                    cell.font = bold_font
-
-            # 6. MOVIMIENTOS
-            for row in data["movimientos"]:
-                ws.append([
-                    row['fecha'],
-                    row['tipo'],
-                    row['detalle'],
-                    row['debe'] if row['debe'] > 0 else "",
-                    row['haber'] if row['haber'] > 0 else "",
-                    row['saldo']
-                ])
-                
-                # Si es proyección, quizás ponerlo en cursiva (opcional)
-                if row.get('es_proyeccion'):
-                    for cell in ws[ws.max_row]:
-                        cell.font = Font(italic=True, color="555555")
-
-            # 7. TOTALES
-            tot = data["totales"]
-            ws.append([
-                "", 
-                "TOTALES", 
-                "",
-                tot['debe'],
-                tot['haber'],
-                tot['saldo_final']
-            ])
-            # Estilo fila totales
-            last_row = ws.max_row
-            for col in range(1, 7):
-                cell = ws.cell(row=last_row, column=col)
-                cell.font = bold_font
-                cell.fill = PatternFill(start_color="DCE6F1", fill_type="solid")
-
-            # 8. AJUSTAR ANCHO DE COLUMNAS
-            column_widths = [12, 25, 40, 15, 15, 15]
-            for i, width in enumerate(column_widths, 1):
-                ws.column_dimensions[get_column_letter(i)].width = width
-
-            # 9. GUARDAR
-            wb.save(filepath)
+
+            # 2. LIBRO EN STREAMING (mismo formato de hoja que la exportación masiva)
+            # openpyxl se importa recién al exportar: la pantalla del kardex no lo necesita para consultar
+            from logics.excel_writer import StreamingExcelWriter
+            from logics.kardex_export import write_kardex_sheet
+            with StreamingExcelWriter(filepath) as writer:
+                write_kardex_sheet(writer, employee_name, data, f_ini)
+
             return True, "Reporte exportado correctamente."
 
         except Exception as e:
-            return False, f"Error al exportar Excel: {str(e)}"
\ No newline at end of file
+            return False, f"Error al exportar Excel: {str(e)}"
+
+    # --------------------------------------------------------------------------
+    # EXPORTACIÓN MASIVA (todos los contratos activos)
+    # --------------------------------------------------------------------------
+
+    def export_all_kardex(self, output_path, fecha_ini=None, fecha_fin=None, progress_callback=None):
+        """
+        Estados de kardex de TODOS los contratos activos (p. ej. cierre de año).
+        1. Devengos pendientes de todos los contratos en bloque (process_all_monthly_accruals).
+        2. Saldos de apertura y totales en una consulta agrupada; movimientos de todos los contratos
+           en UNA consulta ordenada (KardexDAO.iter_all_ledgers) consumida en streaming.
+        3. Según la extensión de output_path:
+           - .xlsx: un libro con una hoja por contrato (un único escritor en streaming).
+           - .zip: un libro por contrato, generados en un pool de procesos y agregados al ZIP
+             a medida que terminan.
+        progress_callback(actual, total, mensaje) se invoca desde el hilo que ejecuta la exportación.
+        Retorna: (True/False, mensaje)
+        """
+        output_path = Path(output_path)
+        as_zip = output_path.suffix.lower() == ".zip"
+
+        def report(actual, total, mensaje):
+            if progress_callback:
+                progress_callback(actual, total, mensaje)
+
+        report(0, 1, "Registrando devengos pendientes...")
+        ok, msg = self.vac_service.process_all_monthly_accruals()
+        if not ok:
+            return False, msg
+
+        report(0, 1, "Consultando saldos...")
+        contratos = self.kardex_dao.get_export_contracts(fecha_ini, fecha_fin)
+        if not contratos:
+            return False, "No hay contratos activos para exportar."
+
+        total = len(contratos)
+        statements = self._iter_kardex_statements(contratos, fecha_ini, fecha_fin)
+        tmp_path = output_path.with_name(output_path.name + ".tmp")
+        try:
+            if as_zip:
+                self._write_kardex_zip(tmp_path, statements, total, fecha_ini, report)
+            else:
+                self._write_kardex_workbook(tmp_path, statements, total, fecha_ini, report)
+            os.replace(tmp_path, output_path) # El archivo final aparece completo o no aparece
+        except Exception as e:
+            try: os.remove(tmp_path)
+            except OSError: pass
+            return False, f"Error exportando kardex masivo: {e}"
+
+        report(total, total, "Exportación completada.")
+        return True, f"Kardex de {total} contratos exportado en:\n{output_path}"
+
+    def _iter_kardex_statements(self, contratos, fecha_ini, fecha_fin):
+        """
+        Une la lista de contratos con la consulta única de movimientos (ambas ordenadas por contrato)
+        y genera (contrato, data) con la misma estructura que get_kardex_report_data.
+        """
+        hoy = date.today()
+        target = datetime.strptime(fecha_fin, '%Y-%m-%d').date() if fecha_fin else None
+        ledgers = groupby(self.kardex_dao.iter_all_ledgers(fecha_ini, fecha_fin), key=itemgetter(0))
+        actual = next(ledgers, None)
+
+        # Proyecciones de TODOS los contratos en una sola pasada vectorizada (sin bucle por mes)
+        fines, antiguedad, dias = vacation_projection.project_contracts(
+            [c[4] for c in contratos], target, hoy
+        ) if target and target > hoy else (None, None, None)
+
+        for i, contrato in enumerate(contratos):
+            id_contrato, fecha_inicio = contrato[0], contrato[4]
+            saldo_inicial, _, total_debe, total_haber, neto = contrato[5:10]
+
+            filas = []
+            while actual is not None and actual[0] < id_contrato:
+                actual = next(ledgers, None)
+            if actual is not None and actual[0] == id_contrato:
+                filas = list(actual[1])
+                actual = next(ledgers, None)
+
+            data = {
+                "saldo_anterior": saldo_inicial,
+                "movimientos": [
+                    {
+                        "fecha": fecha,
+                        "tipo": tipo,
+                        "detalle": detalle,
+                        "debe": debe,
+                        "haber": haber,
+                        "saldo": saldo_inicial + acumulado,
+                        "es_proyeccion": False
+                    }
+                    for _, _, fecha, tipo, detalle, debe, haber, acumulado in filas
+                ],
+                "totales": {"debe": 0.0, "haber": 0.0, "saldo_final": 0.0}
+            }
+
+            proyecciones = []
+            if fines is not None and fecha_inicio:
+                proyecciones = vacation_projection.projection_rows(fines, antiguedad[i], dias[i])
+            self._close_statement(data, proyecciones, total_debe, total_haber, saldo_inicial + neto)
+            yield contrato, data
+
+    def _write_kardex_workbook(self, path, statements, total, fecha_ini, report):
+        """Un libro, una hoja por contrato. Cada hoja se cierra al terminarla (sin temporales abiertos)."""
+        from logics.excel_writer import StreamingExcelWriter # Diferido (openpyxl)
+        from logics.kardex_export import write_kardex_sheet
+        usados = set()
+        paso = max(1, total // 100)
+        with StreamingExcelWriter(path) as writer:
+            for i, (contrato, data) in enumerate(statements, 1):
+                write_kardex_sheet(writer, self._kardex_sheet_title(contrato, usados), data, fecha_ini).close()
+                if i % paso == 0:
+                    report(i, total, f"Generando hoja {i} de {total}...")
+
+    def _write_kardex_zip(self, path, statements, total, fecha_ini, report):
+        """Un libro por contrato dentro de un ZIP; con muchos contratos se generan en paralelo."""
+        from logics.kardex_export import render_kardex_workbook # Diferido (openpyxl)
+        workers = self._export_worker_count(total)
+        escritos = 0
+
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            def guardar(nombre, contenido):
+                nonlocal escritos
+                zf.writestr(nombre, contenido)
+                escritos += 1
+                report(escritos, total, f"Generando archivo {escritos} de {total}...")
+
+            def args_de(contrato, data):
+                return (self._kardex_filename(contrato), self._kardex_sheet_title(contrato, set()), data, fecha_ini)
+
+            if workers > 1:
+                pendientes = {} # future -> argumentos (para rehacerlos en secuencia si el pool falla)
+                sin_enviar = None # Argumentos tomados del generador cuyo submit todavía no se registró
+                try:
+                    # spawn: seguro aunque el proceso tenga hilos vivos (Tk, pool de conexiones)
+                    ctx = multiprocessing.get_context("spawn")
+                    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+                        def recoger(listos):
+                            for future in listos:
+                                try:
+                                    resultado = future.result()
+                                except (BrokenProcessPool, OSError) as e:
+                                    raise _ParallelUnavailable(e) from e
+                                # Fuera de pendientes ANTES de escribir: un error de escritura se
+                                # propaga tal cual y nunca se reintenta esa entrada
+                                del pendientes[future]
+                                guardar(*resultado)
+
+                        for contrato, data in statements:
+                            sin_enviar = args_de(contrato, data)
+                            try:
+                                future = pool.submit(render_kardex_workbook, *sin_enviar)
+                            except (BrokenProcessPool, OSError) as e:
+                                raise _ParallelUnavailable(e) from e
+                            pendientes[future] = sin_enviar
+                            sin_enviar = None
+                            # Ventana acotada: no acumulamos en memoria más libros de los que se procesan
+                            if len(pendientes) >= workers * 4:
+                                listos, _ = wait(list(pendientes), return_when=FIRST_COMPLETED)
+                                recoger(listos)
+                        recoger(as_completed(list(pendientes)))
+                    return
+                except _ParallelUnavailable as e:
+                    print(f"Aviso: generación paralela no disponible ({e}); se continúa en secuencial.")
+                    for args in list(pendientes.values()):
+                        guardar(*render_kardex_workbook(*args))
+                    # Si falló el propio submit, ese contrato ya salió del generador: no se puede perder
+                    if sin_enviar is not None:
+                        guardar(*render_kardex_workbook(*sin_enviar))
+
+            for contrato, data in statements:
+                guardar(*render_kardex_workbook(*args_de(contrato, data)))
+
+    @staticmethod
+    def _export_worker_count(total):
+        workers = settings.KARDEX_EXPORT_WORKERS
+        if workers is None:
+            workers = min(4, os.cpu_count() or 1)
+        # Levantar procesos cuesta (cada hijo importa openpyxl): con pocos contratos no compensa
+        if total < settings.KARDEX_EXPORT_PARALLEL_MIN:
+            return 1
+        return max(1, min(int(workers), total))
+
+    @staticmethod
+    def _kardex_sheet_title(contrato, usados):
+        """'<código> <apellidos>' recortado a 31 caracteres y único dentro del libro."""
+        from logics.excel_writer import clean_sheet_title # Diferido (openpyxl)
+        id_contrato, codigo, apellidos = contrato[0], contrato[1] or "", contrato[2] or ""
+        title = clean_sheet_title(f"{codigo} {apellidos}".strip() or f"Contrato {id_contrato}")
+        if title in usados: # Mismo empleado con más de un contrato activo
+            sufijo = f" ({id_contrato})"
+            title = title[:31 - len(sufijo)] + sufijo
+        usados.add(title)
+        return title
+
+    @staticmethod
+    def _kardex_filename(contrato):
+        id_contrato, codigo, apellidos, nombres = contrato[:4]
+        nombre = f"{codigo or ''} {apellidos or ''} {nombres or ''}"
+        # Sin caracteres prohibidos en nombres de archivo (igual que la exportación individual)
+        safe_name = "".join(c for c in nombre if c.isalnum() or c in (' ', '-', '_')).strip()
+        return f"{safe_name} - Contrato {id_contrato}.xlsx"
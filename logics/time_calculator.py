@@ -1,44 +1,66 @@
-from datetime import datetime, timedelta
+from datetime import datetime
+import numpy as np
+from logics.business_calendar import BusinessCalendar, DEFAULT_WEEKMASK, normalize_weekmask
+
 
 class TimeCalculator:
-    
+
+    # Validación de máscaras de jornada (definida junto al calendario laboral)
+    normalize_weekmask = staticmethod(normalize_weekmask)
+
     @staticmethod
-    def calculate_duration(fecha_ini, fecha_fin, es_por_horas=False, hora_ini="00:00", hora_fin="00:00", jornada_horas=8):
+    def count_business_days_batch(fechas_ini, fechas_fin, weekmasks=None, usar_feriados=True):
+        """
+        Versión vectorizada para importaciones/reportes masivos (numpy.busday_count).
+        - fechas_ini / fechas_fin: secuencias de fechas ('YYYY-MM-DD', date o datetime64), fin inclusive.
+        - weekmasks: una máscara para todos, o una secuencia con la máscara de cada registro
+          (p. ej. la dias_laborables de la jornada de cada contrato).
+        - usar_feriados: descuenta las fechas de cat_feriados (igual que calculate_duration).
+        Retorna un np.ndarray de enteros; los rangos invertidos cuentan 0 (igual que calculate_duration).
+        """
+        starts = np.asarray(fechas_ini, dtype="datetime64[D]")
+        ends = np.asarray(fechas_fin, dtype="datetime64[D]") + np.timedelta64(1, "D") # busday_count excluye el fin
+        holidays = np.asarray(BusinessCalendar.get_feriados() if usar_feriados else [], dtype="datetime64[D]")
+
+        if weekmasks is None or isinstance(weekmasks, str):
+            counts = np.busday_count(starts, ends, weekmask=TimeCalculator.normalize_weekmask(weekmasks),
+                                     holidays=holidays)
+        else:
+            # Una llamada vectorizada por máscara distinta (en la práctica, pocas jornadas)
+            masks = np.asarray([TimeCalculator.normalize_weekmask(m) for m in weekmasks])
+            counts = np.zeros(starts.shape, dtype=np.int64)
+            for mask in np.unique(masks):
+                sel = masks == mask
+                counts[sel] = np.busday_count(starts[sel], ends[sel], weekmask=str(mask), holidays=holidays)
+
+        return np.maximum(counts, 0)
+
+    @staticmethod
+    def calculate_duration(fecha_ini, fecha_fin, es_por_horas=False, hora_ini="00:00", hora_fin="00:00", jornada_horas=8,
+                           weekmask=None):
         try:
-            # Caso 1: Por Días (Lógica mejorada: Excluir Sábados y Domingos )
+            # Caso 1: Por Días (Excluye feriados y los días no laborables de la jornada; por defecto Sábado y Domingo)
             if not es_por_horas:
                 start = datetime.strptime(fecha_ini, '%Y-%m-%d')
                 end = datetime.strptime(fecha_fin, '%Y-%m-%d')
-                
+
                 # Validación básica
                 if start > end: return 0.0
 
-                total_days = 0
-                current = start
-                
-                # Iteramos día por día para verificar reglas
-                while current <= end:
-                    # current.weekday(): 0=Lunes, 6=Domingo
-                    # REGLA DE NEGOCIO (Ejemplo): Si es Domingo (6), no cuenta.
-                    # TODO: Conectar esto con la configuración de la Jornada real del empleado.
-                    if current.weekday() < 5: 
-                        total_days += 1
-                    
-                    current += timedelta(days=1)
-                
-                return float(total_days)
-            
+                # Calendario precalculado por (año, jornada): conteo O(1) sin importar el largo del rango
+                return float(BusinessCalendar.count_business_days(start, end, weekmask))
+
             # Caso 2: Por Horas (Mantiene tu lógica actual, que es correcta para horas intra-día)
             else:
                 t_ini = datetime.strptime(hora_ini, '%H:%M')
                 t_fin = datetime.strptime(hora_fin, '%H:%M')
                 delta = t_fin - t_ini
                 horas_totales = delta.total_seconds() / 3600
-                
+
                 if jornada_horas > 0:
                     return round(horas_totales / jornada_horas, 2)
                 return 0.0
-                
+
         except Exception as e:
             print(f"Error calculando tiempo: {e}")
-            return 0.0
\ No newline at end of file
+            return 0.0
@@ -0,0 +1,129 @@
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+from config import settings
+from config.db_connection import DatabaseConnection
+from logics import vacation_projection
+from logics.excel_writer import StreamingExcelWriter
+from logics.vacation_service import VacationService
+
+# Columnas del reporte (en este orden se exporta a Excel)
+LIABILITY_COLUMNS = [
+    'Código', 'Empleado', 'Puesto', 'Departamento', 'Fecha Inicio', 'Fecha Fin',
+    'Salario', 'Devengado', 'Gozado', 'Saldo Kardex', 'Proyectado', 'Saldo Días',
+    'Salario Diario', 'Valor Pasivo'
+]
+
+
+class VacationLiabilityService:
+    """
+    Pasivo laboral por vacaciones de todo el personal a una fecha de corte.
+    Sin recorrer contratos uno por uno: el saldo sale de UNA consulta agrupada sobre
+    kardex_vacaciones y, si el corte es futuro, los devengos pendientes de la proyección
+    vectorizada (logics/vacation_projection.py). Antes de leer deja al día el cierre mensual
+    (VacationService.process_all_monthly_accruals, incremental): la proyección arranca en hoy,
+    así que los meses ya cerrados sin devengo registrado no se contarían en ningún lado.
+    """
+
+    def __init__(self):
+        self.db = DatabaseConnection()
+        self.vac_service = VacationService()
+
+    def get_liability(self, fecha_corte=None, hoy=None):
+        """
+        DataFrame con una fila por contrato activo que inició labores antes del corte.
+        Saldo Días = movimientos ORDINARIA hasta el corte + devengos proyectados entre hoy y el corte.
+        Valor Pasivo = Saldo Días * salario / settings.VACATION_DAILY_SALARY_DIVISOR.
+        Primero corre el cierre mensual pendiente; si falla lanza ValueError con su mensaje.
+        """
+        hoy = hoy or date.today()
+        corte = datetime.strptime(fecha_corte, '%Y-%m-%d').date() if fecha_corte else hoy
+        corte_str = corte.strftime('%Y-%m-%d')
+
+        # Devengos de meses ya cerrados (hasta hoy): sin ellos el pasivo sale subestimado
+        ok, msg = self.vac_service.process_all_monthly_accruals(fecha_corte=hoy)
+        if not ok:
+            raise ValueError(msg)
+
+        conn = self.db.get_connection()
+        try:
+            df = pd.read_sql_query("""
+                WITH saldos AS (
+                    SELECT id_contrato,
+                           SUM(CASE WHEN dias > 0 THEN dias ELSE 0.0 END) AS devengado,
+                           SUM(CASE WHEN dias < 0 THEN -dias ELSE 0.0 END) AS gozado
+                    FROM kardex_vacaciones
+                    WHERE (cuenta_tipo = 'ORDINARIA' OR cuenta_tipo IS NULL)
+                    AND fecha_movimiento < date(:corte, '+1 day')
+                    GROUP BY id_contrato
+                )
+                SELECT c.id_contrato, e.codigo, e.apellidos || ' ' || e.nombres AS empleado,
+                       p.nombre_puesto AS puesto, d.nombre AS departamento,
+                       c.fecha_inicio, c.fecha_fin,
+                       COALESCE(c.salario, 0.0) AS salario,
+                       COALESCE(s.devengado, 0.0) AS devengado,
+                       COALESCE(s.gozado, 0.0) AS gozado
+                FROM contratos c
+                JOIN empleados e ON e.id_empleado = c.id_empleado
+                LEFT JOIN cat_puestos p ON p.id_puesto = c.id_puesto
+                LEFT JOIN cat_departamentos d ON d.id_departamento = c.id_departamento
+                LEFT JOIN saldos s ON s.id_contrato = c.id_contrato
+                WHERE c.activo = 1
+                AND (c.fecha_inicio IS NULL OR c.fecha_inicio <= :corte)
+                ORDER BY e.apellidos, e.nombres, c.id_contrato
+            """, conn, params={"corte": corte_str})
+        finally:
+            conn.close()
+
+        df['saldo_kardex'] = df['devengado'] - df['gozado']
+        df['proyectado'] = self._projected_days(df, corte, hoy)
+        df['saldo_dias'] = df['saldo_kardex'] + df['proyectado']
+        df['salario_diario'] = df['salario'] / settings.VACATION_DAILY_SALARY_DIVISOR
+        df['valor'] = (df['saldo_dias'] * df['salario_diario']).round(2)
+        return df
+
+    @staticmethod
+    def _projected_days(df, corte, hoy):
+        """
+        Días que se devengarán entre hoy y el corte, todos los contratos a la vez
+        (misma proyección que la pantalla de saldos), sin pasar del fin de contrato.
+        """
+        if corte <= hoy or df.empty:
+            return 0.0
+
+        fines, _, dias = vacation_projection.project_contracts(df['fecha_inicio'].tolist(), corte, hoy)
+
+        fin_contrato = vacation_projection.to_datetime64(df['fecha_fin'].tolist())
+        vigente = np.isnat(fin_contrato)[:, None] | (fines[None, :] <= fin_contrato[:, None])
+        return np.where(vigente, dias, 0.0).sum(axis=1)
+
+    def export_liability_excel(self, filepath, fecha_corte=None):
+        """Reporte de pasivo en Excel (streaming): detalle por contrato + fila de totales."""
+        try:
+            df = self.get_liability(fecha_corte)
+            if df.empty:
+                return False, "No hay contratos activos a la fecha de corte."
+
+            reporte = df[[
+                'codigo', 'empleado', 'puesto', 'departamento', 'fecha_inicio', 'fecha_fin',
+                'salario', 'devengado', 'gozado', 'saldo_kardex', 'proyectado', 'saldo_dias',
+                'salario_diario', 'valor'
+            ]].round({'devengado': 2, 'gozado': 2, 'saldo_kardex': 2, 'proyectado': 2,
+                      'saldo_dias': 2, 'salario_diario': 2})
+            reporte.columns = LIABILITY_COLUMNS
+
+            with StreamingExcelWriter(filepath) as writer:
+                sheet = writer.write_dataframe(reporte, f"Pasivo {fecha_corte or date.today()}")
+                sheet.append([
+                    "", "TOTALES", "", "", "", "", "",
+                    round(df['devengado'].sum(), 2), round(df['gozado'].sum(), 2),
+                    round(df['saldo_kardex'].sum(), 2), round(df['proyectado'].sum(), 2),
+                    round(df['saldo_dias'].sum(), 2), "", round(df['valor'].sum(), 2)
+                ])
+
+            return True, (
+                f"Pasivo de {len(df)} contratos: {df['saldo_dias'].sum():,.2f} días "
+                f"(L. {df['valor'].sum():,.2f}).\nArchivo: {filepath}"
+            )
+        except Exception as e:
+            return False, f"Error generando pasivo de vacaciones: {str(e)}"
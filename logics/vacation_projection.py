@@ -0,0 +1,108 @@
+from datetime import date
+import numpy as np
+from logics.vacation_rules import VacationRuleCache
+
+# Motor de proyección vectorizado (sin BD): devengos futuros de uno o muchos contratos a la vez.
+# Equivale a recorrer mes a mes con relativedelta + VacationRuleCache.get_dias_anuales, pero
+# como operaciones de arreglos: fechas de cierre con numpy, antigüedad en forma cerrada y
+# días por mes tomados del vector de reglas en una sola indexación.
+
+
+def month_ends_between(hoy, target_date):
+    """Cierres de mes M con hoy < M <= target_date, como np.ndarray datetime64[D] (vacío si no hay)."""
+    hoy = np.datetime64(hoy, 'D')
+    target = np.datetime64(target_date, 'D')
+    if target <= hoy:
+        return np.array([], dtype='datetime64[D]')
+    meses = np.arange(hoy.astype('datetime64[M]'), target.astype('datetime64[M]') + 1)
+    fines = (meses + 1).astype('datetime64[D]') - 1 # Primer día del mes siguiente - 1
+    return fines[(fines > hoy) & (fines <= target)]
+
+
+def to_datetime64(fechas):
+    """Secuencia de fechas ('YYYY-MM-DD', date, None...) -> datetime64[D]; lo inválido queda NaT."""
+    import pandas as pd # Diferido: este módulo se carga con VacationService al arrancar, pandas no
+    # str(...)[:10] normaliza date/datetime/'YYYY-MM-DD HH:MM:SS' al formato de la BD
+    textos = pd.Series([str(f)[:10] if f else None for f in fechas], dtype=object)
+    parsed = pd.to_datetime(textos, format='%Y-%m-%d', errors='coerce')
+    return parsed.to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+
+
+def completed_years(inicios, fines):
+    """
+    Años de antigüedad (relativedelta(fin, inicio).years) en forma cerrada.
+    inicios: (n,) datetime64[D]; fines: (m,) datetime64[D]  ->  (n, m) enteros.
+    Sigue el mismo algoritmo que relativedelta: meses de diferencia, ajustados si el día del
+    aniversario (recortado al largo del mes, p. ej. 29/02 -> 28/02) aún no llega; trunca hacia cero.
+    """
+    yi, mi, di = (a[:, None] for a in _split(inicios))
+    yf, mf, df, largo_mes = (a[None, :] for a in _split(fines, con_largo=True))
+
+    meses = (yf - yi) * 12 + (mf - mi)
+    dia_aniversario = np.minimum(di, largo_mes)
+    hacia_adelante = fines[None, :] >= inicios[:, None]
+    meses = meses - (hacia_adelante & (df < dia_aniversario)) + (~hacia_adelante & (df > dia_aniversario))
+    return np.sign(meses) * (np.abs(meses) // 12)
+
+
+def monthly_days(anios_en_curso):
+    """Días a devengar por mes para cada año de antigüedad en curso (1 = primer año), vectorizado."""
+    vector, fallback = VacationRuleCache.get_array()
+    anios = np.asarray(anios_en_curso)
+    dentro = (anios >= 0) & (anios < len(vector))
+    if len(vector):
+        anuales = np.where(dentro, vector[np.clip(anios, 0, len(vector) - 1)], fallback)
+    else:
+        anuales = np.full(anios.shape, fallback, dtype=float)
+    return anuales / 12.0
+
+
+def project_contracts(fechas_inicio, target_date, hoy=None):
+    """
+    Proyección de muchos contratos a la vez (p. ej. "saldo al día X" de todo el personal).
+    fechas_inicio: inicio de labores de cada contrato (None/inválida -> sin proyección).
+    Retorna (fines, antiguedad, dias):
+        fines      (m,)   cierres de mes futuros hasta target_date
+        antiguedad (n, m) años cumplidos a cada cierre
+        dias       (n, m) días que devengaría cada contrato en cada cierre (0 sin fecha de inicio)
+    """
+    hoy = hoy or date.today()
+    fines = month_ends_between(hoy, target_date)
+    inicios = to_datetime64(fechas_inicio)
+    n = len(inicios)
+    if n == 0 or len(fines) == 0:
+        return fines, np.zeros((n, len(fines)), dtype=int), np.zeros((n, len(fines)), dtype=float)
+
+    validos = ~np.isnat(inicios)
+    antiguedad = np.zeros((n, len(fines)), dtype=int)
+    antiguedad[validos] = completed_years(inicios[validos], fines)
+    dias = np.where(validos[:, None], monthly_days(antiguedad + 1), 0.0)
+    return fines, antiguedad, dias
+
+
+def projection_rows(fines, antiguedad, dias):
+    """Filas de UN contrato en el formato de VacationService.get_future_projections."""
+    etiquetas = np.datetime_as_string(fines, unit='D').tolist() # str nativo, como el resto del estado de cuenta
+    return [
+        {
+            'fecha': fecha,
+            'tipo': 'PROYECCION', # Etiqueta especial
+            'detalle': f"Proyección a {fecha[:7]} (Antigüedad: {int(anios)}a)",
+            'dias': float(d),
+            'es_virtual': True
+        }
+        for fecha, anios, d in zip(etiquetas, antiguedad, dias)
+    ]
+
+
+def _split(fechas, con_largo=False):
+    """datetime64[D] -> (año, mes, día[, días del mes]) como arreglos de enteros."""
+    meses = fechas.astype('datetime64[M]')
+    inicio_mes = meses.astype('datetime64[D]')
+    anio = fechas.astype('datetime64[Y]').astype(np.int64) + 1970
+    mes = meses.astype(np.int64) % 12 + 1
+    dia = (fechas - inicio_mes).astype(np.int64) + 1
+    if not con_largo:
+        return anio, mes, dia
+    largo = ((meses + 1).astype('datetime64[D]') - inicio_mes).astype(np.int64)
+    return anio, mes, dia, largo
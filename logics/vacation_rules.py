@@ -0,0 +1,91 @@
+import threading
+import numpy as np
+from config.db_connection import DatabaseConnection
+
+# Días por año si la tabla de reglas está vacía (fallback de seguridad histórico)
+DEFAULT_DIAS_ANUALES = 15.0
+
+
+class VacationRuleCache:
+    """
+    Caché en memoria de cat_reglas_vacaciones, compartida por todo el proceso.
+    Se carga una sola vez en un vector denso indexado por año de antigüedad:
+        dias[anio] -> días a otorgar  (O(1), sin consultas por mes simulado)
+    Los huecos y los años mayores al máximo configurado usan la regla del año más alto,
+    igual que el fallback 'ORDER BY anios_antiguedad DESC LIMIT 1' original.
+    CatalogsDAO.crud_regla_vacacion llama a invalidate() después de cada escritura.
+    """
+    _lock = threading.Lock()
+    _dias_por_anio = None
+    _array = None # Mismo vector como np.ndarray (proyecciones vectorizadas)
+    _fallback = DEFAULT_DIAS_ANUALES
+    _version = 0
+
+    @classmethod
+    def get_dias_anuales(cls, anio_antiguedad):
+        """Días anuales que corresponden al año de antigüedad en curso (1 = primer año)."""
+        dias_por_anio, fallback = cls.get_vector()
+        if 0 <= anio_antiguedad < len(dias_por_anio):
+            return dias_por_anio[anio_antiguedad]
+        return fallback
+
+    @classmethod
+    def get_vector(cls):
+        """Retorna (vector denso por año, valor para años fuera del vector)."""
+        dias_por_anio = cls._dias_por_anio
+        if dias_por_anio is None:
+            with cls._lock:
+                if cls._dias_por_anio is None:
+                    cls._load()
+                dias_por_anio = cls._dias_por_anio
+        return dias_por_anio, cls._fallback
+
+    @classmethod
+    def get_array(cls):
+        """Igual que get_vector pero como np.ndarray de float (se arma una vez por carga)."""
+        with cls._lock:
+            if cls._dias_por_anio is None:
+                cls._load()
+            return cls._array, cls._fallback
+
+    @classmethod
+    def invalidate(cls):
+        """Descarta la caché; la próxima lectura recarga desde la BD."""
+        with cls._lock:
+            cls._dias_por_anio = None
+            cls._array = None
+            cls._version += 1
+
+    @classmethod
+    def version(cls):
+        return cls._version
+
+    @classmethod
+    def _load(cls):
+        conn = DatabaseConnection().get_connection()
+        try:
+            cursor = conn.cursor()
+            # Orden por id: ante años duplicados gana la regla más antigua (como el SELECT original)
+            cursor.execute("""
+                SELECT anios_antiguedad, dias_otorgar
+                FROM cat_reglas_vacaciones
+                WHERE anios_antiguedad IS NOT NULL
+                ORDER BY id_regla
+            """)
+            reglas = {}
+            for anios, dias in cursor.fetchall():
+                reglas.setdefault(int(anios), dias)
+        finally:
+            conn.close()
+
+        if not reglas:
+            cls._fallback = DEFAULT_DIAS_ANUALES
+            cls._array = np.zeros(0, dtype=float)
+            cls._dias_por_anio = []
+            return
+
+        anio_maximo = max(reglas)
+        cls._fallback = reglas[anio_maximo]
+        dias_por_anio = [reglas.get(anio, cls._fallback) for anio in range(0, anio_maximo + 1)]
+        cls._array = np.asarray(dias_por_anio, dtype=float)
+        cls._dias_por_anio = dias_por_anio # Último: get_vector lo usa como señal de "cargado"
@@ -3,6 +3,10 @@ import sqlite3
 from datetime import datetime, date, timedelta
 from dateutil.relativedelta import relativedelta
 from config.db_connection import DatabaseConnection
+from logics.data_events import DataEvents
+from logics.vacation_rules import VacationRuleCache
+from logics import vacation_projection
+from models.kardex_dao import KardexDAO
 
 
 class VacationService:
@@ -12,13 +16,20 @@ class VacationService:
     def process_monthly_accruals(self, id_contrato):
         """
         Calcula y guarda en BD solo hasta el mes cerrado ANTERIOR o ACTUAL (nunca futuro).
+        Es incremental: retoma desde la marca de agua del contrato (kardex_devengo_control),
+        así una segunda llamada en el mismo mes no recorre ni consulta el historial.
         """
         conn = self.db.get_connection()
         cursor = conn.cursor()
         
         try:
-            # 1. Datos del contrato
-            cursor.execute("SELECT fecha_inicio, fecha_inicio_kardex FROM contratos WHERE id_contrato = ?", (id_contrato,))
+            # 1. Datos del contrato + marca de agua (último cierre ya procesado)
+            cursor.execute("""
+                SELECT c.fecha_inicio, c.fecha_inicio_kardex, w.devengado_hasta, w.fecha_inicio_kardex
+                FROM contratos c
+                LEFT JOIN kardex_devengo_control w ON w.id_contrato = c.id_contrato
+                WHERE c.id_contrato = ?
+            """, (id_contrato,))
             row = cursor.fetchone()
             if not row or not row[1]: return 
             
@@ -27,7 +38,12 @@ class VacationService:
             
             hoy = date.today()
             current_date = fecha_inicio_proceso
-            
+
+            # La marca solo vale si se calculó con el mismo inicio de kardex
+            if row[2] and row[3] == row[1]:
+                current_date = datetime.strptime(row[2], '%Y-%m-%d').date() + timedelta(days=1)
+
+            ultimo_cierre = None
             while True:
                 # Calcular fin de mes
                 next_month = current_date.replace(day=28) + timedelta(days=4)
@@ -44,10 +60,22 @@ class VacationService:
 
                 # Insertar en BD si no existe
                 self._process_single_month(cursor, id_contrato, fecha_inicio_labores, last_day_of_month)
+                ultimo_cierre = last_day_of_month
                 
                 current_date = last_day_of_month + timedelta(days=1)
-            
+
+            # Cierres mensuales de saldo (también los invalidados por correcciones con fecha pasada)
+            cierres = KardexDAO.save_month_snapshots(cursor, self.last_closed_month_end(hoy), id_contrato)
+
+            # Sin meses nuevos no hay devengos que escribir (caso normal al reabrir una pantalla)
+            if ultimo_cierre is None:
+                if cierres:
+                    conn.commit()
+                return
+
+            self._save_accrual_watermark(cursor, id_contrato, ultimo_cierre.strftime('%Y-%m-%d'), row[1])
             conn.commit()
+            DataEvents.notify('kardex')
             
         except Exception as e:
             print(f"Error VacationService: {e}")
@@ -55,6 +83,161 @@ class VacationService:
         finally:
             conn.close()
 
+    @staticmethod
+    def reset_accrual_watermarks(cursor, id_contrato=None):
+        """
+        Borra la marca de agua de un contrato (o de todos si id_contrato es None) para que el
+        próximo cálculo recorra de nuevo desde fecha_inicio_kardex.
+        Se ejecuta con el cursor del llamador: queda dentro de SU transacción.
+        """
+        if id_contrato is None:
+            cursor.execute("DELETE FROM kardex_devengo_control")
+        else:
+            cursor.execute("DELETE FROM kardex_devengo_control WHERE id_contrato = ?", (id_contrato,))
+
+    @staticmethod
+    def _save_accrual_watermark(cursor, id_contrato, devengado_hasta, fecha_inicio_kardex):
+        cursor.execute("""
+            INSERT INTO kardex_devengo_control (id_contrato, devengado_hasta, fecha_inicio_kardex)
+            VALUES (?, ?, ?)
+            ON CONFLICT(id_contrato) DO UPDATE SET
+                devengado_hasta = excluded.devengado_hasta,
+                fecha_inicio_kardex = excluded.fecha_inicio_kardex
+        """, (id_contrato, devengado_hasta, fecha_inicio_kardex))
+
+    def process_all_monthly_accruals(self, progress_callback=None, fecha_corte=None):
+        """
+        MODO MASIVO (cierre de mes): genera las ACUMULACION_MENSUAL faltantes de TODOS
+        los contratos activos en una sola transacción.
+        - Un único anti-join (CTE recursivo de meses vs. kardex) encuentra los periodos faltantes.
+        - Las reglas salen de la caché en memoria (VacationRuleCache).
+        - Un solo executemany inserta todo.
+        progress_callback(actual, total, mensaje) se invoca desde el hilo que ejecuta el job.
+        Retorna: (True/False, mensaje)
+        """
+        hoy = fecha_corte or date.today()
+        hoy_str = hoy.strftime('%Y-%m-%d')
+
+        def report(actual, total, mensaje):
+            if progress_callback:
+                progress_callback(actual, total, mensaje)
+
+        conn = self.db.get_connection()
+        if not conn:
+            return False, "Sin conexión a BD."
+
+        try:
+            cursor = conn.cursor()
+
+            # 1. Periodos cerrados sin acumulación registrada (todos los contratos a la vez)
+            report(0, 1, "Buscando periodos pendientes...")
+            cursor.execute("""
+                WITH RECURSIVE meses(id_contrato, fecha_inicio, fecha_cierre) AS (
+                    -- Ancla: mes siguiente a la marca de agua si sigue vigente; si no, el inicio del kardex
+                    SELECT c.id_contrato, c.fecha_inicio,
+                           CASE WHEN w.fecha_inicio_kardex = c.fecha_inicio_kardex
+                                THEN date(w.devengado_hasta, '+1 day', '+1 month', '-1 day')
+                                ELSE date(c.fecha_inicio_kardex, 'start of month', '+1 month', '-1 day')
+                           END
+                    FROM contratos c
+                    LEFT JOIN kardex_devengo_control w ON w.id_contrato = c.id_contrato
+                    WHERE c.activo = 1
+                    AND c.fecha_inicio IS NOT NULL
+                    AND c.fecha_inicio_kardex IS NOT NULL
+                    UNION ALL
+                    SELECT id_contrato, fecha_inicio,
+                           date(fecha_cierre, '+1 day', '+1 month', '-1 day')
+                    FROM meses
+                    WHERE date(fecha_cierre, '+1 day', '+1 month', '-1 day') <= :hoy
+                )
+                SELECT m.id_contrato, m.fecha_inicio, m.fecha_cierre
+                FROM meses m
+                WHERE m.fecha_cierre <= :hoy
+                AND NOT EXISTS (
+                    SELECT 1 FROM kardex_vacaciones k
+                    WHERE k.id_contrato = m.id_contrato
+                    AND k.tipo_movimiento = 'ACUMULACION_MENSUAL'
+                    AND k.fecha_movimiento >= date(m.fecha_cierre, 'start of month')
+                    AND k.fecha_movimiento < date(m.fecha_cierre, '+1 day')
+                )
+                ORDER BY m.id_contrato, m.fecha_cierre
+            """, {"hoy": hoy_str})
+            pendientes = cursor.fetchall()
+
+            total = len(pendientes)
+            if total == 0:
+                self._save_all_accrual_watermarks(cursor, hoy)
+                KardexDAO.save_month_snapshots(cursor, self.last_closed_month_end(hoy))
+                conn.commit()
+                DataEvents.notify('kardex')
+                report(1, 1, "Sin periodos pendientes.")
+                return True, "Todos los contratos activos ya tienen sus acumulaciones al día."
+
+            # 2. Calcular las filas en memoria
+            filas = []
+            paso = max(1, total // 100) # Reportamos ~100 veces como máximo
+            for i, (id_contrato, f_inicio, f_cierre) in enumerate(pendientes, 1):
+                fecha_inicio_labores = datetime.strptime(f_inicio[:10], '%Y-%m-%d').date()
+                fecha_cierre = datetime.strptime(f_cierre, '%Y-%m-%d').date()
+
+                anio_en_curso = relativedelta(fecha_cierre, fecha_inicio_labores).years + 1
+                dias_anuales = VacationRuleCache.get_dias_anuales(anio_en_curso)
+                dias_mensuales = round(dias_anuales / 12.0, 4)
+
+                periodo = f_cierre[:7]
+                obs = f"Acumulación {periodo} (Año: {anio_en_curso}, Escala: {dias_anuales} días/año)"
+                filas.append((id_contrato, f_cierre, dias_mensuales, obs))
+
+                if i % paso == 0:
+                    report(i, total, f"Calculando {i} de {total} periodos...")
+
+            # 3. Inserción masiva en una sola transacción
+            report(total, total, "Guardando en base de datos...")
+            cursor.executemany("""
+                INSERT INTO kardex_vacaciones
+                (id_contrato, fecha_movimiento, tipo_movimiento, dias, observacion, cuenta_tipo)
+                VALUES (?, ?, 'ACUMULACION_MENSUAL', ?, ?, 'ORDINARIA')
+            """, filas)
+            self._save_all_accrual_watermarks(cursor, hoy)
+            KardexDAO.save_month_snapshots(cursor, self.last_closed_month_end(hoy))
+            conn.commit()
+            DataEvents.notify('kardex')
+
+            contratos = len({f[0] for f in filas})
+            return True, f"Cierre completado: {total} acumulaciones registradas en {contratos} contratos."
+
+        except Exception as e:
+            conn.rollback()
+            print(f"Error VacationService (masivo): {e}")
+            return False, f"Error procesando acumulaciones masivas: {e}"
+        finally:
+            conn.close()
+
+    @staticmethod
+    def last_closed_month_end(hoy=None):
+        """Último fin de mes ya cerrado a la fecha (el propio hoy si es fin de mes)."""
+        hoy = hoy or date.today()
+        fin_mes = hoy.replace(day=28) + timedelta(days=4)
+        fin_mes -= timedelta(days=fin_mes.day)
+        return fin_mes if fin_mes <= hoy else hoy.replace(day=1) - timedelta(days=1)
+
+    @staticmethod
+    def _save_all_accrual_watermarks(cursor, hoy):
+        """Tras el cierre masivo, todos los contratos activos quedan devengados hasta el último mes cerrado."""
+        ultimo_cierre = VacationService.last_closed_month_end(hoy)
+        cursor.execute("""
+            INSERT INTO kardex_devengo_control (id_contrato, devengado_hasta, fecha_inicio_kardex)
+            SELECT id_contrato, :cierre, fecha_inicio_kardex
+            FROM contratos
+            WHERE activo = 1
+            AND fecha_inicio IS NOT NULL
+            AND fecha_inicio_kardex IS NOT NULL
+            AND date(fecha_inicio_kardex, 'start of month', '+1 month', '-1 day') <= :cierre
+            ON CONFLICT(id_contrato) DO UPDATE SET
+                devengado_hasta = excluded.devengado_hasta,
+                fecha_inicio_kardex = excluded.fecha_inicio_kardex
+        """, {"cierre": ultimo_cierre.strftime('%Y-%m-%d')})
+
     def get_future_projections(self, id_contrato, target_date_str):
         """
         Calcula en MEMORIA (sin guardar en BD) las acumulaciones futuras.
@@ -68,7 +251,6 @@ class VacationService:
         # Si la fecha filtro es hoy o pasado, no hay proyección
         if target_date <= hoy: return []
 
-        proyecciones = []
         conn = self.db.get_connection()
         cursor = conn.cursor()
         
@@ -78,72 +260,35 @@ class VacationService:
             row = cursor.fetchone()
             if not row: return []
             fecha_inicio_labores = datetime.strptime(row[0], '%Y-%m-%d').date()
-
-            # Empezamos la proyección desde el primer mes futuro
-            # Lógica rápida: Primer día del mes siguiente a hoy
-            # (Asumiendo que process_monthly_accruals ya corrió hasta hoy)
-            mes_actual = hoy.replace(day=28) + timedelta(days=4)
-            fin_mes_actual = mes_actual - timedelta(days=mes_actual.day)
-            
-            # Si hoy es 17/12, el fin de mes es 31/12. Si 31/12 > 17/12 (True),
-            # entonces el cierre de Diciembre es "Futuro". Empezamos a proyectar este mismo mes.
-            # Si hoy fuera 31/12, Diciembre ya se guardó en BD. Proyectamos desde Enero.
-            
-            start_date = hoy
-            
-            current_date = start_date
-            
-            while True:
-                # Calcular siguiente cierre de mes
-                next_month = current_date.replace(day=28) + timedelta(days=4)
-                last_day_of_month = next_month - timedelta(days=next_month.day)
-                
-                # Si nos pasamos de la fecha filtro seleccionada por el usuario, paramos
-                if last_day_of_month > target_date:
-                    break
-                
-                # Solo proyectamos fechas futuras a hoy
-                if last_day_of_month > hoy:
-                    # Cálculos Matemáticos (Idénticos al real)
-                    antiguedad = relativedelta(last_day_of_month, fecha_inicio_labores)
-                    anio_corriente = antiguedad.years + 1
-                    
-                    # Buscar Regla (Reutilizamos lógica o consulta rápida)
-                    # Nota: Para optimizar, podrías cachear las reglas, aquí hacemos query simple
-                    cursor.execute("SELECT dias_otorgar FROM cat_reglas_vacaciones WHERE anios_antiguedad = ?", (anio_corriente,))
-                    res = cursor.fetchone()
-                    if not res:
-                         cursor.execute("SELECT dias_otorgar FROM cat_reglas_vacaciones ORDER BY anios_antiguedad DESC LIMIT 1")
-                         res = cursor.fetchone()
-                    
-                    dias_anuales = res[0] if res else 15
-                    dias_mensuales = dias_anuales / 12.0
-                    
-                    # Estructura Virtual (Simula lo que viene de BD)
-                    proyecciones.append({
-                        'fecha': last_day_of_month.strftime('%Y-%m-%d'),
-                        'tipo': 'PROYECCION', # Etiqueta especial
-                        'detalle': f"Proyección a {last_day_of_month.strftime('%Y-%m')} (Antigüedad: {antiguedad.years}a)",
-                        'dias': dias_mensuales,
-                        'es_virtual': True
-                    })
-
-                current_date = last_day_of_month + timedelta(days=1)
-                
         finally:
             conn.close()
             
-        return proyecciones
+        return self.project_months(fecha_inicio_labores, target_date, hoy)
+
+    @staticmethod
+    def project_months(fecha_inicio_labores, target_date, hoy=None):
+        """
+        Proyección pura (sin BD) de los cierres de mes entre hoy y target_date para un contrato
+        que inició labores en fecha_inicio_labores. La usan la pantalla y la exportación masiva.
+        """
+        hoy = hoy or date.today()
+        # Motor vectorizado: cierres de mes en (hoy, target_date], antigüedad en forma cerrada
+        # y días por mes del vector de reglas cacheado (sin bucle por mes ni consultas).
+        fines, antiguedad, dias = vacation_projection.project_contracts([fecha_inicio_labores], target_date, hoy)
+        return vacation_projection.projection_rows(fines, antiguedad[0], dias[0])
 
     def _process_single_month(self, cursor, id_contrato, fecha_inicio_labores, fecha_cierre):
             periodo = fecha_cierre.strftime('%Y-%m')
             
             # 1. Evitar duplicados
+            # Rango de fechas en lugar de strftime() para que SQLite use el índice (contrato, tipo, fecha)
+            inicio_mes = fecha_cierre.replace(day=1).strftime('%Y-%m-%d')
+            dia_siguiente = (fecha_cierre + timedelta(days=1)).strftime('%Y-%m-%d')
             cursor.execute("""
                 SELECT id_movimiento FROM kardex_vacaciones
                 WHERE id_contrato = ? AND tipo_movimiento = 'ACUMULACION_MENSUAL'
-                AND strftime('%Y-%m', fecha_movimiento) = ?
-            """, (id_contrato, periodo))
+                AND fecha_movimiento >= ? AND fecha_movimiento < ?
+            """, (id_contrato, inicio_mes, dia_siguiente))
             if cursor.fetchone(): return
 
             # 2. Calcular antigüedad al momento de ese mes
@@ -152,20 +297,10 @@ class VacationService:
             # (Ej: si tiene 0 años cumplidos, está en su 1er año)
             anio_en_curso = antiguedad.years + 1
 
-            # 3. BUSCAR REGLA DINÁMICA
-            cursor.execute("""
-                SELECT dias_otorgar FROM cat_reglas_vacaciones 
-                WHERE anios_antiguedad = ?
-            """, (anio_en_curso,))
-            res = cursor.fetchone()
-            
-            if not res:
-                # Si no hay regla exacta (ej: tiene 10 años y la tabla llega a 4), 
-                # tomamos la regla del año más alto disponible.
-                cursor.execute("SELECT dias_otorgar FROM cat_reglas_vacaciones ORDER BY anios_antiguedad DESC LIMIT 1")
-                res = cursor.fetchone()
-                
-            dias_anuales = res[0] if res else 15.0 # Fallback de seguridad
+            # 3. BUSCAR REGLA DINÁMICA (caché en memoria)
+            # Si no hay regla exacta (ej: tiene 10 años y la tabla llega a 4),
+            # la caché devuelve la regla del año más alto disponible (o 15 si no hay reglas).
+            dias_anuales = VacationRuleCache.get_dias_anuales(anio_en_curso)
             dias_mensuales = round(dias_anuales / 12.0, 4) # Guardamos con 4 decimales para precisión
             
             obs = f"Acumulación {periodo} (Año: {anio_en_curso}, Escala: {dias_anuales} días/año)"
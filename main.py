@@ -1,10 +1,23 @@
+import sys
+from config.startup_timing import StartupTimer
+
+# python main.py --startup-timing: desglose del arranque en consola (antes de importar lo demás,
+# para que cuenten las importaciones). En los procesos hijos (__mp_main__) no se mide.
+startup_timer = StartupTimer.from_argv(sys.argv) if __name__ == "__main__" else StartupTimer(enabled=False)
+
+import multiprocessing
 import ttkbootstrap as ttk
 from config.db_connection import DatabaseConnection
+from config.migrations import MigrationRunner
 from views.main_window import MainWindow
+from views.task_executor import TaskExecutor
 from config import settings 
 
 class App(ttk.Window):
-    def __init__(self):
+    def __init__(self, startup_timer=None):
+        self.startup_timer = startup_timer or StartupTimer(enabled=False)
+        self.startup_timer.phase("Importaciones")
+
         # Configuración inicial de la ventana
         # Themes claros recomendados: 'flatly', 'litera', 'yeti'
         # Themes oscuros recomendados: 'darkly', 'superhero'
@@ -20,6 +33,7 @@ class App(ttk.Window):
             self.iconbitmap(settings.ICON_PATH)
         else:
             print(f"⚠ No se encontró el icono en: {settings.ICON_PATH}")
+        self.startup_timer.phase("Ventana y tema")
 
 
         # 1. Validar Base de Datos al inicio
@@ -27,14 +41,40 @@ class App(ttk.Window):
         if not self.db.test_connection():
             print("⚠ ADVERTENCIA: No se pudo conectar a la base de datos.")
             # Aquí podrías lanzar un popup de error antes de cerrar
+        else:
+            # 1.1 Aplicar migraciones de esquema pendientes (índices, tablas nuevas)
+            ok, msg, _ = MigrationRunner().run()
+            if not ok:
+                print(f"⚠ ADVERTENCIA: {msg}")
+        self.startup_timer.phase("Conexión y migraciones")
         
         # 2. Inicializar Vista Principal
         # Pasamos 'self' como controller temporalmente
         self.main_window = MainWindow(self, controller=self)
+        self.startup_timer.phase("Vista principal")
+
+        # 3. Cierre limpio del pool de conexiones al cerrar la ventana
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        if self.startup_timer.enabled:
+            self.after_idle(self._report_startup)
+
+    def _report_startup(self):
+        """Primer ciclo ocioso del mainloop: la ventana ya está dibujada."""
+        self.startup_timer.phase("Primer dibujado")
+        self.startup_timer.stop()
+        print(self.startup_timer.report(top=settings.STARTUP_TIMING_TOP))
+
+    def on_close(self):
+        TaskExecutor.shutdown()
+        DatabaseConnection.close_all()
+        self.destroy()
         
     def run(self):
         self.mainloop()
 
 if __name__ == "__main__":
-    app = App()
-    app.run()
\ No newline at end of file
+    # Requerido por el pool de procesos de la restauración al empaquetar como .exe
+    multiprocessing.freeze_support()
+    app = App(startup_timer)
+    app.run()
@@ -1,7 +1,20 @@
 from config.db_connection import DatabaseConnection
+from logics.data_events import DataEvents
 from logics.time_calculator import TimeCalculator
+from models.kardex_dao import KardexDAO
+from models.catalogs_dao import CatalogsDAO
+from models.paging import order_clause, page_params
 
 class AttendanceDAO:
+    # Columnas del historial de AttendanceView -> expresión SQL (lista blanca para ORDER BY)
+    HISTORY_SORT_COLUMNS = {
+        'id': 'i.id_inasistencia',
+        'ini': 'i.fecha_inicio_real',
+        'fin': 'i.fecha_fin_real',
+        'tipo': 'ti.nombre_tipo',
+        'puesto': 'p.nombre_puesto',
+    }
+
     def __init__(self):
         self.db = DatabaseConnection()
 
@@ -23,7 +36,23 @@ class AttendanceDAO:
         conn.close()
         return rows
 
-    def get_history_by_employee(self, id_empleado):
+    def get_contract_weekmask(self, id_contrato):
+        """Días laborables (máscara L-D) de la jornada del contrato; None si no tiene jornada."""
+        conn = self.db.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT j.dias_laborables FROM contratos c
+                JOIN cat_jornadas j ON c.id_jornada = j.id_jornada
+                WHERE c.id_contrato = ?
+            """, (id_contrato,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+        finally:
+            conn.close()
+
+    def get_history_by_employee(self, id_empleado, limit=None, offset=0, order_by=None, descending=False):
+            """Inasistencias del empleado (todas o una página ordenada para la tabla virtual)."""
             conn = self.db.get_connection()
             cursor = conn.cursor()
             query = """
@@ -39,13 +68,31 @@ class AttendanceDAO:
                 JOIN cat_tipos_inasistencia ti ON i.id_tipo = ti.id_tipo
                 JOIN cat_puestos p ON c.id_puesto = p.id_puesto
                 WHERE c.id_empleado = ?
-                ORDER BY i.fecha_inicio_real DESC
-            """
-            cursor.execute(query, (id_empleado,))
+                ORDER BY {order}
+                LIMIT ? OFFSET ?
+            """.format(order=order_clause(self.HISTORY_SORT_COLUMNS, order_by, descending,
+                                         "i.fecha_inicio_real DESC", "i.id_inasistencia DESC"))
+            cursor.execute(query, (id_empleado,) + page_params(limit, offset))
             rows = cursor.fetchall()
             conn.close()
             return rows
 
+    def count_history_by_employee(self, id_empleado):
+        conn = self.db.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT COUNT(*)
+                FROM inasistencias i
+                JOIN contratos c ON i.id_contrato = c.id_contrato
+                JOIN cat_tipos_inasistencia ti ON i.id_tipo = ti.id_tipo
+                JOIN cat_puestos p ON c.id_puesto = p.id_puesto
+                WHERE c.id_empleado = ?
+            """, (id_empleado,))
+            return cursor.fetchone()[0]
+        finally:
+            conn.close()
+
     def insert_kardex_manual(self, id_contrato, tipo, dias, obs):
         conn = self.db.get_connection()
         try:
@@ -56,6 +103,7 @@ class AttendanceDAO:
                 VALUES (?, CURRENT_DATE, ?, ?, ?)
             """, (id_contrato, tipo, dias, obs))
             conn.commit()
+            DataEvents.notify('kardex')
             return True, "Movimiento registrado."
         except Exception as e:
             return False, str(e)
@@ -64,34 +112,16 @@ class AttendanceDAO:
 
     def get_tipos_inasistencia_combo(self):
         """
-        ### CORRECCIÓN: Eliminado JOIN con cat_categorias_inasistencia.
-        Solo consulta la tabla cat_tipos_inasistencia.
-        """
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        # Como no hay categorías, mostramos solo el nombre del tipo
-        query = """
-            SELECT t.id_tipo, t.nombre_tipo, t.cuenta_afectada
-            FROM cat_tipos_inasistencia t
-            ORDER BY t.nombre_tipo
+        (id_tipo, nombre_tipo, cuenta_afectada) de cat_tipos_inasistencia.
+        Viene de la caché de catálogos (se invalida en CatalogsDAO.crud_tipo_inasistencia).
         """
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        conn.close()
-        return rows
-    
+        return CatalogsDAO().get_tipos_inasistencia_combo()
+
     def get_kardex_balance(self, id_contrato):
+        # Saldo materializado en kardex_saldos (mantenido por triggers): sin SUM sobre el historial
         conn = self.db.get_connection()
         cursor = conn.cursor()
-        query = """
-            SELECT COALESCE(SUM(dias), 0.0) 
-            FROM kardex_vacaciones 
-            WHERE id_contrato = ? 
-            AND (cuenta_tipo = 'ORDINARIA' OR cuenta_tipo IS NULL)
-        """
-        cursor.execute(query, (id_contrato,))
-        saldo = cursor.fetchone()[0]
+        saldo = KardexDAO.get_balance(cursor, id_contrato)
         conn.close()
         return round(saldo, 2)
 
@@ -100,18 +130,19 @@ class AttendanceDAO:
         try:
             cursor = conn.cursor()
             
-            # 1. Obtener jornada
+            # 1. Obtener jornada (horas y días laborables)
             cursor.execute("""
-                SELECT j.horas_diarias FROM contratos c 
+                SELECT j.horas_diarias, j.dias_laborables FROM contratos c 
                 JOIN cat_jornadas j ON c.id_jornada = j.id_jornada 
                 WHERE c.id_contrato = ?
             """, (id_con,))
             res_jornada = cursor.fetchone()
             horas_jornada = res_jornada[0] if res_jornada else 8
+            dias_laborables = res_jornada[1] if res_jornada else None
             
             # 2. CÁLCULO DE DÍAS
             dias_calculados = TimeCalculator.calculate_duration(
-                f_ini, f_fin, es_horas, h_ini, h_fin, horas_jornada
+                f_ini, f_fin, es_horas, h_ini, h_fin, horas_jornada, weekmask=dias_laborables
             )
 
             # Usar manual si existe
@@ -155,6 +186,7 @@ class AttendanceDAO:
                 cursor.execute(query_kardex, (id_con, dias_kardex, id_inasistencia, obs))
 
             conn.commit()
+            DataEvents.notify('inasistencias', 'kardex')
             return True, "Registro guardado y saldo actualizado."
         except Exception as e:
             conn.rollback()
@@ -170,6 +202,7 @@ class AttendanceDAO:
             cursor.execute("DELETE FROM kardex_vacaciones WHERE id_referencia = ? AND tipo_movimiento = 'GOCE'", (id_inasistencia,))
             cursor.execute("DELETE FROM inasistencias WHERE id_inasistencia = ?", (id_inasistencia,))
             conn.commit()
+            DataEvents.notify('inasistencias', 'kardex')
             return True, "Registro eliminado y saldo restaurado."
         except Exception as e:
             conn.rollback()
@@ -1,12 +1,107 @@
 import sqlite3
+import threading
+from datetime import datetime
 from config.db_connection import DatabaseConnection
+from logics.data_events import DataEvents
+from logics.vacation_rules import VacationRuleCache
+from logics.vacation_service import VacationService
+from logics.time_calculator import TimeCalculator, DEFAULT_WEEKMASK
+from logics.business_calendar import BusinessCalendar
+
+
+class CatalogMap:
+    """Índices de un catálogo de filas (id, nombre, ...): búsquedas O(1) en vez de next(x for x in ...)."""
+    __slots__ = ('rows', 'by_id', 'by_name')
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.by_id = {r[0]: r[1] for r in rows}
+        self.by_name = {r[1]: r[0] for r in rows}
+
+    def name(self, id_item, default=""):
+        return self.by_id.get(id_item, default)
+
+    def id(self, nombre, default=None):
+        return self.by_name.get(nombre, default)
+
+    def names(self):
+        """Nombres en el orden del catálogo (valores de un Combobox)."""
+        return [r[1] for r in self.rows]
+
+
+class CatalogCache:
+    """
+    Caché en memoria de los catálogos, compartida por todo el proceso (las vistas se recrean
+    en cada navegación y antes recargaban cada catálogo desde la BD).
+    Cada catálogo se guarda con su versión: invalidate(clave) solo descarta ese catálogo y
+    una carga que compitió con una escritura no se guarda (se volverá a leer la próxima vez).
+    Los crud_* de CatalogsDAO invalidan exactamente lo que modifican; las restauraciones
+    de BD llaman a invalidate() sin argumentos.
+    """
+    _lock = threading.Lock()
+    _entries = {}   # {clave: (filas, CatalogMap o None)}
+    _versions = {}  # {clave: versión}
+
+    @classmethod
+    def get(cls, key, loader):
+        entry = cls._entries.get(key)
+        if entry is None:
+            with cls._lock:
+                version = cls._versions.get(key, 0)
+            rows = tuple(loader()) # Fuera del lock: la consulta no bloquea a otros catálogos
+            with cls._lock:
+                if cls._versions.get(key, 0) == version:
+                    entry = cls._entries.setdefault(key, (rows, None))
+                else:
+                    entry = (rows, None)
+        return entry[0]
+
+    @classmethod
+    def get_map(cls, key, loader):
+        rows = cls.get(key, loader)
+        entry = cls._entries.get(key)
+        if entry is not None and entry[0] is rows and entry[1] is not None:
+            return entry[1]
+        catalog_map = CatalogMap(rows)
+        with cls._lock:
+            if cls._entries.get(key, (None,))[0] is rows:
+                cls._entries[key] = (rows, catalog_map)
+        return catalog_map
+
+    @classmethod
+    def invalidate(cls, *keys):
+        """Descarta los catálogos indicados (todos si no se indica ninguno)."""
+        with cls._lock:
+            for key in keys or list(cls._versions.keys() | cls._entries.keys()):
+                cls._entries.pop(key, None)
+                cls._versions[key] = cls._versions.get(key, 0) + 1
+        DataEvents.notify('catalogos') # Las pantallas con combos de catálogos se refrescan al mostrarse
+
+    @classmethod
+    def version(cls, key):
+        return cls._versions.get(key, 0)
+
 
 class CatalogsDAO:
     def __init__(self):
         self.db = DatabaseConnection()
 
+    def _cached(self, key, loader):
+        """Filas del catálogo desde la caché de proceso (tupla compartida: no modificarla)."""
+        return CatalogCache.get(key, loader)
+
+    def get_catalog_map(self, key):
+        """
+        CatalogMap (id <-> nombre) de un catálogo: 'puestos', 'departamentos', 'tipos_contrato',
+        'jornadas', 'unidades', 'grupos_perc', 'tipos_inasistencia', 'categorias', 'reglas'.
+        """
+        return CatalogCache.get_map(key, getattr(self, self._LOADERS[key]))
+
     # --- GENÉRICOS DE LECTURA ---
     def get_departamentos(self):
+        return self._cached('departamentos', self._load_departamentos)
+
+    def _load_departamentos(self):
         return self._get_all("cat_departamentos", "id_departamento", "nombre")
 
     def get_puestos(self):
@@ -19,9 +114,15 @@ class CatalogsDAO:
         return rows
 
     def get_tipos_contrato(self):
+        return self._cached('tipos_contrato', self._load_tipos_contrato)
+
+    def _load_tipos_contrato(self):
         return self._get_all("cat_tipos_contrato", "id_tipo_contrato", "nombre")
 
     def get_unidades_produccion(self):
+        return self._cached('unidades', self._load_unidades_produccion)
+
+    def _load_unidades_produccion(self):
         conn = self.db.get_connection()
         cursor = conn.cursor()
         cursor.execute("SELECT id_unidad, nombre_up, codigo_up FROM cat_unidades_produccion ORDER BY nombre_up")
@@ -50,6 +151,7 @@ class CatalogsDAO:
             elif action == 'DELETE':
                 cursor.execute("DELETE FROM cat_departamentos WHERE id_departamento=?", (id_item,))
             conn.commit()
+            CatalogCache.invalidate('departamentos')
             return True, "Operación exitosa"
         except sqlite3.IntegrityError as e:
             return False, f"Error de integridad (¿Registro en uso?): {e}"
@@ -70,6 +172,7 @@ class CatalogsDAO:
             elif action == 'DELETE':
                 cursor.execute("DELETE FROM cat_unidades_produccion WHERE id_unidad=?", (id_item,))
             conn.commit()
+            CatalogCache.invalidate('unidades')
             return True, "Operación exitosa"
         except sqlite3.IntegrityError:
             return False, "No se puede eliminar: La unidad tiene costos asociados en contratos."
@@ -80,6 +183,9 @@ class CatalogsDAO:
 
     # --- HELPER METHODS ---
     def get_grupos_perc_combo(self):
+        return self._cached('grupos_perc', self._load_grupos_perc_combo)
+
+    def _load_grupos_perc_combo(self):
         conn = self.db.get_connection()
         cursor = conn.cursor()
         cursor.execute("SELECT id_grupo, codigo || ' - ' || descripcion FROM cat_grupos_perc ORDER BY codigo")
@@ -88,6 +194,9 @@ class CatalogsDAO:
         return rows
 
     def get_puestos_jefatura_combo(self):
+        return self._cached('puestos_jefatura', self._load_puestos_jefatura_combo)
+
+    def _load_puestos_jefatura_combo(self):
         conn = self.db.get_connection()
         cursor = conn.cursor()
         cursor.execute("SELECT id_puesto, nombre_puesto FROM cat_puestos WHERE tiene_personal_cargo = 1 ORDER BY nombre_puesto")
@@ -97,6 +206,9 @@ class CatalogsDAO:
 
     # --- PUESTOS (CORREGIDO DESACOPLE) ---
     def get_puestos_detailed(self): # Renombrado para diferenciar del simple, úsalo en la tabla
+        return self._cached('puestos', self._load_puestos_detailed)
+
+    def _load_puestos_detailed(self):
         """
         Retorna datos enriquecidos.
         ### CORRECCIÓN: Se eliminó id_departamento y el JOIN.
@@ -166,6 +278,7 @@ class CatalogsDAO:
                 cursor.execute("DELETE FROM cat_puestos WHERE id_puesto=?", (id_item,))
             
             conn.commit()
+            CatalogCache.invalidate('puestos', 'puestos_jefatura')
             return True, "Operación exitosa"
         except sqlite3.IntegrityError:
             return False, "Error de Integridad."
@@ -177,10 +290,16 @@ class CatalogsDAO:
 # --- CRUD CATEGORÍAS INASISTENCIA  ---
     def get_categorias_inasistencia(self):
         # Retorna lista completa para la tabla de configuración
+        return self._cached('categorias', self._load_categorias_inasistencia)
+
+    def _load_categorias_inasistencia(self):
         return self._get_all("cat_categorias_inasistencia", "id_categoria", "nombre_categoria")
 
     def get_categorias_combo(self):
         """Retorna lista (id, nombre) para llenar el Combobox al crear un Tipo"""
+        return self._cached('categorias_combo', self._load_categorias_combo)
+
+    def _load_categorias_combo(self):
         conn = self.db.get_connection()
         cursor = conn.cursor()
         cursor.execute("SELECT id_categoria, nombre_categoria FROM cat_categorias_inasistencia ORDER BY nombre_categoria")
@@ -199,6 +318,7 @@ class CatalogsDAO:
             elif action == 'DELETE':
                 cursor.execute("DELETE FROM cat_categorias_inasistencia WHERE id_categoria=?", (id_item,))
             conn.commit()
+            CatalogCache.invalidate('categorias', 'categorias_combo', 'tipos_inasistencia')
             return True, "Operación exitosa"
         except sqlite3.IntegrityError:
             return False, "No se puede eliminar: Existen Tipos de Inasistencia vinculados a esta categoría."
@@ -212,6 +332,9 @@ class CatalogsDAO:
         """
         Retorna datos enriquecidos uniendo con Categorías.
         """
+        return self._cached('tipos_inasistencia', self._load_tipos_inasistencia)
+
+    def _load_tipos_inasistencia(self):
         conn = self.db.get_connection()
         cursor = conn.cursor()
         query = """
@@ -261,6 +384,7 @@ class CatalogsDAO:
                 cursor.execute("DELETE FROM cat_tipos_inasistencia WHERE id_tipo=?", (id_item,))
             
             conn.commit()
+            CatalogCache.invalidate('tipos_inasistencia', 'tipos_inasistencia_combo', 'tipos_vacaciones_combo')
             return True, "Operación exitosa"
         except Exception as e:
             return False, f"Error: {e}"
@@ -279,6 +403,7 @@ class CatalogsDAO:
             elif action == 'DELETE':
                 cursor.execute("DELETE FROM cat_tipos_contrato WHERE id_tipo_contrato=?", (id_item,))
             conn.commit()
+            CatalogCache.invalidate('tipos_contrato')
             return True, "Operación exitosa"
         except sqlite3.IntegrityError:
             return False, "No se puede eliminar: Existen contratos activos."
@@ -289,19 +414,35 @@ class CatalogsDAO:
 
     # --- CRUD JORNADAS ---
     def get_jornadas(self):
-        return self._get_all("cat_jornadas", "id_jornada", "nombre")
+        return self._cached('jornadas', self._load_jornadas)
 
-    def crud_jornada(self, action, id_item=None, nombre=None, horas=8.0):
+    def _load_jornadas(self):
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT id_jornada, nombre, horas_diarias, dias_laborables FROM cat_jornadas ORDER BY nombre")
+            return cursor.fetchall()
+        finally:
+            conn.close()
+
+    def crud_jornada(self, action, id_item=None, nombre=None, horas=8.0, dias_laborables=DEFAULT_WEEKMASK):
         conn = self.db.get_connection()
         try:
             cursor = conn.cursor()
+            if action in ('INSERT', 'UPDATE'):
+                # Máscara Lunes..Domingo (ej: 1111110 = Lunes a Sábado)
+                dias_laborables = TimeCalculator.normalize_weekmask(dias_laborables)
             if action == 'INSERT':
-                cursor.execute("INSERT INTO cat_jornadas (nombre, horas_diarias) VALUES (?, ?)", (nombre, horas))
+                cursor.execute("INSERT INTO cat_jornadas (nombre, horas_diarias, dias_laborables) VALUES (?, ?, ?)",
+                               (nombre, horas, dias_laborables))
             elif action == 'UPDATE':
-                cursor.execute("UPDATE cat_jornadas SET nombre=?, horas_diarias=? WHERE id_jornada=?", (nombre, horas, id_item))
+                cursor.execute("UPDATE cat_jornadas SET nombre=?, horas_diarias=?, dias_laborables=? WHERE id_jornada=?",
+                               (nombre, horas, dias_laborables, id_item))
             elif action == 'DELETE':
                 cursor.execute("DELETE FROM cat_jornadas WHERE id_jornada=?", (id_item,))
             conn.commit()
+            CatalogCache.invalidate('jornadas')
+            BusinessCalendar.invalidate()
             return True, "Operación exitosa"
         except sqlite3.IntegrityError:
             return False, "No se puede eliminar: Jornada asignada a contratos."
@@ -310,6 +451,40 @@ class CatalogsDAO:
         finally:
             conn.close()
             
+    # --- CRUD FERIADOS ---
+    def get_feriados(self):
+        return self._cached('feriados', self._load_feriados)
+
+    def _load_feriados(self):
+        return self._get_all("cat_feriados", "id_feriado", "fecha")
+
+    def crud_feriado(self, action, id_item=None, fecha=None, descripcion=None):
+        conn = self.db.get_connection()
+        try:
+            cursor = conn.cursor()
+            if action in ('INSERT', 'UPDATE'):
+                # Normaliza la fecha (YYYY-MM-DD) para que el calendario y los rangos SQL la encuentren
+                fecha = datetime.strptime(fecha.strip(), '%Y-%m-%d').strftime('%Y-%m-%d')
+            if action == 'INSERT':
+                cursor.execute("INSERT INTO cat_feriados (fecha, descripcion) VALUES (?, ?)", (fecha, descripcion))
+            elif action == 'UPDATE':
+                cursor.execute("UPDATE cat_feriados SET fecha=?, descripcion=? WHERE id_feriado=?", (fecha, descripcion, id_item))
+            elif action == 'DELETE':
+                cursor.execute("DELETE FROM cat_feriados WHERE id_feriado=?", (id_item,))
+            conn.commit()
+            CatalogCache.invalidate('feriados')
+            # Los calendarios laborales precalculados ya no son válidos
+            BusinessCalendar.invalidate()
+            return True, "Operación exitosa"
+        except ValueError:
+            return False, "Fecha inválida (use el formato AAAA-MM-DD)."
+        except sqlite3.IntegrityError:
+            return False, "Ya existe un feriado registrado en esa fecha."
+        except Exception as e:
+            return False, str(e)
+        finally:
+            conn.close()
+
 # --- CRUD REGLAS VACACIONES (CORREGIDO FINAL) ---
     def get_reglas_vacaciones(self):
         """
@@ -317,6 +492,9 @@ class CatalogsDAO:
         CORRECCIÓN: Eliminada referencia a 'id_tipo_inasistencia'.
         Solo trae: ID, Años, Días.
         """
+        return self._cached('reglas', self._load_reglas_vacaciones)
+
+    def _load_reglas_vacaciones(self):
         conn = self.db.get_connection()
         cursor = conn.cursor()
         query = """
@@ -347,13 +525,38 @@ class CatalogsDAO:
                                (anios, dias, id_item))
             elif action == 'DELETE':
                 cursor.execute("DELETE FROM cat_reglas_vacaciones WHERE id_regla=?", (id_item,))
+            # Con otra escala los cierres ya marcados deben reevaluarse
+            VacationService.reset_accrual_watermarks(cursor)
             conn.commit()
+            CatalogCache.invalidate('reglas')
+            # Las reglas cambiaron: la caché de devengos/proyecciones debe recargarse
+            VacationRuleCache.invalidate()
             return True, "Operación exitosa"
         except Exception as e:
             return False, str(e)
         finally:
             conn.close()
+    def get_tipos_inasistencia_combo(self):
+        """(id_tipo, nombre_tipo, cuenta_afectada) ordenado por nombre (combo de la pantalla de inasistencias)."""
+        return self._cached('tipos_inasistencia_combo', self._load_tipos_inasistencia_combo)
+
+    def _load_tipos_inasistencia_combo(self):
+        conn = self.db.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT t.id_tipo, t.nombre_tipo, t.cuenta_afectada
+                FROM cat_tipos_inasistencia t
+                ORDER BY t.nombre_tipo
+            """)
+            return cursor.fetchall()
+        finally:
+            conn.close()
+
     def get_only_vacation_types_combo(self):
+        return self._cached('tipos_vacaciones_combo', self._load_only_vacation_types_combo)
+
+    def _load_only_vacation_types_combo(self):
         conn = self.db.get_connection()
         cursor = conn.cursor()
         try:
@@ -362,4 +565,22 @@ class CatalogsDAO:
             rows = cursor.fetchall()
             return rows
         finally:
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+    # Catálogo -> método de carga (para get_catalog_map)
+    _LOADERS = {
+        'departamentos': '_load_departamentos',
+        'puestos': '_load_puestos_detailed',
+        'puestos_jefatura': '_load_puestos_jefatura_combo',
+        'tipos_contrato': '_load_tipos_contrato',
+        'unidades': '_load_unidades_produccion',
+        'jornadas': '_load_jornadas',
+        'grupos_perc': '_load_grupos_perc_combo',
+        'categorias': '_load_categorias_inasistencia',
+        'categorias_combo': '_load_categorias_combo',
+        'tipos_inasistencia': '_load_tipos_inasistencia',
+        'tipos_inasistencia_combo': '_load_tipos_inasistencia_combo',
+        'tipos_vacaciones_combo': '_load_only_vacation_types_combo',
+        'feriados': '_load_feriados',
+        'reglas': '_load_reglas_vacaciones',
+    }
@@ -1,6 +1,8 @@
 import sqlite3
 from config.db_connection import DatabaseConnection
+from logics.data_events import DataEvents
 from logics.vacation_service import VacationService
+from models import search_index
 
 class ContractDAO:
     def __init__(self):
@@ -102,6 +104,7 @@ class ContractDAO:
             # 6. CIERRE DE TRANSACCIÓN ATÓMICA
             # Guardamos todo lo anterior (Contrato + Costos + Saldo Inicial)
             conn.commit() 
+            DataEvents.notify('contratos', 'kardex')
             conn.close() # Cerramos conexión A para liberar el bloqueo de escritura de SQLite
 
             # 7. LÓGICA PROACTIVA POST-CIERRE
@@ -136,7 +139,7 @@ class ContractDAO:
              f_ini, f_fin, salario, _id_con_param) = data_contrato
             
             # 1. RECUPERAR ID_EMPLEADO (Para recalcular dni_perc si cambió el tipo)
-            cursor.execute("SELECT id_empleado FROM contratos WHERE id_contrato = ?", (id_contrato,))
+            cursor.execute("SELECT id_empleado, fecha_inicio_kardex, fecha_inicio FROM contratos WHERE id_contrato = ?", (id_contrato,))
             row_emp = cursor.fetchone()
             if not row_emp: raise Exception("Contrato no encontrado")
             id_emp = row_emp[0]
@@ -164,7 +167,12 @@ class ContractDAO:
             if f_kardex:
                 self._sync_initial_balance_kardex(cursor, id_contrato, f_kardex, s_inicial)
 
+            # Cambió el inicio del kardex o la antigüedad: los devengos se recorren de nuevo
+            if (row_emp[1], row_emp[2]) != (f_kardex, f_ini):
+                VacationService.reset_accrual_watermarks(cursor, id_contrato)
+
             conn.commit()
+            DataEvents.notify('contratos', 'kardex')
             return True, "Actualizado."
         except Exception as e:
             conn.rollback()
@@ -185,6 +193,7 @@ class ContractDAO:
             cursor.execute("DELETE FROM contratos WHERE id_contrato = ?", (id_contrato,))
             
             conn.commit()
+            DataEvents.notify('contratos', 'kardex')
             return True, "Contrato y todos sus registros vinculados eliminados correctamente."
         except Exception as e:
             conn.rollback()
@@ -279,39 +288,46 @@ class ContractDAO:
     
 # ... (métodos anteriores)
 
-    def search_contracts(self, term):
+    def search_contracts(self, term, limit=50):
         """
         Busca contratos por Nombre de Empleado, Código, DNI o Puesto.
-        Optimizado para el Selector.
+        Usa el índice FTS5 (fts_contratos): cada palabra como prefijo, ordenado por relevancia (bm25).
+        Sin término, lista los contratos más recientes (activos primero).
         """
         conn = self.db.get_connection()
         cursor = conn.cursor()
-        search_term = f"%{term}%"
-        
-        query = """
-        SELECT 
+        match = search_index.match_expression(term)
+
+        columns = """
             c.id_contrato, 
             e.codigo || ' - ' || e.nombres || ' ' || e.apellidos as empleado,
             p.nombre_puesto,
             tc.nombre as tipo,
             c.fecha_inicio,
             CASE WHEN c.activo = 1 THEN 'Activo' ELSE 'Inactivo' END as estado
-        FROM contratos c
+        """
+        joins = """
         JOIN empleados e ON c.id_empleado = e.id_empleado
         JOIN cat_puestos p ON c.id_puesto = p.id_puesto
         JOIN cat_tipos_contrato tc ON c.id_tipo_contrato = tc.id_tipo_contrato
-        WHERE 
-            e.nombres LIKE ? OR 
-            e.apellidos LIKE ? OR 
-            e.codigo LIKE ? OR 
-            e.dni LIKE ? OR
-            p.nombre_puesto LIKE ?
-        ORDER BY c.activo DESC, c.fecha_inicio DESC
-        LIMIT 50 -- Límite de seguridad para no saturar UI
         """
-        # Repetimos el término para cada ?
-        params = (search_term, search_term, search_term, search_term, search_term)
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        conn.close()
-        return rows
\ No newline at end of file
+        try:
+            if match is None:
+                cursor.execute(f"""
+                    SELECT {columns} FROM contratos c {joins}
+                    ORDER BY c.activo DESC, c.fecha_inicio DESC
+                    LIMIT ? -- Límite de seguridad para no saturar UI
+                """, (limit,))
+            else:
+                cursor.execute(f"""
+                    SELECT {columns}
+                    FROM fts_contratos
+                    JOIN contratos c ON c.id_contrato = fts_contratos.rowid
+                    {joins}
+                    WHERE fts_contratos MATCH ?
+                    ORDER BY {search_index.CONTRACT_WEIGHTS}, c.activo DESC, c.fecha_inicio DESC
+                    LIMIT ?
+                """, (match, limit))
+            return cursor.fetchall()
+        finally:
+            conn.close()
\ No newline at end of file
@@ -1,8 +1,18 @@
 import sqlite3
 from config.db_connection import DatabaseConnection
+from logics.data_events import DataEvents
+from models import search_index
+from models.paging import order_clause, page_params
 import re
 
 class EmployeeDAO:
+    # Columnas del EmployeeSelector -> expresión SQL (lista blanca para ORDER BY)
+    SEARCH_SORT_COLUMNS = {
+        'codigo': 'e.codigo',
+        'nombre': "e.nombres || ' ' || e.apellidos",
+        'dni': 'e.dni',
+    }
+
     def __init__(self):
         self.db = DatabaseConnection()
 
@@ -25,6 +35,7 @@ class EmployeeDAO:
                 cursor = conn.cursor()
                 cursor.execute(query, (codigo_final, dni_limpio, nombres, apellidos, fecha_nac, activo))
                 conn.commit()
+                DataEvents.notify('empleados')
                 
                 # Si llegamos aquí, se guardó.
                 print(f"DEBUG: Empleado {codigo_final} guardado exitosamente en BD.")
@@ -62,6 +73,7 @@ class EmployeeDAO:
             cursor = conn.cursor()
             cursor.execute(query, (codigo, dni, nombres, apellidos, fecha_nac, id_empleado))
             conn.commit()
+            DataEvents.notify('empleados')
             return True, "Empleado actualizado correctamente."
         except sqlite3.IntegrityError:
             return False, "No se puede actualizar: El Código o DNI pertenecen a otro empleado."
@@ -78,6 +90,60 @@ class EmployeeDAO:
         rows = cursor.fetchall()
         conn.close()
         return rows
+
+    def search_employees(self, term, limit=None, offset=0, order_by=None, descending=False):
+        """
+        Empleados activos que coinciden con el texto (código, DNI, nombres, apellidos).
+        Mismas columnas que get_all. Usa el índice FTS5 (fts_empleados) con prefijos y bm25;
+        sin término equivale a get_all ordenado por apellidos.
+        limit/offset/order_by: una página ordenada por columna (tabla virtual del selector).
+        """
+        match = search_index.match_expression(term)
+        conn = self.db.get_connection()
+        try:
+            cursor = conn.cursor()
+            if match is None:
+                order = order_clause(self.SEARCH_SORT_COLUMNS, order_by, descending,
+                                     "e.apellidos, e.nombres", "e.id_empleado")
+                cursor.execute(f"""
+                    SELECT e.id_empleado, e.codigo, e.dni, e.nombres, e.apellidos, e.fecha_nacimiento
+                    FROM empleados e WHERE e.activo = 1
+                    ORDER BY {order}
+                    LIMIT ? OFFSET ?
+                """, page_params(limit, offset))
+            else:
+                order = order_clause(self.SEARCH_SORT_COLUMNS, order_by, descending,
+                                     search_index.EMPLOYEE_WEIGHTS, "e.id_empleado")
+                cursor.execute(f"""
+                    SELECT e.id_empleado, e.codigo, e.dni, e.nombres, e.apellidos, e.fecha_nacimiento
+                    FROM fts_empleados
+                    JOIN empleados e ON e.id_empleado = fts_empleados.rowid
+                    WHERE fts_empleados MATCH ? AND e.activo = 1
+                    ORDER BY {order}
+                    LIMIT ? OFFSET ?
+                """, (match,) + page_params(limit, offset))
+            return cursor.fetchall()
+        finally:
+            conn.close()
+
+    def count_search_employees(self, term):
+        """Cantidad de resultados de search_employees (para el tamaño de la tabla virtual)."""
+        match = search_index.match_expression(term)
+        conn = self.db.get_connection()
+        try:
+            cursor = conn.cursor()
+            if match is None:
+                cursor.execute("SELECT COUNT(*) FROM empleados WHERE activo = 1")
+            else:
+                cursor.execute("""
+                    SELECT COUNT(*)
+                    FROM fts_empleados
+                    JOIN empleados e ON e.id_empleado = fts_empleados.rowid
+                    WHERE fts_empleados MATCH ? AND e.activo = 1
+                """, (match,))
+            return cursor.fetchone()[0]
+        finally:
+            conn.close()
     
     
     def delete_employee(self, employee_id):
@@ -102,6 +168,7 @@ class EmployeeDAO:
                 
                 if cursor.rowcount > 0:
                     conn.commit()
+                    DataEvents.notify('empleados')
                     return True, "Empleado eliminado correctamente del sistema."
                 else:
                     return False, "No se encontró el empleado con ese ID."
@@ -1,62 +1,424 @@
+import calendar
+from itertools import groupby
+from operator import itemgetter
 from config.db_connection import DatabaseConnection
+from logics.data_events import DataEvents
+
+# Diferencia tolerada entre kardex_saldos y la suma real (residuos de sumar/restar REAL)
+BALANCE_TOLERANCE = 0.005
+
 
 class KardexDAO:
+    """
+    Movimientos de vacaciones (kardex_vacaciones) y sus saldos.
+    kardex_saldos guarda el saldo por (contrato, cuenta) y la mantienen los triggers de la
+    migración 5 en cada INSERT/UPDATE/DELETE, así que leer un saldo es una búsqueda por clave.
+    kardex_cierres_mensuales guarda el saldo al fin de cada mes para los saldos de apertura.
+    """
     def __init__(self):
         self.db = DatabaseConnection()
 
-    def get_kardex_report(self, id_contrato, fecha_inicio=None, fecha_fin=None):
-            conn = self.db.get_connection()
+    @staticmethod
+    def get_balance(cursor, id_contrato, cuenta_tipo='ORDINARIA'):
+        """Saldo vigente de la cuenta (lectura O(1) de kardex_saldos) con el cursor del llamador."""
+        cursor.execute("""
+            SELECT saldo FROM kardex_saldos WHERE id_contrato = ? AND cuenta_tipo = ?
+        """, (id_contrato, cuenta_tipo))
+        row = cursor.fetchone()
+        return row[0] if row else 0.0
+
+    @staticmethod
+    def rebuild_balances(cursor):
+        """
+        Recalcula kardex_saldos completo desde kardex_vacaciones (restauraciones, reparación).
+        Se ejecuta con el cursor del llamador: queda dentro de SU transacción.
+        """
+        cursor.execute("DELETE FROM kardex_saldos")
+        cursor.execute("""
+            INSERT INTO kardex_saldos (id_contrato, cuenta_tipo, saldo, movimientos)
+            SELECT id_contrato, COALESCE(cuenta_tipo, 'ORDINARIA'), COALESCE(SUM(dias), 0), COUNT(*)
+            FROM kardex_vacaciones
+            GROUP BY id_contrato, COALESCE(cuenta_tipo, 'ORDINARIA')
+        """)
+
+    # --------------------------------------------------------------------------
+    # CIERRES MENSUALES (saldo de apertura sin recorrer la historia)
+    # --------------------------------------------------------------------------
+
+    @staticmethod
+    def save_month_snapshots(cursor, hasta, id_contrato=None):
+        """
+        Guarda en kardex_cierres_mensuales el saldo ORDINARIO al cierre de cada mes (hasta la fecha
+        'hasta', inclusive) que tuvo movimientos después del último cierre guardado del contrato.
+        Incremental: solo lee los movimientos posteriores a ese cierre. Sin id_contrato procesa todos.
+        Se ejecuta con el cursor del llamador: queda dentro de SU transacción. Retorna filas escritas.
+        """
+        params = {"hasta": str(hasta)[:10], "id_contrato": id_contrato}
+        cursor.execute("""
+            WITH ultimo AS (
+                SELECT id_contrato, MAX(fecha_cierre) AS fecha_cierre
+                FROM kardex_cierres_mensuales
+                WHERE (:id_contrato IS NULL OR id_contrato = :id_contrato)
+                GROUP BY id_contrato
+            )
+            SELECT k.id_contrato, substr(k.fecha_movimiento, 1, 10), k.dias, s.saldo
+            FROM kardex_vacaciones k
+            LEFT JOIN ultimo u ON u.id_contrato = k.id_contrato
+            LEFT JOIN kardex_cierres_mensuales s
+                ON s.id_contrato = u.id_contrato AND s.fecha_cierre = u.fecha_cierre
+            WHERE (:id_contrato IS NULL OR k.id_contrato = :id_contrato)
+            AND (k.cuenta_tipo = 'ORDINARIA' OR k.cuenta_tipo IS NULL)
+            AND k.fecha_movimiento < date(:hasta, '+1 day')
+            AND (u.fecha_cierre IS NULL OR k.fecha_movimiento >= date(u.fecha_cierre, '+1 day'))
+            ORDER BY k.id_contrato, k.fecha_movimiento
+        """, params)
+
+        filas = []
+        for id_con, movimientos in groupby(cursor.fetchall(), key=itemgetter(0)):
+            saldo = None
+            fin_mes = None
+            for _, fecha, dias, saldo_base in movimientos:
+                if saldo is None:
+                    saldo = saldo_base or 0.0 # Continúa desde el último cierre guardado
+                cierre = KardexDAO._month_end(fecha)
+                if fin_mes is not None and cierre != fin_mes:
+                    filas.append((id_con, fin_mes, saldo))
+                fin_mes = cierre
+                saldo += dias or 0.0
+            filas.append((id_con, fin_mes, saldo))
+
+        cursor.executemany("""
+            INSERT OR REPLACE INTO kardex_cierres_mensuales (id_contrato, fecha_cierre, saldo)
+            VALUES (?, ?, ?)
+        """, filas)
+        return len(filas)
+
+    @staticmethod
+    def rebuild_month_snapshots(cursor, hasta, id_contrato=None):
+        """Descarta y recalcula los cierres mensuales (correcciones con fecha pasada, restauraciones)."""
+        KardexDAO.reset_month_snapshots(cursor, id_contrato)
+        return KardexDAO.save_month_snapshots(cursor, hasta, id_contrato)
+
+    def rebuild_all_month_snapshots(self, hasta, progress_callback=None):
+        """
+        Comando de reconstrucción: recalcula los cierres de todos los contratos en una transacción.
+        progress_callback(actual, total, mensaje) como en el resto de procesos masivos.
+        Retorna: (True/False, mensaje)
+        """
+        def report(actual, total, mensaje):
+            if progress_callback:
+                progress_callback(actual, total, mensaje)
+
+        conn = self.db.get_connection()
+        try:
             cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            report(0, 1, "Recalculando cierres mensuales de kardex...")
+            filas = self.rebuild_month_snapshots(cursor, hasta)
+            conn.commit()
+            report(1, 1, "Cierres recalculados.")
+            return True, f"{filas} cierres mensuales recalculados hasta {str(hasta)[:10]}."
+        except Exception as e:
+            conn.rollback()
+            return False, f"Error recalculando cierres mensuales: {e}"
+        finally:
+            conn.close()
 
-            # 1. Calcular SALDO INICIAL
-            # CORRECCIÓN CRÍTICA: Solo calculamos saldo inicial si hay una fecha de corte.
-            # Si fecha_inicio es None, queremos ver toda la historia, por ende el saldo inicial es 0.
-            saldo_inicial = 0.0
-            
-            if fecha_inicio:
-                query_saldo = """
-                    SELECT COALESCE(SUM(dias), 0) FROM kardex_vacaciones 
-                    WHERE id_contrato = ? 
-                    AND (cuenta_tipo = 'ORDINARIA' OR cuenta_tipo IS NULL)
-                    AND fecha_movimiento < ?
-                """
-                cursor.execute(query_saldo, (id_contrato, fecha_inicio))
-                result = cursor.fetchone()
-                if result:
-                    saldo_inicial = result[0]
-
-            # 2. Obtener MOVIMIENTOS
-            query_movs = """
-                SELECT 
+    @staticmethod
+    def reset_month_snapshots(cursor, id_contrato=None):
+        """Borra los cierres de un contrato (o de todos); el próximo devengo los vuelve a generar."""
+        if id_contrato is None:
+            cursor.execute("DELETE FROM kardex_cierres_mensuales")
+        else:
+            cursor.execute("DELETE FROM kardex_cierres_mensuales WHERE id_contrato = ?", (id_contrato,))
+
+    @staticmethod
+    def _month_end(fecha):
+        """'YYYY-MM-DD' -> último día de ese mes en el mismo formato."""
+        anio, mes = int(fecha[:4]), int(fecha[5:7])
+        return f"{anio:04d}-{mes:02d}-{calendar.monthrange(anio, mes)[1]:02d}"
+
+    def verify_balances(self, repair=False):
+        """
+        Compara kardex_saldos contra una suma completa de kardex_vacaciones.
+        Retorna (diferencias, total_cuentas) con diferencias = [(id_contrato, cuenta, guardado, real)].
+        Con repair=True, si hay diferencias reconstruye la tabla en la misma transacción.
+        """
+        conn = self.db.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN") # Lectura consistente (y escritura si hay que reparar)
+            cursor.execute("""
+                WITH real AS (
+                    SELECT id_contrato, COALESCE(cuenta_tipo, 'ORDINARIA') AS cuenta_tipo,
+                           COALESCE(SUM(dias), 0) AS saldo, COUNT(*) AS movimientos
+                    FROM kardex_vacaciones
+                    GROUP BY id_contrato, COALESCE(cuenta_tipo, 'ORDINARIA')
+                )
+                -- Equivale a un FULL OUTER JOIN (que exige SQLite 3.39+): cuentas reales con o sin
+                -- saldo guardado, más los saldos guardados que no tienen movimientos
+                SELECT r.id_contrato, r.cuenta_tipo, s.saldo, r.saldo, s.movimientos, r.movimientos
+                FROM real r
+                LEFT JOIN kardex_saldos s
+                    ON s.id_contrato = r.id_contrato AND s.cuenta_tipo = r.cuenta_tipo
+                UNION ALL
+                SELECT s.id_contrato, s.cuenta_tipo, s.saldo, NULL, s.movimientos, NULL
+                FROM kardex_saldos s
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM real r
+                    WHERE r.id_contrato = s.id_contrato AND r.cuenta_tipo = s.cuenta_tipo
+                )
+            """)
+            rows = cursor.fetchall()
+
+            diferencias = []
+            for id_contrato, cuenta, guardado, real, mov_guardados, mov_reales in rows:
+                if (guardado is None or real is None or mov_guardados != mov_reales
+                        or abs(guardado - real) > BALANCE_TOLERANCE):
+                    diferencias.append((id_contrato, cuenta, guardado, real))
+
+            if diferencias and repair:
+                self.rebuild_balances(cursor)
+            conn.commit()
+            return diferencias, len(rows)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def get_kardex_ledger(self, id_contrato, fecha_inicio=None, fecha_fin=None, limit=None, offset=0,
+                          saldo_inicial=None):
+        """
+        Modo libro mayor: debe, haber y saldo corrido calculados por SQLite (funciones de ventana),
+        con el detalle ya armado. El saldo de cada fila es:
+            saldo_inicial + SUM(dias) OVER (ORDER BY fecha_movimiento, id_movimiento)
+        limit/offset paginan el resultado ya acumulado: cada página trae su saldo correcto sin
+        traer ni recorrer en Python las filas anteriores.
+        saldo_inicial: el de la primera página (get_kardex_statement) para no recalcularlo en cada
+        página siguiente; None lo calcula.
+        Retorna (saldo_inicial, filas) con filas = (id, fecha, tipo, detalle, debe, haber, saldo).
+        """
+        conn = self.db.get_connection()
+        try:
+            cursor = conn.cursor()
+            if saldo_inicial is None:
+                saldo_inicial = self._opening_balance(cursor, id_contrato, fecha_inicio)
+            return saldo_inicial, self._ledger_rows(cursor, saldo_inicial, id_contrato, fecha_inicio,
+                                                    fecha_fin, limit, offset)
+        finally:
+            conn.close()
+
+    def get_kardex_statement(self, id_contrato, fecha_inicio=None, fecha_fin=None, limit=None, offset=0):
+        """
+        Página del libro mayor + totales del rango completo, en una misma transacción de lectura
+        (saldo de apertura calculado una vez: página y totales salen de la misma foto de la BD).
+        Retorna (saldo_inicial, filas, (cantidad_movimientos, total_debe, total_haber, saldo_final)).
+        """
+        conn = self.db.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            saldo_inicial = self._opening_balance(cursor, id_contrato, fecha_inicio)
+            filas = self._ledger_rows(cursor, saldo_inicial, id_contrato, fecha_inicio, fecha_fin, limit, offset)
+            totales = self._range_totals(cursor, saldo_inicial, id_contrato, fecha_inicio, fecha_fin)
+            conn.commit()
+            return saldo_inicial, filas, totales
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _ledger_rows(self, cursor, saldo_inicial, id_contrato, fecha_inicio, fecha_fin, limit, offset):
+        where_sql, params = self._movements_filter(id_contrato, fecha_inicio, fecha_fin)
+        query = f"""
+            SELECT
+                k.id_movimiento,
+                k.fecha_movimiento,
+                k.tipo_movimiento,
+                CASE WHEN i.fecha_inicio_real IS NOT NULL AND i.fecha_fin_real IS NOT NULL
+                     THEN k.observacion || ' [Del ' || i.fecha_inicio_real || ' al ' || i.fecha_fin_real || ']'
+                     ELSE k.observacion
+                END,
+                CASE WHEN k.dias < 0 THEN -k.dias ELSE 0.0 END,
+                CASE WHEN k.dias > 0 THEN k.dias ELSE 0.0 END,
+                ? + SUM(COALESCE(k.dias, 0)) OVER (
+                    ORDER BY k.fecha_movimiento, k.id_movimiento
+                    ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+                )
+            FROM kardex_vacaciones k
+            LEFT JOIN inasistencias i ON k.id_referencia = i.id_inasistencia
+            WHERE {where_sql}
+            ORDER BY k.fecha_movimiento ASC, k.id_movimiento ASC
+        """
+        params = [saldo_inicial] + params
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params += [int(limit), int(offset)]
+
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+    def _range_totals(self, cursor, saldo_inicial, id_contrato, fecha_inicio, fecha_fin):
+        """Totales del rango en una sola agregación: (cantidad, total_debe, total_haber, saldo_final)."""
+        where_sql, params = self._movements_filter(id_contrato, fecha_inicio, fecha_fin)
+        cursor.execute(f"""
+            SELECT COUNT(*),
+                   COALESCE(SUM(CASE WHEN k.dias < 0 THEN -k.dias ELSE 0.0 END), 0.0),
+                   COALESCE(SUM(CASE WHEN k.dias > 0 THEN k.dias ELSE 0.0 END), 0.0),
+                   COALESCE(SUM(k.dias), 0.0)
+            FROM kardex_vacaciones k
+            WHERE {where_sql}
+        """, params)
+        cantidad, debe, haber, neto = cursor.fetchone()
+        return cantidad, debe, haber, saldo_inicial + neto
+
+    # --------------------------------------------------------------------------
+    # MODO MASIVO (estados de kardex de todos los contratos activos)
+    # --------------------------------------------------------------------------
+
+    def get_export_contracts(self, fecha_inicio=None, fecha_fin=None):
+        """
+        Contratos activos con su saldo de apertura y totales del rango, en una sola consulta agrupada.
+        Retorna filas (id_contrato, codigo, apellidos, nombres, fecha_inicio, saldo_inicial,
+        movimientos, debe, haber, neto) ordenadas por id_contrato.
+        """
+        conn = self.db.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                WITH cierre AS (
+                    -- Último cierre mensual anterior a la fecha de corte (solo si hay fecha de corte)
+                    SELECT id_contrato, MAX(fecha_cierre) AS fecha_cierre
+                    FROM kardex_cierres_mensuales
+                    WHERE :ini IS NOT NULL AND fecha_cierre < :ini
+                    GROUP BY id_contrato
+                ),
+                rango AS (
+                    SELECT id_contrato, COUNT(*) AS movimientos,
+                           SUM(CASE WHEN dias < 0 THEN -dias ELSE 0.0 END) AS debe,
+                           SUM(CASE WHEN dias > 0 THEN dias ELSE 0.0 END) AS haber,
+                           SUM(COALESCE(dias, 0)) AS neto
+                    FROM kardex_vacaciones
+                    WHERE (cuenta_tipo = 'ORDINARIA' OR cuenta_tipo IS NULL)
+                    AND (:ini IS NULL OR fecha_movimiento >= :ini)
+                    AND (:fin IS NULL OR fecha_movimiento <= :fin)
+                    GROUP BY id_contrato
+                )
+                SELECT c.id_contrato, e.codigo, e.apellidos, e.nombres, c.fecha_inicio,
+                       CASE WHEN :ini IS NULL THEN 0.0 ELSE
+                           COALESCE(s.saldo, 0.0) + (
+                               SELECT COALESCE(SUM(k.dias), 0.0) FROM kardex_vacaciones k
+                               WHERE k.id_contrato = c.id_contrato
+                               AND (k.cuenta_tipo = 'ORDINARIA' OR k.cuenta_tipo IS NULL)
+                               AND k.fecha_movimiento < :ini
+                               AND (ci.fecha_cierre IS NULL OR k.fecha_movimiento >= date(ci.fecha_cierre, '+1 day'))
+                           )
+                       END,
+                       COALESCE(r.movimientos, 0), COALESCE(r.debe, 0.0),
+                       COALESCE(r.haber, 0.0), COALESCE(r.neto, 0.0)
+                FROM contratos c
+                JOIN empleados e ON e.id_empleado = c.id_empleado
+                LEFT JOIN cierre ci ON ci.id_contrato = c.id_contrato
+                LEFT JOIN kardex_cierres_mensuales s
+                    ON s.id_contrato = ci.id_contrato AND s.fecha_cierre = ci.fecha_cierre
+                LEFT JOIN rango r ON r.id_contrato = c.id_contrato
+                WHERE c.activo = 1
+                ORDER BY c.id_contrato
+            """, {"ini": fecha_inicio, "fin": fecha_fin})
+            return cursor.fetchall()
+        finally:
+            conn.close()
+
+    def iter_all_ledgers(self, fecha_inicio=None, fecha_fin=None, chunksize=2000):
+        """
+        Movimientos de TODOS los contratos activos en una sola consulta ordenada por contrato,
+        con debe/haber/detalle y el acumulado del rango por contrato (ventana PARTITION BY).
+        Genera filas (id_contrato, id, fecha, tipo, detalle, debe, haber, acumulado) por bloques
+        (fetchmany): el historial completo nunca se carga entero en memoria.
+        El saldo de cada fila es saldo_inicial del contrato + acumulado.
+        """
+        where_sql = "(k.cuenta_tipo = 'ORDINARIA' OR k.cuenta_tipo IS NULL)"
+        params = []
+        if fecha_inicio:
+            where_sql += " AND k.fecha_movimiento >= ?"
+            params.append(fecha_inicio)
+        if fecha_fin:
+            where_sql += " AND k.fecha_movimiento <= ?"
+            params.append(fecha_fin)
+
+        conn = self.db.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT
+                    k.id_contrato,
                     k.id_movimiento,
                     k.fecha_movimiento,
                     k.tipo_movimiento,
-                    k.observacion,
-                    k.dias,
-                    i.fecha_inicio_real,
-                    i.fecha_fin_real
+                    CASE WHEN i.fecha_inicio_real IS NOT NULL AND i.fecha_fin_real IS NOT NULL
+                         THEN k.observacion || ' [Del ' || i.fecha_inicio_real || ' al ' || i.fecha_fin_real || ']'
+                         ELSE k.observacion
+                    END,
+                    CASE WHEN k.dias < 0 THEN -k.dias ELSE 0.0 END,
+                    CASE WHEN k.dias > 0 THEN k.dias ELSE 0.0 END,
+                    SUM(COALESCE(k.dias, 0)) OVER (
+                        PARTITION BY k.id_contrato
+                        ORDER BY k.fecha_movimiento, k.id_movimiento
+                        ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+                    )
                 FROM kardex_vacaciones k
+                JOIN contratos c ON c.id_contrato = k.id_contrato AND c.activo = 1
                 LEFT JOIN inasistencias i ON k.id_referencia = i.id_inasistencia
-                WHERE k.id_contrato = ?
-                AND (k.cuenta_tipo = 'ORDINARIA' OR k.cuenta_tipo IS NULL)
-            """
-            params = [id_contrato]
-
-            if fecha_inicio:
-                query_movs += " AND k.fecha_movimiento >= ?"
-                params.append(fecha_inicio)
-            
-            if fecha_fin:
-                query_movs += " AND k.fecha_movimiento <= ?"
-                params.append(fecha_fin)
-
-            query_movs += " ORDER BY k.fecha_movimiento ASC, k.id_movimiento ASC"
-
-            cursor.execute(query_movs, params)
-            movimientos = cursor.fetchall()
-            
+                WHERE {where_sql}
+                ORDER BY k.id_contrato, k.fecha_movimiento, k.id_movimiento
+            """, params)
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if not rows:
+                    break
+                yield from rows
+        finally:
             conn.close()
-            return saldo_inicial, movimientos
+
+    def _opening_balance(self, cursor, id_contrato, fecha_inicio):
+        # CORRECCIÓN CRÍTICA: Solo calculamos saldo inicial si hay una fecha de corte.
+        # Si fecha_inicio es None, queremos ver toda la historia, por ende el saldo inicial es 0.
+        if not fecha_inicio:
+            return 0.0
+
+        # Último cierre mensual ANTERIOR a la fecha + lo movido entre ese cierre y la fecha:
+        # una búsqueda por clave y una suma de a lo sumo unas semanas, sin importar la antigüedad
+        cursor.execute("""
+            SELECT fecha_cierre, saldo FROM kardex_cierres_mensuales
+            WHERE id_contrato = ? AND fecha_cierre < ?
+            ORDER BY fecha_cierre DESC LIMIT 1
+        """, (id_contrato, fecha_inicio))
+        cierre = cursor.fetchone()
+        fecha_cierre, saldo_cierre = cierre if cierre else (None, 0.0)
+
+        cursor.execute("""
+            SELECT COALESCE(SUM(dias), 0) FROM kardex_vacaciones 
+            WHERE id_contrato = ? 
+            AND (cuenta_tipo = 'ORDINARIA' OR cuenta_tipo IS NULL)
+            AND fecha_movimiento < ?
+            AND (? IS NULL OR fecha_movimiento >= date(?, '+1 day'))
+        """, (id_contrato, fecha_inicio, fecha_cierre, fecha_cierre))
+        return saldo_cierre + cursor.fetchone()[0]
+
+    @staticmethod
+    def _movements_filter(id_contrato, fecha_inicio, fecha_fin):
+        """WHERE común de los movimientos de la cuenta ORDINARIA en el rango (alias k)."""
+        where_sql = "k.id_contrato = ? AND (k.cuenta_tipo = 'ORDINARIA' OR k.cuenta_tipo IS NULL)"
+        params = [id_contrato]
+        if fecha_inicio:
+            where_sql += " AND k.fecha_movimiento >= ?"
+            params.append(fecha_inicio)
+        if fecha_fin:
+            where_sql += " AND k.fecha_movimiento <= ?"
+            params.append(fecha_fin)
+        return where_sql, params
 
     def add_manual_movement(self, id_contrato, tipo, dias, obs):
         """Permite agregar saldo inicial o ajustes manuales desde la vista de saldos"""
@@ -68,6 +430,7 @@ class KardexDAO:
                 VALUES (?, CURRENT_DATE, ?, ?, ?)
             """, (id_contrato, tipo, dias, obs))
             conn.commit()
+            DataEvents.notify('kardex')
             return True, "Ajuste registrado."
         except Exception as e:
             return False, str(e)
@@ -0,0 +1,19 @@
+# Paginación y orden para las tablas virtuales (views/components/virtual_table.py).
+# Las vistas piden por id de columna; cada DAO traduce con su lista blanca, nunca se
+# interpola texto que venga de la interfaz.
+
+
+def order_clause(sort_columns, order_by, descending, default, tiebreak):
+    """
+    'ORDER BY' sin la palabra clave: columna pedida (si está en la lista blanca) o el orden por
+    defecto, siempre con un desempate único para que LIMIT/OFFSET no repita ni salte filas.
+    """
+    expression = sort_columns.get(order_by)
+    if expression is None:
+        return f"{default}, {tiebreak}"
+    return f"{expression} {'DESC' if descending else 'ASC'}, {tiebreak}"
+
+
+def page_params(limit, offset):
+    """Parámetros para 'LIMIT ? OFFSET ?' (limit None = sin límite)."""
+    return (-1 if limit is None else limit, offset or 0)
@@ -1,7 +1,21 @@
 import sqlite3
 from config.db_connection import DatabaseConnection
+from logics.data_events import DataEvents
+from models.paging import order_clause, page_params
 
 class PayrollDAO:
+    # Columnas de la tabla de PayrollView -> expresión SQL (lista blanca para ORDER BY)
+    SUMMARY_SORT_COLUMNS = {
+        'empleado': "e.nombres || ' ' || e.apellidos",
+        'puesto': 'p.nombre_puesto',
+        'base': 'nm.salario_base',
+        'bonos': 'nm.bonificaciones',
+        'beneficios': 'nm.beneficios_laborales',
+        'deducciones': 'nm.deducciones',
+        'total': 'nm.total_pagado',
+        'obs': 'nm.observaciones',
+    }
+
     def __init__(self):
         self.db = DatabaseConnection()
 
@@ -22,6 +36,7 @@ class PayrollDAO:
             
             cursor.execute(query, (id_contrato, anio, mes, salario, bonos, beneficios, deducciones, observaciones))
             conn.commit()
+            DataEvents.notify('nominas')
             return True, "Registro de nómina guardado correctamente."
             
         except sqlite3.IntegrityError:
@@ -45,6 +60,7 @@ class PayrollDAO:
             """
             cursor.execute(query, (salario, bonos, beneficios, deducciones, observaciones, id_nomina))
             conn.commit()
+            DataEvents.notify('nominas')
             return True, "Nómina actualizada."
         except Exception as e:
             conn.rollback()
@@ -97,12 +113,54 @@ class PayrollDAO:
         finally:
             conn.close()
 
+    def get_existing_contract_ids(self):
+        """IDs de contrato existentes (validación masiva de plantillas sin consultar fila por fila)."""
+        conn = self.db.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id_contrato FROM contratos")
+            return {row[0] for row in cursor.fetchall()}
+        finally:
+            conn.close()
+
+    def bulk_upsert_payroll(self, rows):
+        """
+        Inserta o actualiza muchas nóminas en UNA transacción (carga de plantillas).
+        rows: [(id_contrato, anio, mes, salario, bonos, beneficios, deducciones, observaciones), ...]
+        Si ya existe (id_contrato, anio, mes) se actualizan los montos, igual que update_payroll_record.
+        Retorna: (True, cantidad) o (False, error)
+        """
+        conn = self.db.get_connection()
+        try:
+            cursor = conn.cursor()
+            query = """
+                INSERT INTO nominas_mensuales 
+                (id_contrato, anio, mes, salario_base, bonificaciones, beneficios_laborales, deducciones, observaciones)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id_contrato, anio, mes) DO UPDATE SET
+                    salario_base = excluded.salario_base,
+                    bonificaciones = excluded.bonificaciones,
+                    beneficios_laborales = excluded.beneficios_laborales,
+                    deducciones = excluded.deducciones,
+                    observaciones = excluded.observaciones
+            """
+            cursor.executemany(query, rows)
+            conn.commit()
+            DataEvents.notify('nominas')
+            return True, len(rows)
+        except Exception as e:
+            conn.rollback()
+            return False, f"Error en la carga masiva de nómina: {e}"
+        finally:
+            conn.close()
+
     def delete_payroll(self, id_nomina):
         conn = self.db.get_connection()
         try:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM nominas_mensuales WHERE id_nomina = ?", (id_nomina,))
             conn.commit()
+            DataEvents.notify('nominas')
             return True, "Registro eliminado."
         except Exception as e:
             conn.rollback()
@@ -111,7 +169,11 @@ class PayrollDAO:
             conn.close()
             
     # --- MÉTODO ESPECIAL PARA REPORTE/CONSULTA MASIVA ---
-    def get_payroll_summary_by_period(self, anio, mes):
+    def get_payroll_summary_by_period(self, anio, mes, limit=None, offset=0, order_by=None, descending=False):
+        """
+        Planilla del periodo con datos de empleado y puesto. Sin limit devuelve todo;
+        con limit/offset/order_by una página ordenada (tabla virtual de PayrollView).
+        """
         conn = self.db.get_connection()
         try:
             cursor = conn.cursor()
@@ -128,13 +190,32 @@ class PayrollDAO:
                 JOIN empleados e ON c.id_empleado = e.id_empleado
                 JOIN cat_puestos p ON c.id_puesto = p.id_puesto
                 WHERE nm.anio = ? AND nm.mes = ?
-                ORDER BY e.apellidos
-            """
-            cursor.execute(query, (anio, mes))
+                ORDER BY {order}
+                LIMIT ? OFFSET ?
+            """.format(order=order_clause(self.SUMMARY_SORT_COLUMNS, order_by, descending,
+                                         "e.apellidos", "nm.id_nomina"))
+            cursor.execute(query, (anio, mes) + page_params(limit, offset))
             return cursor.fetchall()
         finally:
             conn.close()
 
+    def get_payroll_period_totals(self, anio, mes):
+        """(registros, total pagado) del periodo, sin traer las filas (mismos JOIN que el resumen)."""
+        conn = self.db.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT COUNT(*), COALESCE(SUM(nm.total_pagado), 0)
+                FROM nominas_mensuales nm
+                JOIN contratos c ON nm.id_contrato = c.id_contrato
+                JOIN empleados e ON c.id_empleado = e.id_empleado
+                JOIN cat_puestos p ON c.id_puesto = p.id_puesto
+                WHERE nm.anio = ? AND nm.mes = ?
+            """, (anio, mes))
+            return cursor.fetchone()
+        finally:
+            conn.close()
+
     def delete_period(self, anio, mes):
         """Elimina TODOS los registros de nómina de un mes y año específicos."""
         conn = self.db.get_connection()
@@ -150,6 +231,7 @@ class PayrollDAO:
             # Ejecutamos borrado
             cursor.execute("DELETE FROM nominas_mensuales WHERE anio=? AND mes=?", (anio, mes))
             conn.commit()
+            DataEvents.notify('nominas')
             return True, f"Se eliminaron {count} registros del periodo {mes}/{anio}."
         except Exception as e:
             conn.rollback()
@@ -0,0 +1,52 @@
+import re
+
+# Índice de búsqueda de texto completo (SQLite FTS5, migración v7).
+# - fts_empleados: rowid = id_empleado  (codigo, dni, nombres, apellidos)
+# - fts_contratos: rowid = id_contrato  (mismas columnas del empleado + puesto)
+# Lo mantienen los triggers trg_fts_* sobre empleados, contratos y cat_puestos.
+# El DNI se indexa tal cual y sin guiones, para encontrar "0801-1990-..." tecleando "08011990".
+
+SEARCH_INDEX_PREFIX = 'fts_' # Tablas del índice (y sus tablas internas *_data, *_idx...): no se respaldan
+
+# Pesos bm25 por columna (más relevante coincidir en código/DNI que en el puesto)
+EMPLOYEE_WEIGHTS = "bm25(fts_empleados, 10.0, 8.0, 4.0, 4.0)"
+CONTRACT_WEIGHTS = "bm25(fts_contratos, 10.0, 8.0, 4.0, 4.0, 1.0)"
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def match_expression(term):
+    """
+    Texto libre del usuario -> consulta MATCH de FTS5: cada palabra como prefijo y todas requeridas.
+    'gar mar' -> '"gar"* "mar"*'. Retorna None si no hay palabras (mostrar listado por defecto).
+    Las comillas evitan que la sintaxis de FTS5 (AND, OR, NEAR, -, :) del usuario rompa la consulta.
+    """
+    tokens = _TOKEN.findall(term or "")
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def is_index_table(table_name):
+    """True para las tablas del índice FTS y sus tablas internas."""
+    return table_name.startswith(SEARCH_INDEX_PREFIX)
+
+
+def rebuild(cursor):
+    """Reconstruye el índice completo (restauración masiva con triggers apagados)."""
+    cursor.execute("DELETE FROM fts_empleados")
+    cursor.execute("""
+        INSERT INTO fts_empleados (rowid, codigo, dni, nombres, apellidos)
+        SELECT id_empleado, codigo, COALESCE(dni, '') || ' ' || replace(COALESCE(dni, ''), '-', ''),
+               nombres, apellidos
+        FROM empleados
+    """)
+    cursor.execute("DELETE FROM fts_contratos")
+    cursor.execute("""
+        INSERT INTO fts_contratos (rowid, codigo, dni, nombres, apellidos, puesto)
+        SELECT c.id_contrato, e.codigo, COALESCE(e.dni, '') || ' ' || replace(COALESCE(e.dni, ''), '-', ''),
+               e.nombres, e.apellidos, p.nombre_puesto
+        FROM contratos c
+        JOIN empleados e ON e.id_empleado = c.id_empleado
+        LEFT JOIN cat_puestos p ON p.id_puesto = c.id_puesto
+    """)
@@ -1,6 +1,7 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from models.contract_dao import ContractDAO
+from views.task_executor import TaskRunner
 
 class ContractSelector(ttk.Toplevel):
     def __init__(self, parent, callback):
@@ -9,6 +10,7 @@ class ContractSelector(ttk.Toplevel):
         self.geometry("800x500")
         self.callback = callback # Función a ejecutar al seleccionar (id_contrato)
         self.dao = ContractDAO()
+        self.tasks = TaskRunner(self)
         
         self._setup_ui()
         # Cargar inicial (opcional, o dejar vacío)
@@ -23,6 +25,7 @@ class ContractSelector(ttk.Toplevel):
         self.entry_search = ttk.Entry(search_frame, width=40)
         self.entry_search.pack(side=LEFT, padx=5, fill=X, expand=True)
         self.entry_search.bind("<Return>", lambda e: self.search())
+        self.entry_search.bind("<KeyRelease>", lambda e: self.search()) # Índice FTS: búsqueda al teclear
         
         ttk.Button(search_frame, text="🔍 Buscar", command=self.search, bootstyle="primary").pack(side=LEFT, padx=5)
 
@@ -57,10 +60,13 @@ class ContractSelector(ttk.Toplevel):
 
     def search(self):
         term = self.entry_search.get().strip()
+        # En segundo plano; una búsqueda nueva descarta la anterior
+        self.tasks.submit(self.dao.search_contracts, term, on_done=self._show_results, key='busqueda')
+
+    def _show_results(self, rows):
         for item in self.tree.get_children():
             self.tree.delete(item)
             
-        rows = self.dao.search_contracts(term)
         for r in rows:
             # r = (id, emp, puesto, tipo, inicio, estado)
             self.tree.insert("", END, values=r)
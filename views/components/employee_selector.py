@@ -1,6 +1,8 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from models.employee_dao import EmployeeDAO
+from views.components.virtual_table import VirtualTable, QuerySource
+from views.task_executor import TaskRunner
 
 class EmployeeSelector(ttk.Toplevel):
     def __init__(self, parent, callback):
@@ -9,6 +11,7 @@ class EmployeeSelector(ttk.Toplevel):
         self.geometry("600x400")
         self.callback = callback # Función a ejecutar al seleccionar
         self.dao = EmployeeDAO()
+        self.tasks = TaskRunner(self)
         
         self._setup_ui()
         self._load_data()
@@ -25,9 +28,10 @@ class EmployeeSelector(ttk.Toplevel):
         entry.pack(side=LEFT, fill=X, expand=True, padx=5)
         entry.focus() # Poner cursor aquí automáticamente
 
-        # Tabla
+        # Tabla virtual: con el filtro vacío no se cargan los cientos de empleados, solo la página visible
         cols = ("id", "codigo", "nombre", "dni")
-        self.tree = ttk.Treeview(self, columns=cols, show="headings", bootstyle="primary")
+        self.table = VirtualTable(self, columns=cols, render=self._render_row, bootstyle="primary")
+        self.tree = self.table.tree
         self.tree.heading("id", text="ID")
         self.tree.heading("codigo", text="Código")
         self.tree.heading("nombre", text="Nombre Completo")
@@ -38,43 +42,38 @@ class EmployeeSelector(ttk.Toplevel):
         self.tree.column("dni", width=100)
         self.tree.column("nombre", width=250)
         
-        self.tree.pack(fill=BOTH, expand=True, padx=10, pady=5)
+        self.table.pack(fill=BOTH, expand=True, padx=10, pady=5)
         
         # Doble clic selecciona
         self.tree.bind("<Double-1>", self._on_select)
         
         ttk.Button(self, text="Seleccionar", command=self._on_select, bootstyle="success").pack(pady=10)
 
-    def _load_data(self):
-        # Traemos todos los empleados (optimización: si son miles, limitar query)
-        self.all_data = self.dao.get_all() 
-        # get_all retorna tuplas: (id, codigo, dni, nombres, apellidos, nac)
-        # Procesamos para tener "Nombre Completo"
-        self.processed_data = []
-        for r in self.all_data:
-            nombre_completo = f"{r[3]} {r[4]}"
-            self.processed_data.append((r[0], r[1], nombre_completo, r[2]))
-            
-        self._populate_tree(self.processed_data)
+    def _load_data(self, term=""):
+        # Búsqueda en BD con el índice de texto completo (no se cargan todos los empleados en memoria)
+        # Se cuenta una vez (en segundo plano: al teclear rápido solo vale la última búsqueda)
+        # y la tabla pide a search_employees solo las páginas que muestra
+        self.tasks.submit(self.dao.count_search_employees, term,
+                          on_done=lambda total: self._show_results(term, total), key='busqueda')
 
-    def _populate_tree(self, data):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        for row in data:
-            self.tree.insert("", END, values=row)
+    def _show_results(self, term, total):
+        self.table.set_source(QuerySource(
+            lambda: total,
+            lambda offset, limit, order_by, desc: self.dao.search_employees(term, limit, offset, order_by, desc),
+            sortable=self.dao.SEARCH_SORT_COLUMNS,
+        ))
+
+    @staticmethod
+    def _render_row(r):
+        # search_employees retorna tuplas: (id, codigo, dni, nombres, apellidos, nac)
+        return (r[0], r[1], f"{r[3]} {r[4]}", r[2]), ()
 
     def _filter_data(self, *args):
-        query = self.var_search.get().lower()
-        filtered = [
-            row for row in self.processed_data 
-            if query in row[1].lower() or query in row[2].lower() or query in row[3].lower()
-        ]
-        self._populate_tree(filtered)
+        self._load_data(self.var_search.get())
 
     def _on_select(self, event=None):
-        selected = self.tree.focus()
-        if selected:
-            values = self.tree.item(selected, 'values')
+        row = self.table.selected_row()
+        if row:
             # Retornamos ID, Código y Nombre a la ventana padre
-            self.callback(values[0], values[1], values[2]) 
+            self.callback(row[0], row[1], f"{row[3]} {row[4]}")
             self.destroy()
\ No newline at end of file
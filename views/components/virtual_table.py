@@ -0,0 +1,355 @@
+from collections import OrderedDict
+import ttkbootstrap as ttk
+from ttkbootstrap.constants import *
+from ttkbootstrap.dialogs import Messagebox
+from views.task_executor import TaskRunner
+
+# Tabla virtual: el Treeview solo tiene materializadas las filas que entran en pantalla
+# (se reutilizan los mismos items y se les cambian los valores al desplazarse). Los datos
+# llegan por páginas desde una "fuente", así miles de filas no congelan Tk al cargarse.
+# Las páginas se piden en segundo plano (pool compartido de views/task_executor.py): mientras
+# llega una página sus filas se muestran como "cargando" y se redibujan al llegar; las páginas
+# vecinas a las visibles se piden por adelantado.
+#
+# Contrato de una fuente:
+#   count()                      -> total de filas (sin consultar: se calcula antes de set_source)
+#   fetch(offset, limit)         -> filas crudas de ese rango (tuplas o dicts); corre en un hilo
+#                                   de trabajo salvo que la fuente tenga in_memory = True
+#   sortable(columna)            -> True si se puede ordenar por esa columna
+#   sort(columna, descendente)   -> fija el orden para los próximos fetch
+
+
+def _sort_key(key):
+    """Envuelve la llave para que los None no rompan la comparación (quedan al final)."""
+    def wrapped(row):
+        value = key(row)
+        return (value is None, value)
+    return wrapped
+
+
+class ListSource:
+    """Filas ya en memoria (resultados chicos o calculados): se ordenan en Python, sin consultar."""
+    in_memory = True # fetch no toca la BD: se llama directo, sin pasar por el pool
+
+    def __init__(self, rows=(), sort_keys=None):
+        self.rows = list(rows)
+        self.sort_keys = sort_keys or {} # {columna: callable(fila) -> valor crudo}
+
+    def count(self):
+        return len(self.rows)
+
+    def fetch(self, offset, limit):
+        return self.rows[offset:offset + limit]
+
+    def sortable(self, column):
+        return column in self.sort_keys
+
+    def sort(self, column, descending):
+        self.rows.sort(key=_sort_key(self.sort_keys[column]), reverse=descending)
+
+
+class QuerySource:
+    """
+    Filas paginadas desde el DAO. El DAO ordena en SQL (lista blanca de columnas) y devuelve
+    solo la página pedida: ordenar no vuelve a traer todo, solo la página visible.
+        count_fn()                                    -> total
+        fetch_fn(offset, limit, order_by, descending) -> filas
+    """
+
+    def __init__(self, count_fn, fetch_fn, sortable=()):
+        self._count_fn = count_fn
+        self._fetch_fn = fetch_fn
+        self._sortable = set(sortable)
+        self._total = None
+        self.order_by = None
+        self.descending = False
+
+    def count(self):
+        if self._total is None: # Una consulta por fuente: para recontar se arma una fuente nueva
+            self._total = self._count_fn()
+        return self._total
+
+    def fetch(self, offset, limit):
+        return self._fetch_fn(offset, limit, self.order_by, self.descending)
+
+    def sortable(self, column):
+        return column in self._sortable
+
+    def sort(self, column, descending):
+        self.order_by, self.descending = column, descending
+
+
+class VirtualTable(ttk.Frame):
+    """
+    Treeview + scrollbar propios. Uso:
+        table = VirtualTable(parent, columns=cols, render=fila_a_valores)
+        table.tree.heading(...) / table.tree.column(...) / table.tree.tag_configure(...)  # como siempre
+        table.set_source(QuerySource(...))
+        table.selected_row()   # fila CRUDA seleccionada (no el texto formateado)
+    render(fila) -> (valores, tags) convierte la fila cruda en lo que se muestra.
+    row_key(fila) identifica la fila para conservar la selección al desplazarse u ordenar.
+    """
+    PAGE_CACHE = 8   # Páginas recientes en memoria (el resto se vuelve a pedir a la fuente)
+    WHEEL_ROWS = 3   # Filas por paso de la rueda del ratón
+    LOADING_TEXT = "…"
+
+    def __init__(self, parent, columns, render=None, row_key=None, page_size=200, **tree_options):
+        super().__init__(parent)
+        self.render = render or (lambda row: (row, ()))
+        self.row_key = row_key or (lambda row: row[0])
+        self.page_size = page_size
+
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", **tree_options)
+        self.scrollbar = ttk.Scrollbar(self, orient=VERTICAL, command=self._on_scrollbar)
+        self.tree.pack(side=LEFT, fill=BOTH, expand=True)
+        self.scrollbar.pack(side=RIGHT, fill=Y)
+
+        # Runner propio (mismo pool compartido): desplazarse no cambia el estado "ocupado" de la
+        # vista (cursor, botón de guardar) y al cambiar de fuente se descartan sus páginas pendientes
+        self.tasks = TaskRunner(self)
+        self.source = ListSource()
+        self._pages = OrderedDict()   # {n° de página: filas}
+        self._loading = set()         # Páginas pedidas que todavía no llegan
+        self._pending_index = None    # Fila elegida con el teclado que aún estaba cargando
+        self._items = []              # iids materializados (uno por fila visible)
+        self._rows_by_item = {}       # iid -> fila cruda mostrada
+        self._top = 0                 # Índice de la primera fila visible
+        self._visible = int(self.tree.cget("height")) # Se corrige con el alto real al dibujarse
+        self._selected_key = None
+        self._sort = None             # (columna, descendente)
+        self._heading_text = {}       # Texto original de los encabezados (sin la flecha de orden)
+
+        self.tree.tag_configure('cargando', foreground='#999999')
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<MouseWheel>", self._on_wheel)  # Windows / macOS
+        self.tree.bind("<Button-4>", self._on_wheel)    # Linux
+        self.tree.bind("<Button-5>", self._on_wheel)
+        for key in ("<Up>", "<Down>", "<Prior>", "<Next>", "<Home>", "<End>"):
+            self.tree.bind(key, self._on_key)
+
+    # --- API ---
+
+    def set_source(self, source, keep_position=False):
+        """Muestra otra fuente. keep_position conserva desplazamiento y selección (recargas)."""
+        self.source = source
+        self._reset_pages()
+        if not keep_position:
+            self._top = 0
+            self._selected_key = None
+            self._pending_index = None
+        if self._sort and source.sortable(self._sort[0]):
+            source.sort(*self._sort) # El orden elegido se mantiene al recargar
+        for column in self.tree["columns"]:
+            command = (lambda c=column: self.sort_by(c)) if source.sortable(column) else ""
+            self.tree.heading(column, command=command)
+        if self._sort:
+            self._update_headings()
+        self._render()
+        self.after_idle(self._on_resize) # Con la primera fila dibujada ya se puede medir el alto real
+
+    def clear(self):
+        self.set_source(ListSource())
+
+    def sort_by(self, column):
+        """Clic en el encabezado: alterna ascendente/descendente. Solo se piden las páginas visibles."""
+        descending = self._sort == (column, False)
+        self._sort = (column, descending)
+        self.source.sort(column, descending)
+        self._reset_pages()
+        self._top = 0
+        self._update_headings()
+        self._render()
+
+    def selected_row(self):
+        """Fila cruda seleccionada (o None, también si la fila todavía está cargando)."""
+        selection = self.tree.selection()
+        return self._rows_by_item.get(selection[0]) if selection else None
+
+    def total(self):
+        return self.source.count()
+
+    # --- Dibujo ---
+
+    def _render(self):
+        total = self.source.count()
+        self._top = max(0, min(self._top, total - self._visible))
+        rows = self._rows(self._top, min(self._visible, total - self._top))
+
+        # Se reutilizan los items existentes: cambiar valores es mucho más barato que borrar/insertar
+        while len(self._items) < len(rows):
+            self._items.append(self.tree.insert("", END))
+        while len(self._items) > len(rows):
+            self.tree.delete(self._items.pop())
+
+        self._rows_by_item = {}
+        selected = None
+        loading = (self.LOADING_TEXT,) * len(self.tree["columns"])
+        for index, (iid, row) in enumerate(zip(self._items, rows), self._top):
+            if row is None: # Página en camino
+                self.tree.item(iid, values=loading, tags=('cargando',))
+                continue
+            if index == self._pending_index:
+                self._selected_key, self._pending_index = self.row_key(row), None
+            values, tags = self.render(row)
+            self.tree.item(iid, values=values, tags=tags)
+            self._rows_by_item[iid] = row
+            if self._selected_key is not None and self.row_key(row) == self._selected_key:
+                selected = iid
+
+        if selected:
+            self.tree.selection_set(selected)
+            self.tree.focus(selected)
+        elif self.tree.selection():
+            self.tree.selection_remove(self.tree.selection()) # La seleccionada quedó fuera de pantalla
+        self.tree.yview_moveto(0) # El Treeview nunca se desplaza solo: lo hacemos cambiando filas
+
+        if total:
+            self.scrollbar.set(self._top / total, (self._top + len(rows)) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _rows(self, start, count):
+        """Filas del rango; None en las posiciones cuya página todavía no llegó."""
+        if count <= 0:
+            return []
+        first_page, last_page = start // self.page_size, (start + count - 1) // self.page_size
+        rows = []
+        for page in range(first_page, last_page + 1):
+            data = self._page(page)
+            if data is None:
+                data = [None] * (min(self.page_size, self.source.count() - page * self.page_size))
+            rows.extend(data)
+        # Las vecinas se piden ya: al seguir desplazándose normalmente ya están en memoria
+        self._request(first_page - 1)
+        self._request(last_page + 1)
+        offset = start - first_page * self.page_size
+        return rows[offset:offset + count]
+
+    def _page(self, page):
+        rows = self._pages.get(page)
+        if rows is not None:
+            self._pages.move_to_end(page)
+            return rows
+        if getattr(self.source, 'in_memory', False):
+            rows = self.source.fetch(page * self.page_size, self.page_size)
+            self._store(page, rows)
+            return rows
+        self._request(page)
+        return None
+
+    def _request(self, page):
+        """Pide la página en segundo plano (si existe y no está en memoria ni en camino)."""
+        if (page < 0 or page in self._pages or page in self._loading
+                or page * self.page_size >= self.source.count()):
+            return
+        if getattr(self.source, 'in_memory', False):
+            return # Se lee directo cuando se muestra
+        self._loading.add(page)
+        self.tasks.submit(self.source.fetch, page * self.page_size, self.page_size,
+                          on_done=lambda rows: self._page_loaded(page, rows),
+                          on_error=lambda e: self._page_failed(page, e),
+                          key=('pagina', page))
+
+    def _page_loaded(self, page, rows):
+        self._loading.discard(page)
+        self._store(page, rows)
+        first_visible, last_visible = self._top // self.page_size, (self._top + self._visible - 1) // self.page_size
+        if first_visible <= page <= last_visible:
+            self._render()
+
+    def _page_failed(self, page, error):
+        self._loading.discard(page) # Se vuelve a pedir al próximo dibujado
+        Messagebox.show_error(f"No se pudieron cargar las filas: {error}", "Error")
+
+    def _store(self, page, rows):
+        self._pages[page] = rows
+        self._pages.move_to_end(page)
+        if len(self._pages) > self.PAGE_CACHE:
+            self._pages.popitem(last=False)
+
+    def _reset_pages(self):
+        """Otra fuente u otro orden: páginas en memoria y pedidos en curso ya no sirven."""
+        self._pages.clear()
+        self._loading.clear()
+        self.tasks.cancel() # Lo que ya corre llega como descartado (misma clave, future distinto)
+
+    def _update_headings(self):
+        for column in self.tree["columns"]:
+            text = self._heading_text.setdefault(column, self.tree.heading(column, "text"))
+            if self._sort and self._sort[0] == column and self.source.sortable(column):
+                text = f"{text} {'▼' if self._sort[1] else '▲'}"
+            self.tree.heading(column, text=text)
+
+    def _fit_rows(self):
+        """Filas completas que entran en el alto actual (medido con la primera fila dibujada)."""
+        bbox = self.tree.bbox(self._items[0]) if self._items else ""
+        if not bbox:
+            return self._visible
+        header, row_height = bbox[1], bbox[3]
+        return max(1, (self.tree.winfo_height() - header) // max(1, row_height))
+
+    # --- Eventos ---
+
+    def _on_resize(self, event=None):
+        visible = self._fit_rows()
+        if visible != self._visible:
+            self._visible = visible
+            self._render()
+
+    def _on_select(self, event=None):
+        row = self.selected_row()
+        if row is not None: # Deseleccionar al desplazarse no borra la fila recordada
+            self._selected_key = self.row_key(row)
+            self._pending_index = None
+
+    def _scroll_to(self, top):
+        top = max(0, min(top, self.source.count() - self._visible))
+        if top != self._top:
+            self._top = top
+            self._render()
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self._scroll_to(int(float(amount) * self.source.count()))
+        else:
+            step = self._visible if unit == "pages" else 1
+            self._scroll_to(self._top + int(amount) * step)
+
+    def _on_wheel(self, event):
+        up = event.num == 4 or getattr(event, "delta", 0) > 0
+        self._scroll_to(self._top + (-1 if up else 1) * self.WHEEL_ROWS)
+        return "break"
+
+    def _on_key(self, event):
+        """Navegación con teclado sobre el total de filas (no solo las dibujadas)."""
+        total = self.source.count()
+        if not total:
+            return "break"
+        selection = self.tree.selection()
+        if selection and selection[0] in self._items:
+            current = self._top + self._items.index(selection[0])
+        elif self._pending_index is not None:
+            current = self._pending_index
+        else:
+            current = self._top - 1
+        moves = {"Up": -1, "Down": 1, "Prior": -self._visible, "Next": self._visible}
+        if event.keysym == "Home":
+            target = 0
+        elif event.keysym == "End":
+            target = total - 1
+        else:
+            target = current + moves[event.keysym]
+        target = max(0, min(target, total - 1))
+
+        if target < self._top:
+            self._top = target
+        elif target >= self._top + self._visible:
+            self._top = target - self._visible + 1
+        row = self._rows(target, 1)[0]
+        if row is None: # Todavía cargando: se selecciona cuando llegue su página
+            self._selected_key, self._pending_index = None, target
+        else:
+            self._selected_key, self._pending_index = self.row_key(row), None
+        self._render()
+        return "break"
@@ -1,15 +1,20 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
+from config import settings
 from views import styles
-from views.modules.payroll_view import PayrollView
+from views.view_registry import ViewRegistry, lazy_view
 
-# Importaciones de vistas
-from views.modules.employees_view import EmployeesView
-from views.modules.contracts_view import ContractsView
-from views.modules.configuration_view import ConfigurationView
-from views.modules.attendance_view import AttendanceView
-from views.modules.vacation_balance_view import VacationBalanceView
-from views.modules.reports_view import ReportsView
+# Vistas de módulo: menú -> (módulo, clase). Se importan al primer clic, no al arrancar
+# (Reportes/Nóminas arrastran pandas, numpy y openpyxl)
+MODULE_VIEWS = {
+    "Empleados": ("views.modules.employees_view", "EmployeesView"),
+    "Contratos": ("views.modules.contracts_view", "ContractsView"),
+    "Configuración": ("views.modules.configuration_view", "ConfigurationView"),
+    "Inasistencias": ("views.modules.attendance_view", "AttendanceView"),
+    "Saldo Vacaciones": ("views.modules.vacation_balance_view", "VacationBalanceView"),
+    "Reportes": ("views.modules.reports_view", "ReportsView"),
+    "Nóminas": ("views.modules.payroll_view", "PayrollView"),
+}
 
 class MainWindow(ttk.Frame):
     """
@@ -38,6 +43,12 @@ class MainWindow(ttk.Frame):
         self.content_frame = ttk.Frame(self, padding=styles.PAD_DEFAULT)
         self.content_frame.pack(side=RIGHT, fill=BOTH, expand=True)
 
+        # Vistas de módulo vivas (se pasa SIEMPRE self.controller)
+        self.views = ViewRegistry(self.content_frame, {
+            modulo: lazy_view(module_name, class_name, self.controller)
+            for modulo, (module_name, class_name) in MODULE_VIEWS.items()
+        }, max_views=settings.VIEW_CACHE_MAX)
+
         # Mensaje de bienvenida
         lbl_welcome = ttk.Label(
             self.content_frame, 
@@ -93,40 +104,22 @@ class MainWindow(ttk.Frame):
         lbl_version.pack(side=BOTTOM, pady=10)
 
     def navegar_a(self, modulo):
-        """Gestor de navegación"""
+        """Gestor de navegación: cada módulo se construye una vez y luego solo se oculta/muestra"""
         print(f"Navegando a: {modulo}")
         
-        # 1. Limpiar el contenido actual (Eliminar widgets previos)
+        # 1. Quitar lo que no es una vista viva (bienvenida, placeholder)
         for widget in self.content_frame.winfo_children():
-            widget.destroy()
+            if not self.views.owns(widget):
+                widget.destroy()
 
-        # 2. Cargar la vista solicitada pasando SIEMPRE self.controller
-        if modulo == "Empleados":
-            EmployeesView(self.content_frame, self.controller) 
-            
-        elif modulo == "Contratos":
-            ContractsView(self.content_frame, self.controller)
-            
-        elif modulo == "Configuración":
-            # Nota: Si ConfigurationView no usa controller, quitar el segundo argumento
-            ConfigurationView(self.content_frame, self.controller)
-            
-        elif modulo == "Inasistencias":
-            AttendanceView(self.content_frame, self.controller)
-            
-        elif modulo == "Saldo Vacaciones":
-            VacationBalanceView(self.content_frame, self.controller)
-            
-        elif modulo == "Reportes":
-            ReportsView(self.content_frame, self.controller)
-        
-        elif modulo == "Nóminas":
-            PayrollView(self.content_frame, self.controller)
-            
+        # 2. Mostrar la vista solicitada (se refresca sola si sus datos cambiaron)
+        if modulo in self.views:
+            self.views.show(modulo)
         else:
             # Placeholder para módulos no hechos aún
+            self.views.hide()
             ttk.Label(
                 self.content_frame, 
                 text=f"Módulo {modulo} en construcción...", 
                 bootstyle="warning"
-            ).pack(pady=50)
\ No newline at end of file
+            ).pack(pady=50)
@@ -7,19 +7,26 @@ from tkinter.simpledialog import askfloat
 # Importaciones del proyecto
 from views.components.employee_selector import EmployeeSelector
 from models.attendance_dao import AttendanceDAO
+from views.components.virtual_table import VirtualTable, QuerySource
+from views.task_executor import TaskRunner
 from logics.time_calculator import TimeCalculator
 
 class AttendanceView(ttk.Frame):
+    # Áreas de datos que muestra: al volver a la pantalla se refresca solo si cambiaron (ViewRegistry)
+    DATA_TOPICS = ('catalogos', 'inasistencias', 'kardex')
+
     def __init__(self, parent, controller=None):
         super().__init__(parent)
         self.pack(fill=BOTH, expand=True)
         self.controller = controller
         self.dao = AttendanceDAO() # Instancia local para datos directos
+        self.tasks = TaskRunner(self, on_busy=self._set_busy) # Consultas y guardados fuera del hilo de Tk
         
         # --- ESTADOS Y VARIABLES ---
         self.current_emp_id = None
         self.contracts_map = [] # [(id, texto), ...]
         self.types_map = []     # [(id, texto), ...]
+        self.current_weekmask = None # Días laborables de la jornada del contrato elegido
         
         # Variables de Fecha (Con valores por defecto hoy)
         hoy = datetime.now().strftime("%Y-%m-%d")
@@ -138,7 +145,8 @@ class AttendanceView(ttk.Frame):
         self.entry_detalle.pack(fill=X, pady=5)
 
         # Botón Guardar
-        ttk.Button(form_frame, text="GUARDAR REGISTRO", command=self._handle_save, bootstyle="success").pack(fill=X, pady=20)
+        self.btn_save = ttk.Button(form_frame, text="GUARDAR REGISTRO", command=self._handle_save, bootstyle="success")
+        self.btn_save.pack(fill=X, pady=20)
 
         # Botón Ajuste Manual Saldo (Extra)
         ttk.Button(form_frame, text="Ajuste Manual Saldo", command=self.add_balance_manual, bootstyle="secondary-outline").pack(fill=X)
@@ -148,7 +156,9 @@ class AttendanceView(ttk.Frame):
         hist_frame.pack(side=RIGHT, fill=BOTH, expand=True, padx=(5, 0))
 
         cols = ("id", "ini", "fin", "tipo", "puesto")
-        self.tree = ttk.Treeview(hist_frame, columns=cols, show="headings", height=10)
+        # Tabla virtual: solo filas visibles, páginas del DAO al desplazarse, orden por columna en SQL
+        self.history = VirtualTable(hist_frame, columns=cols, render=lambda r: (r[:5], ()), height=10)
+        self.tree = self.history.tree
         
         self.tree.heading("id", text="ID")
         self.tree.column("id", width=40, stretch=False)
@@ -159,17 +169,25 @@ class AttendanceView(ttk.Frame):
         self.tree.heading("tipo", text="Motivo")
         self.tree.heading("puesto", text="Puesto Afectado")
         
-        self.tree.pack(fill=BOTH, expand=True)
+        self.history.pack(fill=BOTH, expand=True)
         
         ttk.Button(hist_frame, text="Eliminar Seleccionado", command=self.delete_record, bootstyle="danger-outline").pack(anchor=E, pady=5)
 
     # --- LÓGICA DE NEGOCIO ---
 
     def _load_initial_catalogs(self):
-        """Carga los tipos de inasistencia al iniciar"""
+        """Carga los tipos de inasistencia al iniciar (catálogo en memoria: no necesita segundo plano)"""
         self.types_map = self.dao.get_tipos_inasistencia_combo()
+        self.types_by_name = {x[1]: x[0] for x in self.types_map}
         self.cb_tipo['values'] = [x[1] for x in self.types_map]
 
+    def refresh(self):
+        """Recarga tipos, saldo e historial conservando el empleado seleccionado"""
+        self._load_initial_catalogs()
+        if self.current_emp_id:
+            self.on_contract_change(None)
+            self._refresh_history(keep_position=True)
+
     def open_search(self):
         EmployeeSelector(self, self.on_employee_selected)
 
@@ -177,8 +195,13 @@ class AttendanceView(ttk.Frame):
         self.current_emp_id = emp_id
         self.lbl_emp_info.config(text=f"{emp_code} - {emp_name}", bootstyle="primary")
         
-        # Cargar Contratos
-        self.contracts_map = self.dao.get_active_contracts_by_employee(emp_id)
+        # Cargar Contratos (si se elige otro empleado antes de que lleguen, se descartan)
+        self.tasks.submit(self.dao.get_active_contracts_by_employee, emp_id,
+                          on_done=self._show_contracts, key='contratos')
+        self._refresh_history()
+
+    def _show_contracts(self, contracts):
+        self.contracts_map = contracts
         
         if not self.contracts_map:
             Messagebox.show_warning("El empleado no tiene contratos activos.")
@@ -192,8 +215,6 @@ class AttendanceView(ttk.Frame):
             self.cb_contrato['values'] = nombres_contratos
             self.cb_contrato.current(0) 
             self.on_contract_change(None)
-            
-        self._refresh_history()
 
     def on_contract_change(self, event):
         txt_contrato = self.cb_contrato.get()
@@ -201,9 +222,24 @@ class AttendanceView(ttk.Frame):
         
         id_contrato = next((x[0] for x in self.contracts_map if x[1] == txt_contrato), None)
         if id_contrato:
-            saldo = self.dao.get_kardex_balance(id_contrato)
-            color = "success" if saldo > 0 else "danger"
-            self.lbl_saldo.config(text=f"Saldo Disponible: {saldo} días", bootstyle=color)
+            self.tasks.submit(self._fetch_contract_state, id_contrato,
+                              on_done=self._show_contract_state, key='saldo')
+
+    def _fetch_contract_state(self, id_contrato):
+        """Hilo de trabajo: saldo del kardex y días laborables de la jornada"""
+        return self.dao.get_kardex_balance(id_contrato), self.dao.get_contract_weekmask(id_contrato)
+
+    def _show_contract_state(self, state):
+        saldo, self.current_weekmask = state
+        color = "success" if saldo > 0 else "danger"
+        self.lbl_saldo.config(text=f"Saldo Disponible: {saldo} días", bootstyle=color)
+
+        # La jornada define qué días cuentan: recalculamos la sugerencia con ella
+        self._on_dates_changed()
+
+    def _set_busy(self, busy):
+        self.configure(cursor="watch" if busy else "")
+        self.btn_save.configure(state="disabled" if busy else "normal")
 
     def toggle_hours_inputs(self):
         """Alterna entre vista de Fechas (Días) y Vista de Horas"""
@@ -233,7 +269,7 @@ class AttendanceView(ttk.Frame):
 
         try:
             dias_sugeridos = TimeCalculator.calculate_duration(
-                fecha_ini=f_ini, fecha_fin=f_fin, es_por_horas=False
+                fecha_ini=f_ini, fecha_fin=f_fin, es_por_horas=False, weekmask=self.current_weekmask
             )
             self.var_dias_calculados.set(dias_sugeridos)
         except Exception:
@@ -251,7 +287,7 @@ class AttendanceView(ttk.Frame):
         id_contrato = next((x[0] for x in self.contracts_map if x[1] == txt_contrato), None)
         
         txt_tipo = self.cb_tipo.get()
-        id_tipo = next((x[0] for x in self.types_map if x[1] == txt_tipo), None)
+        id_tipo = self.types_by_name.get(txt_tipo)
 
         # 3. Obtener Datos de Tiempo
         es_por_horas = self.var_es_por_horas.get()
@@ -278,8 +314,10 @@ class AttendanceView(ttk.Frame):
 
         detalle = self.entry_detalle.get() or "Sin observación"
 
-        # 6. LLAMADA AL DAO (Pasando dias_manual)
-        success, message = self.dao.insert_inasistencia(
+        # 6. LLAMADA AL DAO (Pasando dias_manual), en segundo plano
+        self.tasks.submit(
+            self.dao.insert_inasistencia,
+            on_done=self._on_saved,
             id_con=id_contrato,
             id_tipo=id_tipo,
             f_ini=f_ini,
@@ -291,6 +329,8 @@ class AttendanceView(ttk.Frame):
             dias_manual=dias_finales # <--- AQUÍ SE ENVÍA LO QUE EL USUARIO EDITÓ
         )
 
+    def _on_saved(self, result):
+        success, message = result
         if success:
             Messagebox.show_info(message, "Éxito")
             self.entry_detalle.delete(0, END)
@@ -299,27 +339,40 @@ class AttendanceView(ttk.Frame):
         else:
             Messagebox.show_error(message, "Error de Base de Datos")
 
-    def _refresh_history(self):
-        for item in self.tree.get_children(): self.tree.delete(item)
-        if not self.current_emp_id: return
+    def _refresh_history(self, keep_position=False):
+        if not self.current_emp_id:
+            self.history.clear()
+            return
 
-        rows = self.dao.get_history_by_employee(self.current_emp_id)
-        for r in rows:
-            self.tree.insert("", END, values=r[:5])
+        id_empleado = self.current_emp_id
+        self.tasks.submit(self.dao.count_history_by_employee, id_empleado,
+                          on_done=lambda total: self._show_history(id_empleado, total, keep_position),
+                          key='historial')
+
+    def _show_history(self, id_empleado, total, keep_position):
+        self.history.set_source(QuerySource(
+            lambda: total,
+            lambda offset, limit, order_by, desc: self.dao.get_history_by_employee(
+                id_empleado, limit, offset, order_by, desc),
+            sortable=self.dao.HISTORY_SORT_COLUMNS,
+        ), keep_position=keep_position)
 
     def delete_record(self):
-        sel = self.tree.selection()
-        if not sel: return
+        row = self.history.selected_row()
+        if not row: return
         
-        id_inasistencia = self.tree.item(sel[0])['values'][0]
+        id_inasistencia = row[0]
         
         if Messagebox.yesno("¿Eliminar este registro y revertir el saldo?", "Confirmar") == 'Yes':
-            ok, msg = self.dao.delete_inasistencia(id_inasistencia)
-            if ok:
-                self._refresh_history()
-                self.on_contract_change(None) 
-            else:
-                Messagebox.show_error(msg, "Error")
+            self.tasks.submit(self.dao.delete_inasistencia, id_inasistencia, on_done=self._on_deleted)
+
+    def _on_deleted(self, result):
+        ok, msg = result
+        if ok:
+            self._refresh_history(keep_position=True)
+            self.on_contract_change(None) 
+        else:
+            Messagebox.show_error(msg, "Error")
 
     def add_balance_manual(self):
         txt_contrato = self.cb_contrato.get()
@@ -329,7 +382,11 @@ class AttendanceView(ttk.Frame):
         
         dias = askfloat("Ajuste Manual", "Ingrese días a sumar (Saldo Inicial):", parent=self)
         if dias is not None:
-            ok, msg = self.dao.insert_kardex_manual(id_contrato, "SALDO_INICIAL", dias, "Carga Manual UI")
-            if ok:
-                Messagebox.show_info("Saldo actualizado", "Éxito")
-                self.on_contract_change(None)
\ No newline at end of file
+            self.tasks.submit(self.dao.insert_kardex_manual, id_contrato, "SALDO_INICIAL", dias, "Carga Manual UI",
+                              on_done=self._on_balance_added)
+
+    def _on_balance_added(self, result):
+        ok, msg = result
+        if ok:
+            Messagebox.show_info("Saldo actualizado", "Éxito")
+            self.on_contract_change(None)
\ No newline at end of file
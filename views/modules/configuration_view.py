@@ -2,8 +2,12 @@ import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from ttkbootstrap.dialogs import Messagebox
 from models.catalogs_dao import CatalogsDAO
+from views.task_executor import TaskRunner
 
 class ConfigurationView(ttk.Frame):
+    # Sin refresh(): los combos de cada pestaña se arman con otros catálogos; si cambian, ViewRegistry la reconstruye
+    DATA_TOPICS = ('catalogos',)
+
     def __init__(self, parent, controller=None):
         super().__init__(parent)
         self.controller = controller
@@ -78,11 +82,19 @@ class ConfigurationView(ttk.Frame):
 
         # JORNADAS LABORALES
         self.notebook.add(CatalogTab(
-            self.notebook, "Jornadas Laborales", ("ID", "Descripción", "Horas Diarias"),
+            self.notebook, "Jornadas Laborales", ("ID", "Descripción", "Horas Diarias", "Días Laborables (L-D)"),
             self.dao.get_jornadas, self.dao.crud_jornada,
-            fields=[("Nombre (ej: Turno A):", "text"), ("Horas (ej: 8.0):", "text")]
+            fields=[("Nombre (ej: Turno A):", "text"), ("Horas (ej: 8.0):", "text"),
+                    ("Días L-D (ej: 1111100):", "text")]
         ), text="Jornadas")
 
+        # FERIADOS (se descuentan del cálculo de días y de las horas programadas PERC)
+        self.notebook.add(CatalogTab(
+            self.notebook, "Feriados", ("ID", "Fecha", "Descripción"),
+            self.dao.get_feriados, self.dao.crud_feriado,
+            fields=[("Fecha (AAAA-MM-DD):", "text"), ("Descripción:", "text")]
+        ), text="Feriados")
+
     def _init_attendance_tabs(self):
             """ Inicializa las pestañas relacionadas a RRHH / Asistencia """
             
@@ -156,6 +168,8 @@ class CatalogTab(ttk.Frame):
         
         self.selected_id = None
         self.widgets = [] # Lista de diccionarios {'type': 'text/combo', 'widget': w, 'data': ...}
+        # Lecturas: catálogo en memoria (directo). Escrituras: en segundo plano
+        self.tasks = TaskRunner(self, on_busy=self._set_busy)
         
         self._setup_ui()
         self.refresh_table()
@@ -201,7 +215,12 @@ class CatalogTab(ttk.Frame):
                     
                     w = ttk.Combobox(f_item, values=values, state="readonly", width=25)
                     w.pack(pady=2)
-                    self.widgets.append({'type': 'combo', 'widget': w, 'source': sorted_source}) # Usamos la lista ordenada
+                    self.widgets.append({
+                        'type': 'combo', 'widget': w, 'source': sorted_source, # Usamos la lista ordenada
+                        # Índices para pasar de ID a texto y viceversa sin recorrer la lista
+                        'by_id': {str(x[0]): x[1] for x in sorted_source},
+                        'by_name': {x[1]: x[0] for x in sorted_source}
+                    })
 
                 elif w_type == "checkbox":
                     ttk.Label(f_item, text="").pack() # Spacer
@@ -247,7 +266,8 @@ class CatalogTab(ttk.Frame):
 
     def refresh_table(self):
         for item in self.tree.get_children(): self.tree.delete(item)
-        rows = self.dao_fetch()
+        rows = self.dao_fetch() # Catálogos cacheados en CatalogsDAO (sin consulta si no cambiaron)
+        self.rows_by_id = {r[0]: r for r in rows}
         for row in rows:
             # Cortamos la fila visualmente según las columnas definidas
             # (El DAO de tipos devuelve datos extra al final que no mostramos en tabla pero usamos al editar)
@@ -261,9 +281,8 @@ class CatalogTab(ttk.Frame):
             item = self.tree.item(sel[0])
             row_id = item['values'][0]
 
-            # 1. Recuperar Data Real de BD
-            full_rows = self.dao_fetch()
-            actual_data = next((r for r in full_rows if r[0] == row_id), None)
+            # 1. Recuperar la fila completa (incluye datos RAW ocultos)
+            actual_data = self.rows_by_id.get(row_id)
             
             if not actual_data: return
 
@@ -309,7 +328,7 @@ class CatalogTab(ttk.Frame):
                         else:
                             # Buscar el texto que corresponde a ese ID en la lista fuente
                             # Comparamos como strings por seguridad si los IDs vienen mezclados
-                            txt = next((x[1] for x in w_conf['source'] if str(x[0]) == str(val_raw)), "")
+                            txt = w_conf['by_id'].get(str(val_raw), "")
                             w_conf['widget'].set(txt)
                     
                     elif w_conf['type'] == 'check':
@@ -346,8 +365,7 @@ class CatalogTab(ttk.Frame):
                         params.append(None)
                     else:
                         # Si seleccionó algo, buscamos su ID
-                        # Usamos next con default None por seguridad
-                        id_val = next((x[0] for x in w['source'] if x[1] == txt), None)
+                        id_val = w['by_name'].get(txt)
                         
                         if id_val is None:
                             # Caso raro: Texto en combo que no coincide con la lista (Usuario escribió a mano)
@@ -360,10 +378,12 @@ class CatalogTab(ttk.Frame):
 
             # Ejecución del CRUD
             if self.selected_id:
-                ok, msg = self.dao_crud("UPDATE", self.selected_id, *params)
+                self.tasks.submit(self.dao_crud, "UPDATE", self.selected_id, *params, on_done=self._on_saved)
             else:
-                ok, msg = self.dao_crud("INSERT", None, *params)
-                
+                self.tasks.submit(self.dao_crud, "INSERT", None, *params, on_done=self._on_saved)
+
+    def _on_saved(self, result):
+            ok, msg = result
             if ok:
                 Messagebox.show_info(msg, "Éxito")
                 self.clear_form()
@@ -381,9 +401,15 @@ class CatalogTab(ttk.Frame):
     def delete(self):
         if not self.selected_id: return
         if Messagebox.yesno("¿Eliminar?", "Confirmar") == 'Yes':
-            ok, msg = self.dao_crud("DELETE", self.selected_id)
-            if ok: 
-                self.clear_form()
-                self.refresh_table()
-            else:
-                Messagebox.show_error(msg, "Error")
\ No newline at end of file
+            self.tasks.submit(self.dao_crud, "DELETE", self.selected_id, on_done=self._on_deleted)
+
+    def _on_deleted(self, result):
+        ok, msg = result
+        if ok: 
+            self.clear_form()
+            self.refresh_table()
+        else:
+            Messagebox.show_error(msg, "Error")
+
+    def _set_busy(self, busy):
+        self.btn_save.configure(state="disabled" if busy else "normal")
\ No newline at end of file
@@ -5,13 +5,18 @@ from views.components.employee_selector import EmployeeSelector
 from models.contract_dao import ContractDAO
 from models.catalogs_dao import CatalogsDAO
 from views.components.contract_selector import ContractSelector 
+from views.task_executor import TaskRunner
 
 class ContractsView(ttk.Frame):
+    # Áreas de datos que muestra: al volver a la pantalla se refresca solo si cambiaron (ViewRegistry)
+    DATA_TOPICS = ('catalogos',)
+
     def __init__(self, parent, controller=None):
         super().__init__(parent)
         self.controller = controller
         self.dao = ContractDAO()
-        self.cat_dao = CatalogsDAO()
+        self.cat_dao = CatalogsDAO() # Catálogos en memoria: se leen directo en el hilo de Tk
+        self.tasks = TaskRunner(self, on_busy=self._set_busy) # Contratos fuera del hilo de Tk
         
         self.selected_contract_id = None # Control de Estado (None=Crear, ID=Editar)
         self.current_employee_id = None
@@ -169,18 +174,22 @@ class ContractsView(ttk.Frame):
 
     # --- LÓGICA ---
     def _load_catalogs(self):
-        # Carga igual que antes ...
-        self.puestos_data = self.cat_dao.get_puestos()
-        self.deptos_data = self.cat_dao.get_departamentos()
-        self.tipos_data = self.cat_dao.get_tipos_contrato()
-        self.unidades_data = self.cat_dao.get_unidades_produccion()
-        self.jornadas_data = self.cat_dao.get_jornadas()
-
-        self.cb_puesto['values'] = [x[1] for x in self.puestos_data]
-        self.cb_depto['values'] = [x[1] for x in self.deptos_data]
-        self.cb_tipo['values'] = [x[1] for x in self.tipos_data]
-        self.cb_unidad['values'] = [x[1] for x in self.unidades_data]
-        self.cb_jornada['values'] = [x[1] for x in self.jornadas_data]
+        # Catálogos desde la caché de proceso, con índices id <-> nombre (CatalogMap)
+        self.puestos_map = self.cat_dao.get_catalog_map('puestos')
+        self.deptos_map = self.cat_dao.get_catalog_map('departamentos')
+        self.tipos_map = self.cat_dao.get_catalog_map('tipos_contrato')
+        self.unidades_map = self.cat_dao.get_catalog_map('unidades')
+        self.jornadas_map = self.cat_dao.get_catalog_map('jornadas')
+
+        self.cb_puesto['values'] = self.puestos_map.names()
+        self.cb_depto['values'] = self.deptos_map.names()
+        self.cb_tipo['values'] = self.tipos_map.names()
+        self.cb_unidad['values'] = self.unidades_map.names()
+        self.cb_jornada['values'] = self.jornadas_map.names()
+
+    def refresh(self):
+        # El formulario en edición se conserva: solo se recargan los combos
+        self._load_catalogs()
 
     def open_contract_search(self):
         # Abrir el modal y pasarle el método que maneja la selección
@@ -217,7 +226,7 @@ class ContractsView(ttk.Frame):
         if not unidad_nombre: return
         
         # Buscar ID
-        unidad_id = next((x[0] for x in self.unidades_data if x[1] == unidad_nombre), None)
+        unidad_id = self.unidades_map.id(unidad_nombre)
         
         if unidad_id:
             # Validar que no esté duplicada
@@ -254,14 +263,20 @@ class ContractsView(ttk.Frame):
         
         for uid, pct in self.cost_distribution_list:
             # Buscar nombre para mostrar
-            u_name = next((x[1] for x in self.unidades_data if x[0] == uid), "Desconocido")
+            u_name = self.unidades_map.name(uid, "Desconocido")
             self.tree_costos.insert("", END, values=(uid, u_name, pct))
 
     # --- LÓGICA DE EDICIÓN ---
 
     def _load_contract_to_form(self, id_contrato):
+            # Detalle en segundo plano; si se elige otro contrato antes, este se descarta
+            self.tasks.submit(self.dao.get_contract_details, id_contrato,
+                              on_done=lambda details: self._fill_contract_form(id_contrato, details),
+                              key='contrato')
+
+    def _fill_contract_form(self, id_contrato, details):
             # contrato trae ahora 11 columnas fijas (0 a 10)
-            contrato, empleado, costos = self.dao.get_contract_details(id_contrato)
+            contrato, empleado, costos = details
             
             # 1. Configuración Visual
             self.selected_contract_id = id_contrato
@@ -279,10 +294,10 @@ class ContractsView(ttk.Frame):
             # contrato[4] = id_tipo_contrato
             # contrato[5] = id_jornada
             
-            puesto_txt = next((x[1] for x in self.puestos_data if x[0] == contrato[2]), "")
-            depto_txt = next((x[1] for x in self.deptos_data if x[0] == contrato[3]), "")
-            tipo_txt = next((x[1] for x in self.tipos_data if x[0] == contrato[4]), "")
-            jornada_txt = next((x[1] for x in self.jornadas_data if x[0] == contrato[5]), "")
+            puesto_txt = self.puestos_map.name(contrato[2])
+            depto_txt = self.deptos_map.name(contrato[3])
+            tipo_txt = self.tipos_map.name(contrato[4])
+            jornada_txt = self.jornadas_map.name(contrato[5])
             
             self.cb_puesto.set(puesto_txt)
             self.cb_depto.set(depto_txt)
@@ -354,13 +369,16 @@ class ContractsView(ttk.Frame):
 
             # En ttkbootstrap, yesno retorna el string 'Yes' si confirmas.
             if confirm == 'Yes': 
-                ok, msg = self.dao.delete_contract(self.selected_contract_id)
-                if ok:
-                    Messagebox.show_info(msg, "Eliminado")
-                    self.clear_form()
-                    # self._load_contract_list()
-                else:
-                    Messagebox.show_error(msg, "Error")
+                self.tasks.submit(self.dao.delete_contract, self.selected_contract_id, on_done=self._on_deleted)
+
+    def _on_deleted(self, result):
+        ok, msg = result
+        if ok:
+            Messagebox.show_info(msg, "Eliminado")
+            self.clear_form()
+            # self._load_contract_list()
+        else:
+            Messagebox.show_error(msg, "Error")
 
     def save_contract(self):
             # 1. Validaciones de Integridad (Guard Clauses)
@@ -379,10 +397,10 @@ class ContractsView(ttk.Frame):
             try:
                 # 2. OBTENCIÓN DE IDs (Esto debe ocurrir ANTES de crear la variable 'data')
                 # -----------------------------------------------------------------------
-                id_puesto = next(x[0] for x in self.puestos_data if x[1] == self.cb_puesto.get())
-                id_depto = next(x[0] for x in self.deptos_data if x[1] == self.cb_depto.get())
-                id_tipo = next(x[0] for x in self.tipos_data if x[1] == self.cb_tipo.get())
-                id_jornada = next(x[0] for x in self.jornadas_data if x[1] == self.cb_jornada.get())
+                id_puesto = self.puestos_map.by_name[self.cb_puesto.get()]
+                id_depto = self.deptos_map.by_name[self.cb_depto.get()]
+                id_tipo = self.tipos_map.by_name[self.cb_tipo.get()]
+                id_jornada = self.jornadas_map.by_name[self.cb_jornada.get()]
 
                 # 3. OBTENCIÓN DE VALORES DEL FORMULARIO
                 # -----------------------------------------------------------------------
@@ -416,7 +434,8 @@ class ContractsView(ttk.Frame):
                         fecha_fin, 
                         salario
                     )
-                    ok, msg = self.dao.create_contract(data, self.cost_distribution_list)
+                    self.tasks.submit(self.dao.create_contract, data, list(self.cost_distribution_list),
+                                      on_done=self._on_saved, on_error=self._on_save_error)
                 else:
                     # MODO EDITAR (UPDATE)
                     # Orden DAO: id_puesto, id_depto, id_tipo, id_jornada, 
@@ -433,20 +452,31 @@ class ContractsView(ttk.Frame):
                         salario, 
                         self.selected_contract_id
                     )
-                    ok, msg = self.dao.update_contract(self.selected_contract_id, data, self.cost_distribution_list)
-
-                # 5. RESPUESTA
-                if ok:
-                    Messagebox.show_info(msg, "Éxito")
-                    self.clear_form()
-                    # self._load_contract_list()
-                else:
-                    Messagebox.show_error(msg, "Error de Base de Datos")
+                    self.tasks.submit(self.dao.update_contract, self.selected_contract_id, data,
+                                      list(self.cost_distribution_list),
+                                      on_done=self._on_saved, on_error=self._on_save_error)
 
-            except StopIteration:
-                # Esto ocurre si el next() no encuentra el valor en la lista (Combobox con texto inválido)
+            except KeyError:
+                # El texto del Combobox no está en el catálogo (texto inválido)
                 Messagebox.show_error("Error interno: No se pudo validar el ID de un catálogo seleccionado.", "Error de Datos")
             except ValueError:
                 Messagebox.show_error("Verifique que los campos numéricos (Salario, Saldo) sean correctos.", "Error de Formato")
             except Exception as e:
-                Messagebox.show_error(f"Error inesperado: {e}", "Error Crítico")
\ No newline at end of file
+                Messagebox.show_error(f"Error inesperado: {e}", "Error Crítico")
+
+    def _on_saved(self, result):
+        # 5. RESPUESTA
+        ok, msg = result
+        if ok:
+            Messagebox.show_info(msg, "Éxito")
+            self.clear_form()
+            # self._load_contract_list()
+        else:
+            Messagebox.show_error(msg, "Error de Base de Datos")
+
+    def _on_save_error(self, e):
+        Messagebox.show_error(f"Error inesperado: {e}", "Error Crítico")
+
+    def _set_busy(self, busy):
+        self.configure(cursor="watch" if busy else "")
+        self.btn_save.configure(state="disabled" if busy else "normal")
@@ -2,12 +2,17 @@ import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from ttkbootstrap.dialogs import Messagebox
 from models.employee_dao import EmployeeDAO
+from views.task_executor import TaskRunner
 
 class EmployeesView(ttk.Frame):
+    # Áreas de datos que muestra: al volver a la pantalla se refresca solo si cambiaron (ViewRegistry)
+    DATA_TOPICS = ('empleados',)
+
     def __init__(self, parent, controller=None):  
         super().__init__(parent)
         self.controller = controller  
         self.dao = EmployeeDAO()
+        self.tasks = TaskRunner(self, on_busy=self._set_busy) # Consultas y guardados fuera del hilo de Tk
         self.selected_id = None # ESTADO: None = Creando, Numero = Editando
         
         self.pack(fill=BOTH, expand=True)
@@ -92,12 +97,22 @@ class EmployeesView(ttk.Frame):
         self.tree.bind("<Double-1>", self.on_row_double_click)
 
     def load_table_data(self):
+        # La consulta corre en segundo plano; si se pide otra recarga antes, esta se descarta
+        self.tasks.submit(self.dao.get_all, on_done=self._fill_table, key='tabla')
+
+    def _fill_table(self, rows):
         for item in self.tree.get_children():
             self.tree.delete(item)
-        rows = self.dao.get_all()
         for row in rows:
             self.tree.insert("", END, values=row)
 
+    def refresh(self):
+        self.load_table_data()
+
+    def _set_busy(self, busy):
+        self.configure(cursor="watch" if busy else "")
+        self.btn_save.configure(state="disabled" if busy else "normal")
+
     def on_row_double_click(self, event):
         """Carga los datos de la fila en el formulario para editar"""
         selection = self.tree.selection()
@@ -155,25 +170,31 @@ class EmployeesView(ttk.Frame):
         # 2. Decidir acción
         if self.selected_id is None:
             # CREATE
-            success, msg = self.dao.insert(
+            self.tasks.submit(
+                self.dao.insert,
                 self.var_codigo.get().strip(),
                 self.var_dni.get().strip(),
                 nombres,
                 apellidos,
-                self.var_fecha.get()
+                self.var_fecha.get(),
+                on_done=self._on_saved
             )
         else:
             # UPDATE
-            success, msg = self.dao.update(
+            self.tasks.submit(
+                self.dao.update,
                 self.selected_id,
                 self.var_codigo.get().strip(),
                 self.var_dni.get().strip(),
                 nombres,
                 apellidos,
-                self.var_fecha.get()
+                self.var_fecha.get(),
+                on_done=self._on_saved
             )
 
+    def _on_saved(self, result):
         # 3. Respuesta
+        success, msg = result
         if success:
             Messagebox.show_info(msg, "Éxito")
             self.clear_form()
@@ -193,12 +214,14 @@ class EmployeesView(ttk.Frame):
         )
         
         if confirm == 'Yes':
-            success, message = self.dao.delete_employee(self.selected_id)
-            
-            if success:
-                Messagebox.show_info(message, "Eliminado")
-                self.clear_form()
-                self.load_table_data()
-            else:
-                # Si falla (ej: tiene contratos), mostramos el error del DAO
-                Messagebox.show_error(message, "No se pudo eliminar")
\ No newline at end of file
+            self.tasks.submit(self.dao.delete_employee, self.selected_id, on_done=self._on_deleted)
+
+    def _on_deleted(self, result):
+        success, message = result
+        if success:
+            Messagebox.show_info(message, "Eliminado")
+            self.clear_form()
+            self.load_table_data()
+        else:
+            # Si falla (ej: tiene contratos), mostramos el error del DAO
+            Messagebox.show_error(message, "No se pudo eliminar")
\ No newline at end of file
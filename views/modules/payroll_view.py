@@ -2,20 +2,25 @@ import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from tkinter import filedialog, messagebox
 from datetime import datetime
-import threading
 
 # Importamos lógica y modelos
-from logics.payroll_import_service import PayrollImportService
+from logics.lazy_service import LazyService
 from models.payroll_dao import PayrollDAO
+from views.components.virtual_table import VirtualTable, QuerySource
+from views.task_executor import TaskRunner
 
 class PayrollView(ttk.Frame):
+    # Áreas de datos que muestra: al volver a la pantalla se refresca solo si cambiaron (ViewRegistry)
+    DATA_TOPICS = ('nominas', 'contratos', 'empleados')
+
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
         
         # Servicios
-        self.service = PayrollImportService()
+        self.service = LazyService('logics.payroll_import_service', 'PayrollImportService') # pandas al primer uso
         self.dao = PayrollDAO()
+        self.tasks = TaskRunner(self, on_busy=self._set_loading) # Barra de progreso mientras haya consultas
         
         self.pack(fill=BOTH, expand=True, padx=20, pady=20)
 
@@ -83,10 +88,11 @@ class PayrollView(ttk.Frame):
         self.progress = ttk.Progressbar(row_actions, mode='indeterminate', bootstyle="success-striped")
         # (Se empaca solo cuando se usa)
 
-        # --- TABLA DE DATOS (TREEVIEW) ---
+        # --- TABLA DE DATOS (TREEVIEW VIRTUAL: solo las filas visibles, páginas desde el DAO) ---
         # Columnas para ver el resumen
         cols = ("id","empleado", "puesto", "base", "bonos", "beneficios", "deducciones", "total", "obs")
-        self.tree = ttk.Treeview(self, columns=cols, show="headings", height=15)
+        self.table = VirtualTable(self, columns=cols, render=self._render_row, height=15)
+        self.tree = self.table.tree
         
         # Configuración de Cabeceras
         self.tree.heading("id", text="ID") # Necesario aunque no se vea
@@ -113,12 +119,7 @@ class PayrollView(ttk.Frame):
         # 3. BINDING PARA DOBLE CLIC (EDICIÓN)
         self.tree.bind("<Double-1>", self.on_double_click)
 
-        # Scrollbar
-        scrolly = ttk.Scrollbar(self, orient=VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscroll=scrolly.set)
-        
-        self.tree.pack(side=LEFT, fill=BOTH, expand=True, pady=10)
-        scrolly.pack(side=RIGHT, fill=Y, pady=10)
+        self.table.pack(fill=BOTH, expand=True, pady=10)
 
         # --- FOOTER (TOTALES) ---
         self.lbl_total_general = ttk.Label(self, text="Total Planilla Mes: L. 0.00", font=("Helvetica", 12, "bold"), bootstyle="inverse-primary")
@@ -126,40 +127,38 @@ class PayrollView(ttk.Frame):
 
     # ---------------- LÓGICA DE INTERFAZ ----------------
 
-    def load_data(self):
+    def load_data(self, keep_position=False):
         """Consulta la BD y llena la tabla"""
-        # Limpiar tabla
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-            
         anio = int(self.spin_anio.get())
         mes = int(self.combo_mes.get())
-        
-        # Usamos el método especial del DAO que hace los JOINs
-        rows = self.dao.get_payroll_summary_by_period(anio, mes)
-        
-        total_acumulado = 0.0
-
-        for row in rows:
-            # row estructura según el DAO: 
-            # (codigo, empleado, puesto, salario, bonos, beneficios, deducciones, total, obs)
-            # Mapeamos a las columnas del Treeview
-            id_nomina = row[0] # Capturamos el ID
-            
-            # Formateos
-            salario = f"L. {row[4]:,.2f}"
-            bonos = f"L. {row[5]:,.2f}"
-            beneficios = f"L. {row[6]:,.2f}"
-            deducciones = f"L. {row[7]:,.2f}"
-            total = f"L. {row[8]:,.2f}"
-            
-            total_acumulado += row[8]
-            
-            # Insertamos ID en la primera posición (aunque esté oculta)
-            values = (id_nomina, row[2], row[3], salario, bonos, beneficios, deducciones, total, row[9])
-            self.tree.insert("", END, values=values)
-            
+
+        # Conteo y total en SQL (en segundo plano); las filas las pide la tabla página a página
+        # al desplazarse. Si se cambia de periodo antes de que llegue, el resultado viejo se descarta.
+        self.tasks.submit(self.dao.get_payroll_period_totals, anio, mes,
+                          on_done=lambda totals: self._show_period(anio, mes, *totals, keep_position),
+                          key='planilla')
+
+    def _show_period(self, anio, mes, cantidad, total_acumulado, keep_position):
+        self.table.set_source(QuerySource(
+            lambda: cantidad,
+            # Usamos el método especial del DAO que hace los JOINs
+            lambda offset, limit, order_by, desc: self.dao.get_payroll_summary_by_period(
+                anio, mes, limit, offset, order_by, desc),
+            sortable=self.dao.SUMMARY_SORT_COLUMNS,
+        ), keep_position=keep_position)
+
         self.lbl_total_general.config(text=f"  Total Planilla Mes {mes}/{anio}: L. {total_acumulado:,.2f}  ")
+
+    @staticmethod
+    def _render_row(row):
+        # row estructura según el DAO:
+        # (id_nomina, codigo, empleado, puesto, salario, bonos, beneficios, deducciones, total, obs)
+        # ID en la primera posición (aunque esté oculta); montos con formato
+        montos = [f"L. {valor:,.2f}" for valor in row[4:9]]
+        return (row[0], row[2], row[3], *montos, row[9]), ()
+    def refresh(self):
+        self.load_data(keep_position=True)
+
     def download_template(self):
         """Manejador para descargar plantilla"""
         anio = self.spin_anio.get()
@@ -175,13 +174,10 @@ class PayrollView(ttk.Frame):
         
         if not filepath: return
 
-        # Ejecutar en hilo para no congelar
-        self._set_loading(True)
-        threading.Thread(target=self._run_template_generation, args=(filepath, int(anio), int(mes))).start()
-
-    def _run_template_generation(self, filepath, anio, mes):
-        success, msg = self.service.generate_payroll_template(filepath, anio, mes)
-        self.after(0, lambda: self._on_process_finished(success, msg))
+        # Ejecutar en segundo plano para no congelar (la barra la maneja on_busy)
+        self.tasks.submit(self.service.method('generate_payroll_template'), filepath, int(anio), int(mes),
+                          on_done=lambda result: self._on_process_finished(*result),
+                          on_error=self._on_process_error)
 
     def upload_payroll(self):
         """Manejador para subir Excel"""
@@ -198,15 +194,11 @@ class PayrollView(ttk.Frame):
                                       "se actualizarán los valores.")
         if not confirm: return
 
-        self._set_loading(True)
-        threading.Thread(target=self._run_upload, args=(filepath,)).start()
-
-    def _run_upload(self, filepath):
-        success, msg = self.service.process_payroll_import(filepath)
-        self.after(0, lambda: self._on_process_finished(success, msg, refresh=True))
+        self.tasks.submit(self.service.method('process_payroll_import'), filepath,
+                          on_done=lambda result: self._on_process_finished(result[0], result[1], refresh=True),
+                          on_error=self._on_process_error)
 
     def _on_process_finished(self, success, msg, refresh=False):
-        self._set_loading(False)
         if success:
             messagebox.showinfo("Éxito", msg)
             if refresh:
@@ -214,6 +206,9 @@ class PayrollView(ttk.Frame):
         else:
             messagebox.showerror("Error", msg)
 
+    def _on_process_error(self, e):
+        messagebox.showerror("Error", f"Error inesperado: {str(e)}")
+
     def _set_loading(self, loading):
         if loading:
             self.progress.pack(side=LEFT, padx=10)
@@ -235,51 +230,35 @@ class PayrollView(ttk.Frame):
         )
         
         if confirm:
-            success, msg = self.dao.delete_period(anio, mes)
-            if success:
-                messagebox.showinfo("Periodo Eliminado", msg)
-                self.load_data() # Recargar tabla (quedará vacía)
-            else:
-                messagebox.showerror("Error", msg)
+            self.tasks.submit(self.dao.delete_period, anio, mes, on_done=self._on_period_deleted)
+
+    def _on_period_deleted(self, result):
+        success, msg = result
+        if success:
+            messagebox.showinfo("Periodo Eliminado", msg)
+            self.load_data() # Recargar tabla (quedará vacía)
+        else:
+            messagebox.showerror("Error", msg)
 
     # ---------------- LÓGICA DE EDICIÓN INDIVIDUAL ----------------
     def on_double_click(self, event):
         """Abre modal para editar una fila"""
-        item = self.tree.selection()
-        if not item: return
-        
-        # Obtener valores de la fila seleccionada
-        values = self.tree.item(item, "values")
-        # values[0] es el ID oculto
-        # values[1] es el Nombre
-        # values[3] es Salario Base (texto formateado "L. 1,000.00")
+        row = self.table.selected_row()
+        if not row: return
         
-        id_nomina = values[0]
-        nombre_emp = values[1]
+        # Fila CRUDA del DAO (no el texto formateado "L. 1,000.00")
+        id_nomina = row[0]
+        nombre_emp = row[2]
         
         self._open_edit_modal(id_nomina, nombre_emp)
 
     def _open_edit_modal(self, id_nomina, nombre_emp):
         """Crea una ventana emergente (Toplevel) para editar montos"""
         
-        # 1. Recuperar datos CRUDOS (sin formato moneda) de la BD para editar bien
-        #    Podríamos parsear el texto de la tabla, pero es mejor pedir el dato limpio al DAO
-        #    (Ojo: Usamos un pequeño truco: reutilizamos la query general o hacemos una especifica.
-        #     Para rapidez, parsearemos el texto quitando "L." y ",").
-        
-        # Helper para limpiar moneda
-        def clean_money(val_str):
-            return val_str.replace("L.", "").replace(",", "").strip()
-
-        # Obtenemos los valores visuales actuales
-        item = self.tree.selection()[0]
-        vals = self.tree.item(item, "values")
-        
-        current_base = clean_money(vals[3])
-        current_bonos = clean_money(vals[4])
-        current_beneficios = clean_money(vals[5])
-        current_deducciones = clean_money(vals[6])
-        current_obs = vals[8]
+        # 1. Datos CRUDOS (sin formato moneda): la tabla virtual guarda la fila tal como vino del DAO
+        row = self.table.selected_row()
+        current_base, current_bonos, current_beneficios, current_deducciones = (f"{v:.2f}" for v in row[4:8])
+        current_obs = row[9] or ""
 
         # 2. Crear Ventana Modal
         top = ttk.Toplevel(title=f"Editar: {nombre_emp}")
@@ -328,17 +307,23 @@ class PayrollView(ttk.Frame):
                 n_ded = float(entry_ded.get())
                 s_obs = entry_obs.get()
                 
-                # Llamar al DAO
-                success, msg = self.dao.update_payroll_record(id_nomina, n_base, n_bonos, n_ben, n_ded, s_obs)
-                
-                if success:
-                    messagebox.showinfo("Éxito", "Registro actualizado correctamente.", parent=top)
-                    top.destroy()
-                    self.load_data() # Refrescar tabla principal
-                else:
-                    messagebox.showerror("Error", msg, parent=top)
+                # Llamar al DAO (en segundo plano)
+                self.tasks.submit(self.dao.update_payroll_record, id_nomina, n_base, n_bonos, n_ben, n_ded, s_obs,
+                                  on_done=on_saved)
                     
             except ValueError:
                 messagebox.showerror("Error", "Por favor ingrese valores numéricos válidos.", parent=top)
 
+        def on_saved(result):
+            success, msg = result
+            if not top.winfo_exists(): # El modal se cerró mientras se guardaba
+                self.load_data(keep_position=True)
+                return
+            if success:
+                messagebox.showinfo("Éxito", "Registro actualizado correctamente.", parent=top)
+                top.destroy()
+                self.load_data(keep_position=True) # Refrescar tabla principal
+            else:
+                messagebox.showerror("Error", msg, parent=top)
+
         ttk.Button(frm, text="💾 Guardar Cambios", bootstyle="success", command=save_changes).pack(fill=X, pady=10)
\ No newline at end of file
@@ -5,16 +5,26 @@ import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from tkinter import filedialog, messagebox
 from datetime import datetime
-import threading
+from config import settings
 
 # Importamos el servicio
-from logics.perc_export_service import PercExportService
+from logics.vacation_service import VacationService
+from logics.backup_service import BackupService
+from logics.lazy_service import LazyService
+from views.task_executor import TaskRunner
 
 class ReportsView(ttk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
-        self.service = PercExportService() # Instancia única del servicio
+        # Servicios con pandas/openpyxl: se importan en su primer uso (dentro del hilo del reporte)
+        self.service = LazyService('logics.perc_export_service', 'PercExportService') # Instancia única del servicio
+        self.vac_service = VacationService()
+        self.backup_service = BackupService()
+        self.report_service = LazyService('logics.report_service', 'ReportService')
+        self.liability_service = LazyService('logics.vacation_liability_service', 'VacationLiabilityService')
+        # Los trabajos corren en el pool compartido; resultados y avance vuelven al hilo de Tk
+        self.tasks = TaskRunner(self)
         self.pack(fill=BOTH, expand=True, padx=20, pady=20)
 
         # Título principal
@@ -33,21 +43,23 @@ class ReportsView(ttk.Frame):
         self._create_report_section(
             title="Plantilla PERC - Empleados",
             filename_prefix="EMPLEADOS_PERC",
-            export_method=self.service.generate_empleados_perc_excel
+            export_method=self.service.method('generate_empleados_perc_excel')
         )
 
 
         self._create_report_with_input_section(
             title="Plantilla PERC - Programación de Horas",
             filename_prefix="PROGRAMACION_HORAS_PERC",
-            export_method=self.service.generate_programacion_horas_perc_excel
+            export_method=self.service.method('generate_programacion_horas_perc_excel')
         )
         # CAMBIO 1: Vinculamos al método real del servicio
         self._create_report_section_attemporal(
             title="Descargar Base de Datos Completa",
             filename_prefix="BACKUP_RRHH_FULL",
-            export_method=self.service.export_database_to_excel 
+            export_method=self.service.method('export_database_to_excel')
         )
+        self._create_kardex_batch_section()
+        self._create_liability_section()
 
 # --------------------------------------------------
         # SECCIÓN DE MANTENIMIENTO (IMPORTACIÓN)
@@ -57,6 +69,8 @@ class ReportsView(ttk.Frame):
         # lbl_danger = ttk.Label(self.main_container, text="Zona de Peligro - Restauración", font=("Helvetica", 12, "bold"), bootstyle="danger")
         # lbl_danger.pack(anchor="w", pady=(0, 10))
 
+        self._create_accrual_job_section()
+        self._create_backup_section()
         self._create_import_section()
 
 #----------------------------------------------FIN-SECCIÓN DE REPORTES-------------------------------------------
@@ -122,23 +136,18 @@ class ReportsView(ttk.Frame):
         # Bloquear UI de esta card específica
         self._set_loading_state(True, combo_mes, spin_anio, btn, progress)
 
-        # Ejecutar en hilo separado
-        thread = threading.Thread(
-            target=self._run_export_logic, 
-            args=(method, anio, mes_num, filepath, combo_mes, spin_anio, btn, progress)
-        )
-        thread.start()
+        # Ejecutar en segundo plano
+        widgets = (combo_mes, spin_anio, btn, progress)
+        self.tasks.submit(self._run_export_logic, method, anio, mes_num, filepath,
+                          on_done=lambda result: self._on_export_finished(*result, *widgets))
 
-    def _run_export_logic(self, method, year, month, filepath, *widgets):
-        """Ejecuta la función del servicio recibida por parámetro"""
+    def _run_export_logic(self, method, year, month, filepath):
+        """Ejecuta la función del servicio recibida por parámetro (en el hilo de trabajo)"""
         try:
             # Llamamos al método que se pasó por argumento
-            success, message = method(year, month, filepath)
+            return method(year, month, filepath)
         except Exception as e:
-            success, message = False, f"Error inesperado: {str(e)}"
-        
-        # Volver al hilo principal para actualizar UI
-        self.after(0, lambda: self._on_export_finished(success, message, *widgets))
+            return False, f"Error inesperado: {str(e)}"
 
     def _on_export_finished(self, success, message, combo_mes, spin_anio, btn, progress):
         self._set_loading_state(False, combo_mes, spin_anio, btn, progress)
@@ -226,22 +235,18 @@ class ReportsView(ttk.Frame):
         # Bloquear UI
         self._set_loading_state(True, combo_mes, spin_anio, btn, progress)
 
-        # Hilo
-        thread = threading.Thread(
-            target=self._run_export_logic_with_input, 
-            args=(method, anio, mes_num, output_path, input_path, combo_mes, spin_anio, btn, progress)
-        )
-        thread.start()
+        # Segundo plano
+        widgets = (combo_mes, spin_anio, btn, progress)
+        self.tasks.submit(self._run_export_logic_with_input, method, anio, mes_num, output_path, input_path,
+                          on_done=lambda result: self._on_export_finished(*result, *widgets))
 
-    def _run_export_logic_with_input(self, method, year, month, output_path, input_path, *widgets):
+    def _run_export_logic_with_input(self, method, year, month, output_path, input_path):
         """Ejecuta la lógica pasando el input_path adicional"""
         try:
             # Aquí pasamos tanto el output_path como el input_path
-            success, message = method(year, month, output_path, input_path)
+            return method(year, month, output_path, input_path)
         except Exception as e:
-            success, message = False, f"Error: {str(e)}"
-        
-        self.after(0, lambda: self._on_export_finished(success, message, *widgets))
+            return False, f"Error: {str(e)}"
 
 
 
@@ -294,21 +299,16 @@ class ReportsView(ttk.Frame):
         self._set_loading_state(True, btn, progress)
 
         # CAMBIO 2: Llamamos a un runner simplificado, NO a _run_export_logic
-        thread = threading.Thread(
-            target=self._run_simple_export_logic, 
-            args=(method, filepath, btn, progress)
-        )
-        thread.start()
+        self.tasks.submit(self._run_simple_export_logic, method, filepath,
+                          on_done=lambda result: self._on_export_finished_simple(*result, btn, progress))
 
     # --- NUEVO MÉTODO RUNNER (Para evitar el error de argumentos) ---
-    def _run_simple_export_logic(self, method, filepath, *widgets):
+    def _run_simple_export_logic(self, method, filepath):
         """Ejecuta métodos que solo requieren filepath"""
         try:
-            success, message = method(filepath)
+            return method(filepath)
         except Exception as e:
-            success, message = False, f"Error inesperado: {str(e)}"
-        
-        self.after(0, lambda: self._on_export_finished_simple(success, message, *widgets))
+            return False, f"Error inesperado: {str(e)}"
 
     # --- NUEVO MÉTODO FINISHER (Simplificado) ---
     def _on_export_finished_simple(self, success, message, btn, progress):
@@ -401,21 +401,16 @@ class ReportsView(ttk.Frame):
         # 3. Bloquear UI
         self._set_loading_state(True, btn, progress) # Reutilizamos tu método polimórfico existente
 
-        # 4. Hilo
-        thread = threading.Thread(
-            target=self._run_import_logic,
-            args=(input_path, btn, progress)
-        )
-        thread.start()
+        # 4. Segundo plano
+        self.tasks.submit(self._run_import_logic, input_path,
+                          on_done=lambda result: self._on_import_finished(*result, btn, progress))
 
-    def _run_import_logic(self, input_path, btn, progress):
+    def _run_import_logic(self, input_path):
         """Ejecuta la importación en segundo plano"""
         try:
-            success, message = self.service.import_database_from_excel(input_path)
+            return self.service.import_database_from_excel(input_path)
         except Exception as e:
-            success, message = False, f"Error inesperado: {str(e)}"
-        
-        self.after(0, lambda: self._on_import_finished(success, message, btn, progress))
+            return False, f"Error inesperado: {str(e)}"
 
     def _on_import_finished(self, success, message, btn, progress):
         """Restaura UI tras importar"""
@@ -425,4 +420,289 @@ class ReportsView(ttk.Frame):
             messagebox.showinfo("Restauración Exitosa", message)
             # Opcional: Sugerir reiniciar la app para refrescar todas las vistas cacheadas
         else:
-            messagebox.showerror("Error en Restauración", message)
\ No newline at end of file
+            messagebox.showerror("Error en Restauración", message)
+
+
+    # --- RESPALDO RÁPIDO (ARCHIVO .db / .db.gz) ---
+    def _create_backup_section(self):
+        """Tarjeta de respaldo/restauración binaria (rápida; el Excel queda como volcado legible)"""
+        card = ttk.Labelframe(self.main_container, text="Respaldo Rápido de la Base de Datos", padding=15, bootstyle="primary")
+        card.pack(fill=X, pady=10, anchor="n")
+
+        row = ttk.Frame(card)
+        row.pack(fill=X)
+
+        lbl_status = ttk.Label(row, text="Copia exacta de la base (.db.gz). Se puede usar el sistema mientras se respalda.", font=("Helvetica", 9, "italic"))
+        lbl_status.pack(side=LEFT, padx=(0, 20))
+
+        progress = ttk.Progressbar(card, mode='determinate', maximum=100, bootstyle="primary-striped")
+
+        btn_restaurar = ttk.Button(
+            row,
+            text="Restaurar Respaldo",
+            bootstyle="danger-outline",
+            command=lambda: self._handle_backup_restore_click(btn_respaldo, btn_restaurar, progress, lbl_status)
+        )
+        btn_restaurar.pack(side=RIGHT, padx=(5, 0))
+
+        btn_respaldo = ttk.Button(
+            row,
+            text="Crear Respaldo",
+            bootstyle="primary",
+            command=lambda: self._handle_backup_click(btn_respaldo, btn_restaurar, progress, lbl_status)
+        )
+        btn_respaldo.pack(side=RIGHT)
+
+    def _handle_backup_click(self, btn_respaldo, btn_restaurar, progress, lbl_status):
+        output_path = filedialog.asksaveasfilename(
+            defaultextension=".gz",
+            filetypes=[("Respaldo comprimido", "*.db.gz"), ("Base SQLite", "*.db")],
+            initialfile=BackupService.default_backup_name(compress=True),
+            initialdir=settings.BACKUP_DIR if settings.BACKUP_DIR.exists() else None,
+            title="Guardar Respaldo"
+        )
+        if not output_path:
+            return
+        self._start_backup_task(self.backup_service.create_backup, output_path,
+                                btn_respaldo, btn_restaurar, progress, lbl_status)
+
+    def _handle_backup_restore_click(self, btn_respaldo, btn_restaurar, progress, lbl_status):
+        confirm = messagebox.askyesno(
+            "Confirmación Crítica",
+            "¿Está SEGURO de que desea restaurar un respaldo?\n\n"
+            "La base de datos actual será REEMPLAZADA por la del archivo.\n"
+            "Antes se guarda una copia de la base actual (archivo .pre_restore).",
+            icon='warning'
+        )
+        if not confirm:
+            return
+
+        input_path = filedialog.askopenfilename(
+            filetypes=[("Respaldos", "*.db.gz *.db"), ("Todos", "*.*")],
+            title="Seleccionar respaldo"
+        )
+        if not input_path:
+            return
+        self._start_backup_task(self.backup_service.restore_backup, input_path,
+                                btn_respaldo, btn_restaurar, progress, lbl_status)
+
+    def _start_backup_task(self, method, path, btn_respaldo, btn_restaurar, progress, lbl_status):
+        btn_respaldo.config(state="disabled")
+        btn_restaurar.config(state="disabled")
+        progress['value'] = 0
+        progress.pack(fill=X, pady=(10, 0))
+
+        def on_progress(actual, total, mensaje):
+            pct = (actual * 100 / total) if total else 100
+            self.tasks.post(self._update_job_progress, progress, lbl_status, pct, mensaje)
+
+        def run():
+            try:
+                return method(path, progress_callback=on_progress)
+            except Exception as e:
+                return False, f"Error inesperado: {str(e)}"
+
+        self.tasks.submit(run, on_done=lambda result: self._on_backup_task_finished(
+            *result, btn_respaldo, btn_restaurar, progress, lbl_status))
+
+    def _on_backup_task_finished(self, success, message, btn_respaldo, btn_restaurar, progress, lbl_status):
+        progress.pack_forget()
+        btn_respaldo.config(state="normal")
+        btn_restaurar.config(state="normal")
+        lbl_status.config(text=message.splitlines()[0])
+
+        if success:
+            messagebox.showinfo("Respaldo", message)
+        else:
+            messagebox.showerror("Error en Respaldo", message)
+
+    # --- ESTADOS DE KARDEX DE TODOS LOS CONTRATOS ---
+    def _create_kardex_batch_section(self):
+        """Tarjeta para exportar el kardex del año de todos los contratos activos (libro o ZIP)"""
+        card = ttk.Labelframe(self.main_container, text="Estados de Kardex - Todos los Contratos", padding=15)
+        card.pack(fill=X, pady=10, anchor="n")
+
+        row = ttk.Frame(card)
+        row.pack(fill=X)
+
+        ttk.Label(row, text="Año:").pack(side=LEFT, padx=(0, 5))
+        spin_anio = ttk.Spinbox(row, from_=2020, to=2030, width=8)
+        spin_anio.set(datetime.now().year)
+        spin_anio.pack(side=LEFT, padx=(0, 15))
+
+        lbl_status = ttk.Label(row, text="Una hoja por contrato (.xlsx) o un archivo por contrato (.zip).", font=("Helvetica", 9, "italic"))
+        lbl_status.pack(side=LEFT, padx=(0, 20))
+
+        progress = ttk.Progressbar(card, mode='determinate', maximum=100, bootstyle="success-striped")
+
+        btn_exportar = ttk.Button(
+            row,
+            text="Exportar Kardex",
+            bootstyle="success",
+            command=lambda: self._handle_kardex_batch_click(spin_anio, btn_exportar, progress, lbl_status)
+        )
+        btn_exportar.pack(side=RIGHT)
+
+    def _handle_kardex_batch_click(self, spin_anio, btn, progress, lbl_status):
+        anio = spin_anio.get()
+        output_path = filedialog.asksaveasfilename(
+            defaultextension=".xlsx",
+            filetypes=[("Libro Excel (una hoja por contrato)", "*.xlsx"), ("ZIP (un archivo por contrato)", "*.zip")],
+            initialfile=f"KARDEX_CONTRATOS_{anio}.xlsx",
+            title="Guardar Estados de Kardex"
+        )
+        if not output_path:
+            return
+
+        btn.config(state="disabled", text="Procesando...")
+        spin_anio.config(state="disabled")
+        progress['value'] = 0
+        progress.pack(fill=X, pady=(10, 0))
+
+        def on_progress(actual, total, mensaje):
+            pct = (actual * 100 / total) if total else 100
+            self.tasks.post(self._update_job_progress, progress, lbl_status, pct, mensaje)
+
+        def run():
+            try:
+                return self.report_service.export_all_kardex(
+                    output_path, f"{anio}-01-01", f"{anio}-12-31", progress_callback=on_progress)
+            except Exception as e:
+                return False, f"Error inesperado: {str(e)}"
+
+        self.tasks.submit(run, on_done=lambda result: self._on_kardex_batch_finished(
+            *result, spin_anio, btn, progress, lbl_status))
+
+    def _on_kardex_batch_finished(self, success, message, spin_anio, btn, progress, lbl_status):
+        progress.pack_forget()
+        btn.config(state="normal", text="Exportar Kardex")
+        spin_anio.config(state="normal")
+        lbl_status.config(text=message.splitlines()[0])
+
+        if success:
+            messagebox.showinfo("Exportación Exitosa", message)
+        else:
+            messagebox.showerror("Error en Exportación", message)
+
+    # --- PASIVO DE VACACIONES (TODO EL PERSONAL A UNA FECHA) ---
+    def _create_liability_section(self):
+        """Tarjeta para exportar el pasivo de vacaciones (días y valor) a una fecha de corte"""
+        card = ttk.Labelframe(self.main_container, text="Pasivo de Vacaciones - Todos los Contratos", padding=15)
+        card.pack(fill=X, pady=10, anchor="n")
+
+        row = ttk.Frame(card)
+        row.pack(fill=X)
+
+        ttk.Label(row, text="Fecha de corte:").pack(side=LEFT, padx=(0, 5))
+        date_corte = ttk.DateEntry(row, dateformat='%Y-%m-%d', width=12)
+        date_corte.pack(side=LEFT, padx=(0, 15))
+
+        lbl_status = ttk.Label(row, text="Saldo en días y valor (salario diario) por contrato; proyecta si la fecha es futura.", font=("Helvetica", 9, "italic"))
+        lbl_status.pack(side=LEFT, padx=(0, 20))
+
+        progress = ttk.Progressbar(card, mode='indeterminate', bootstyle="success-striped")
+
+        btn_exportar = ttk.Button(
+            row,
+            text="Exportar Pasivo",
+            bootstyle="success",
+            command=lambda: self._handle_liability_click(date_corte, btn_exportar, progress, lbl_status)
+        )
+        btn_exportar.pack(side=RIGHT)
+
+    def _handle_liability_click(self, date_corte, btn, progress, lbl_status):
+        fecha_corte = date_corte.entry.get()
+        try:
+            datetime.strptime(fecha_corte, '%Y-%m-%d')
+        except ValueError:
+            messagebox.showwarning("Fecha inválida", "Ingrese la fecha de corte en formato AAAA-MM-DD.")
+            return
+
+        output_path = filedialog.asksaveasfilename(
+            defaultextension=".xlsx",
+            filetypes=[("Excel files", "*.xlsx")],
+            initialfile=f"PASIVO_VACACIONES_{fecha_corte}.xlsx",
+            title="Guardar Pasivo de Vacaciones"
+        )
+        if not output_path:
+            return
+
+        btn.config(state="disabled", text="Procesando...")
+        progress.pack(fill=X, pady=(10, 0))
+        progress.start(10)
+
+        def run():
+            try:
+                return self.liability_service.export_liability_excel(output_path, fecha_corte)
+            except Exception as e:
+                return False, f"Error inesperado: {str(e)}"
+
+        self.tasks.submit(run, on_done=lambda result: self._on_liability_finished(*result, btn, progress, lbl_status))
+
+    def _on_liability_finished(self, success, message, btn, progress, lbl_status):
+        progress.stop()
+        progress.pack_forget()
+        btn.config(state="normal", text="Exportar Pasivo")
+        lbl_status.config(text=message.splitlines()[0])
+
+        if success:
+            messagebox.showinfo("Exportación Exitosa", message)
+        else:
+            messagebox.showerror("Error en Exportación", message)
+
+    # --- CIERRE MENSUAL DE VACACIONES (JOB MASIVO) ---
+    def _create_accrual_job_section(self):
+        """Tarjeta para ejecutar el cierre de acumulaciones de todos los contratos"""
+        card = ttk.Labelframe(self.main_container, text="Cierre Mensual de Vacaciones (Todos los Contratos)", padding=15, bootstyle="info")
+        card.pack(fill=X, pady=10, anchor="n")
+
+        row = ttk.Frame(card)
+        row.pack(fill=X)
+
+        lbl_status = ttk.Label(row, text="Registra las acumulaciones pendientes de todos los contratos activos.", font=("Helvetica", 9, "italic"))
+        lbl_status.pack(side=LEFT, padx=(0, 20))
+
+        # Determinada: el servicio reporta avance real
+        progress = ttk.Progressbar(card, mode='determinate', maximum=100, bootstyle="info-striped")
+
+        btn_cierre = ttk.Button(
+            row,
+            text="Ejecutar Cierre",
+            bootstyle="info",
+            command=lambda: self._handle_accrual_job_click(btn_cierre, progress, lbl_status)
+        )
+        btn_cierre.pack(side=RIGHT)
+
+    def _handle_accrual_job_click(self, btn, progress, lbl_status):
+        btn.config(state="disabled", text="Procesando...")
+        progress['value'] = 0
+        progress.pack(fill=X, pady=(10, 0))
+
+        self.tasks.submit(self._run_accrual_job, progress, lbl_status,
+                          on_done=lambda result: self._on_accrual_job_finished(*result, btn, progress, lbl_status))
+
+    def _run_accrual_job(self, progress, lbl_status):
+        """Ejecuta el cierre en segundo plano reportando avance a la UI"""
+        def on_progress(actual, total, mensaje):
+            pct = (actual * 100 / total) if total else 100
+            # El callback llega desde el hilo de trabajo: delegamos el pintado al hilo de Tk
+            self.tasks.post(self._update_job_progress, progress, lbl_status, pct, mensaje)
+
+        try:
+            return self.vac_service.process_all_monthly_accruals(on_progress)
+        except Exception as e:
+            return False, f"Error inesperado: {str(e)}"
+
+    def _update_job_progress(self, progress, lbl_status, pct, mensaje):
+        progress['value'] = pct
+        lbl_status.config(text=mensaje)
+
+    def _on_accrual_job_finished(self, success, message, btn, progress, lbl_status):
+        progress.pack_forget()
+        btn.config(state="normal", text="Ejecutar Cierre")
+        lbl_status.config(text=message)
+
+        if success:
+            messagebox.showinfo("Cierre Completado", message)
+        else:
+            messagebox.showerror("Error en Cierre", message)
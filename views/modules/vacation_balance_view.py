@@ -5,18 +5,97 @@ from tkinter import filedialog
 from views.components.employee_selector import EmployeeSelector
 from models.attendance_dao import AttendanceDAO 
 from models.kardex_dao import KardexDAO
-from logics.report_service import ReportService
+from logics.lazy_service import LazyService
+from views.components.virtual_table import VirtualTable
+from views.task_executor import TaskRunner
 from datetime import datetime 
 
+class KardexStatementSource:
+    """
+    Estado de cuenta para la tabla virtual: [saldo anterior] + movimientos + proyecciones + totales.
+    Al crear la fuente (fuera del hilo de Tk) ReportService deja al día los devengos y trae la primera
+    página, conteos, totales y proyecciones; las páginas siguientes solo leen el libro
+    (KardexDAO.get_kardex_ledger, saldo corrido en SQL) desde un hilo de la tabla.
+    Filas: (posición, valores, tag).
+    """
+    FIRST_PAGE = 200
+
+    def __init__(self, report_service, kardex_dao, id_contrato, f_ini, f_fin):
+        self.kardex_dao = kardex_dao
+        self.args = (id_contrato, f_ini, f_fin)
+        data = report_service.get_kardex_report_data(id_contrato, f_ini, f_fin, limit=self.FIRST_PAGE, offset=0)
+        self.total_movimientos = data["total_movimientos"]
+        self.first_rows = data["movimientos"][:self.total_movimientos] # Sin las proyecciones
+        self.projections = data["proyecciones"]
+        self.saldo_anterior = data["saldo_anterior"]
+        self.cantidad = self.total_movimientos + len(self.projections)
+
+        self.header = None
+        if data["saldo_anterior"] != 0 or f_ini:
+            self.header = (f_ini if f_ini else "---", "SALDO ANTERIOR", "Arrastre de periodo previo",
+                           "", "", f"{data['saldo_anterior']:.2f}")
+        tot = data["totales"]
+        self.footer = ("", "TOTALES", "", f"{tot['debe']:.2f}", f"{tot['haber']:.2f}", f"{tot['saldo_final']:.2f}")
+
+    def count(self):
+        return (1 if self.header else 0) + self.cantidad + 1
+
+    def sortable(self, column):
+        return False # Saldo corrido: el orden es el del libro
+
+    def sort(self, column, descending):
+        pass
+
+    def fetch(self, offset, limit):
+        start = 1 if self.header else 0
+        rows = []
+        if offset == 0 and self.header:
+            rows.append((0, self.header, 'bold'))
+
+        # Rango pedido dentro de movimientos + proyecciones
+        a, b = max(offset - start, 0), min(offset + limit - start, self.cantidad)
+        if b > a:
+            for i, row in enumerate(self._movements(a, b), start + a):
+                debe_str = f"{row['debe']:.2f}" if row['debe'] > 0 else ""
+                haber_str = f"{row['haber']:.2f}" if row['haber'] > 0 else ""
+                values = (row['fecha'], row['tipo'], row['detalle'], debe_str, haber_str, f"{row['saldo']:.2f}")
+                rows.append((i, values, 'projection' if row['es_proyeccion'] else ''))
+
+        last = start + self.cantidad
+        if offset <= last < offset + limit:
+            rows.append((last, self.footer, 'total'))
+        return rows
+
+    def _movements(self, a, b):
+        n = self.total_movimientos
+        rows = []
+        hasta = min(b, n)
+        if hasta <= len(self.first_rows):
+            rows = self.first_rows[a:hasta]
+        elif a < hasta:
+            _, filas = self.kardex_dao.get_kardex_ledger(*self.args, limit=hasta - a, offset=a,
+                                                         saldo_inicial=self.saldo_anterior)
+            rows = [{"fecha": fecha, "tipo": tipo, "detalle": detalle, "debe": debe, "haber": haber,
+                     "saldo": saldo, "es_proyeccion": False}
+                    for _, fecha, tipo, detalle, debe, haber, saldo in filas]
+        if b > n: # Proyecciones, después del historial
+            rows += self.projections[max(a - n, 0):b - n]
+        return rows
+
+
 class VacationBalanceView(ttk.Frame):
+    # Áreas de datos que muestra: al volver a la pantalla se refresca solo si cambiaron (ViewRegistry)
+    DATA_TOPICS = ('kardex', 'inasistencias', 'contratos')
+
     def __init__(self, parent, controller=None):
         super().__init__(parent)
         self.controller = controller
         self.pack(fill=BOTH, expand=True)
 
-        self.report_service = ReportService()         
+        self.report_service = LazyService('logics.report_service', 'ReportService') # Se importa al primer reporte
         self.att_dao = AttendanceDAO()
         self.kardex_dao = KardexDAO()
+        self.tasks = TaskRunner(self, on_busy=self._set_busy) # Consultas fuera del hilo de Tk
         
         self.current_emp_id = None
         self.contracts_map = []
@@ -85,7 +164,9 @@ class VacationBalanceView(ttk.Frame):
         result_frame.pack(fill=BOTH, expand=True)
 
         cols = ("fecha", "tipo", "detalle", "debe", "haber", "saldo")
-        self.tree = ttk.Treeview(result_frame, columns=cols, show="headings")
+        # Tabla virtual: un kardex de años no materializa miles de filas en el Treeview
+        self.table = VirtualTable(result_frame, columns=cols, render=lambda r: (r[1], (r[2],)))
+        self.tree = self.table.tree
         
         # Encabezados
         self.tree.heading("fecha", text="Fecha")
@@ -106,11 +187,12 @@ class VacationBalanceView(ttk.Frame):
         self.tree.heading("saldo", text="Saldo")
         self.tree.column("saldo", width=70, anchor=E)
 
-        self.tree.pack(fill=BOTH, expand=True, side=LEFT)
-        
-        sb = ttk.Scrollbar(result_frame, orient=VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscroll=sb.set)
-        sb.pack(side=RIGHT, fill=Y)
+        # Estilos visuales del Treeview
+        self.tree.tag_configure('bold', font=('Segoe UI', 9, 'bold'))
+        self.tree.tag_configure('total', font=('Segoe UI', 9, 'bold'), background='#e1e1e1')
+        self.tree.tag_configure('projection', foreground='#555555')
+
+        self.table.pack(fill=BOTH, expand=True)
 
         # Footer
         footer = ttk.Frame(self, padding=5)
@@ -125,8 +207,12 @@ class VacationBalanceView(ttk.Frame):
         self.current_emp_id = emp_id
         self.lbl_emp.config(text=f"{emp_name}", bootstyle="primary")
         self.current_emp_name = emp_name
-        
-        self.contracts_map = self.att_dao.get_active_contracts_by_employee(emp_id)
+        self.tasks.cancel('reporte') # El reporte del empleado anterior ya no sirve
+        self.tasks.submit(self.att_dao.get_active_contracts_by_employee, emp_id,
+                          on_done=self._show_contracts, key='contratos')
+
+    def _show_contracts(self, contracts):
+        self.contracts_map = contracts
         vals = [c[1] for c in self.contracts_map]
         self.cb_contrato['values'] = vals
         
@@ -137,6 +223,10 @@ class VacationBalanceView(ttk.Frame):
             self.cb_contrato.set('')
             self.clear_table()
 
+    def refresh(self):
+        # Sin contrato seleccionado run_report no hace nada
+        self.run_report()
+
     def _get_filter_data(self):
         """Helper para extraer datos del formulario"""
         txt_contrato = self.cb_contrato.get()
@@ -162,57 +252,18 @@ class VacationBalanceView(ttk.Frame):
         if not id_con: return
 
         self.clear_table()
-        self.master.config(cursor="watch")
-        self.master.update()
-
-        try:
-            # === LLAMADA AL SERVICIO ===
-            data = self.report_service.get_kardex_report_data(id_con, f_ini, f_fin)
-            
-            # === RENDERIZADO ===
-            # A. Saldo Anterior
-            if data["saldo_anterior"] != 0 or f_ini:
-                 self.tree.insert("", END, values=(
-                    f_ini if f_ini else "---",
-                    "SALDO ANTERIOR",
-                    "Arrastre de periodo previo",
-                    "", "", 
-                    f"{data['saldo_anterior']:.2f}"
-                ), tags=('bold',))
-            
-            # B. Filas
-            for row in data["movimientos"]:
-                tag = 'projection' if row['es_proyeccion'] else ''
-                
-                debe_str = f"{row['debe']:.2f}" if row['debe'] > 0 else ""
-                haber_str = f"{row['haber']:.2f}" if row['haber'] > 0 else ""
-                
-                self.tree.insert("", END, values=(
-                    row['fecha'],
-                    row['tipo'],
-                    row['detalle'],
-                    debe_str,
-                    haber_str,
-                    f"{row['saldo']:.2f}"
-                ), tags=(tag,))
-
-            # D. Totales
-            tot = data["totales"]
-            self.tree.insert("", END, values=(
-                "", "TOTALES", "", 
-                f"{tot['debe']:.2f}", f"{tot['haber']:.2f}", f"{tot['saldo_final']:.2f}"
-            ), tags=('total',))
-
-            # Estilos visuales del Treeview
-            self.tree.tag_configure('bold', font=('Segoe UI', 9, 'bold'))
-            self.tree.tag_configure('total', font=('Segoe UI', 9, 'bold'), background='#e1e1e1')
-            self.tree.tag_configure('projection', foreground='#555555')
-
-        except Exception as e:
-            print(f"Error UI: {e}")
-            Messagebox.show_error(f"Error generando reporte: {e}")
-        finally:
-            self.master.config(cursor="")
+        # === LLAMADA AL SERVICIO === (primera página en segundo plano: incluye dejar al día los
+        # devengos; el resto de páginas se piden al desplazarse). Si el usuario cambia de contrato
+        # antes de que termine, el resultado viejo se descarta (misma clave).
+        self.tasks.submit(KardexStatementSource, self.report_service, self.kardex_dao, id_con, f_ini, f_fin,
+                          on_done=self.table.set_source, on_error=self._report_failed, key='reporte')
+
+    def _report_failed(self, e):
+        print(f"Error UI: {e}")
+        Messagebox.show_error(f"Error generando reporte: {e}")
+
+    def _set_busy(self, busy):
+        self.master.config(cursor="watch" if busy else "")
 
     def export_excel(self):
         """Manejador del botón Exportar"""
@@ -237,22 +288,24 @@ class VacationBalanceView(ttk.Frame):
 
         if not filepath: return
 
-        # Ejecutar exportación
-        self.master.config(cursor="watch")
-        try:
-            # Asumiendo que ya actualizaste el ReportService con el código que te pasé
-            success, msg = self.report_service.export_kardex_excel(id_con, f_ini, f_fin, filepath,employee_name=self.current_emp_name)
-            
-            if success:
-                Messagebox.show_info(msg, "Exportación Exitosa")
-            else:
-                Messagebox.show_error(msg, "Error")
-        except AttributeError:
-             Messagebox.show_error("El servicio de reportes no tiene el método 'export_kardex_excel'.\nAsegúrese de actualizar 'logics/report_service.py'.", "Error de Código")
-        except Exception as e:
-             Messagebox.show_error(f"Error inesperado: {str(e)}", "Error")
-        finally:
-            self.master.config(cursor="")
+        # Ejecutar exportación (en segundo plano; el cursor lo maneja _set_busy)
+        self.tasks.submit(self.report_service.method('export_kardex_excel'), id_con, f_ini, f_fin, filepath,
+                          employee_name=self.current_emp_name,
+                          on_done=self._export_done, on_error=self._export_failed)
+
+    def _export_done(self, result):
+        success, msg = result
+        if success:
+            Messagebox.show_info(msg, "Exportación Exitosa")
+        else:
+            Messagebox.show_error(msg, "Error")
+
+    def _export_failed(self, e):
+        if isinstance(e, AttributeError):
+            Messagebox.show_error("El servicio de reportes no tiene el método 'export_kardex_excel'.\nAsegúrese de actualizar 'logics/report_service.py'.", "Error de Código")
+        else:
+            Messagebox.show_error(f"Error inesperado: {str(e)}", "Error")
 
     def clear_table(self):
-        for i in self.tree.get_children(): self.tree.delete(i)
\ No newline at end of file
+        self.tasks.cancel('reporte')
+        self.table.clear()
\ No newline at end of file
@@ -0,0 +1,166 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from ttkbootstrap.dialogs import Messagebox
+from config import settings
+
+
+def _show_error(error):
+    """Error sin manejador propio: se muestra (en la app empaquetada no hay consola que lo lea)."""
+    Messagebox.show_error(f"Error inesperado: {error}", "Error")
+
+
+class TaskExecutor:
+    """
+    Pool de hilos compartido por todas las vistas para el trabajo de BD y servicios.
+    Los hilos nunca tocan Tk: cada resultado (y cada aviso de progreso) vuelve por una cola
+    que el hilo de la interfaz drena con after() mientras haya tareas pendientes.
+    Las vistas no lo usan directo sino a través de su TaskRunner.
+    """
+    _lock = threading.Lock()
+    _pool = None
+    _callbacks = queue.SimpleQueue() # (callable, args) a ejecutar en el hilo de Tk
+    _pending = 0                     # Tareas sin entregar (solo se toca en el hilo de Tk)
+    _root = None
+    _polling = False
+
+    @classmethod
+    def pool(cls):
+        with cls._lock:
+            if cls._pool is None:
+                cls._pool = ThreadPoolExecutor(max_workers=settings.UI_EXECUTOR_WORKERS,
+                                               thread_name_prefix="tarea-ui")
+            return cls._pool
+
+    @classmethod
+    def post(cls, callback, *args):
+        """Encola callback(*args) para el hilo de Tk. Seguro desde cualquier hilo."""
+        cls._callbacks.put((callback, args))
+
+    @classmethod
+    def task_started(cls, widget):
+        """Llamado desde el hilo de Tk al enviar una tarea: asegura que la cola se esté drenando."""
+        cls._pending += 1
+        if not cls._polling:
+            cls._root = widget.nametowidget('.')
+            cls._polling = True
+            cls._root.after(settings.UI_EXECUTOR_POLL_MS, cls._poll)
+
+    @classmethod
+    def task_finished(cls):
+        cls._pending -= 1
+
+    @classmethod
+    def _poll(cls):
+        while True:
+            try:
+                callback, args = cls._callbacks.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception as e:
+                _show_error(e)
+
+        if cls._pending > 0:
+            cls._root.after(settings.UI_EXECUTOR_POLL_MS, cls._poll)
+        else:
+            cls._polling = False
+
+    @classmethod
+    def shutdown(cls):
+        """Al cerrar la app: descarta lo que no empezó; lo que corre termina por su cuenta."""
+        with cls._lock:
+            if cls._pool is not None:
+                cls._pool.shutdown(wait=False, cancel_futures=True)
+                cls._pool = None
+
+
+class TaskRunner:
+    """
+    Lo que usa cada vista para no bloquear la interfaz con SQLite:
+        self.tasks = TaskRunner(self, on_busy=self._set_busy)
+        self.tasks.submit(self.dao.get_x, id_x, on_done=self._show_x, key="consulta")
+    - on_done(resultado) / on_error(excepción) corren en el hilo de Tk. Sin on_error, la
+      excepción se muestra en un diálogo de error.
+    - key: una sola tarea vigente por clave. Al enviar otra con la misma clave la anterior se
+      cancela si no empezó, y si ya estaba corriendo su resultado se descarta (p. ej. el usuario
+      eligió otro contrato antes de que terminara el reporte anterior).
+    - on_busy(True/False): al pasar de 0 a 1 tareas en curso y al volver a 0 (cursor, barra).
+      Las vistas deshabilitan ahí su botón de guardar: el guardado ya no bloquea la ventana, así
+      que sin eso un segundo clic enviaría el mismo registro dos veces.
+    - Si la vista ya no existe (se cerró o ViewRegistry la desalojó), los resultados se descartan.
+    """
+
+    def __init__(self, widget, on_busy=None):
+        self.widget = widget
+        self.on_busy = on_busy
+        self._latest = {} # {clave: future vigente}
+        self._running = 0
+
+    @property
+    def busy(self):
+        return self._running > 0
+
+    def submit(self, fn, *args, on_done=None, on_error=None, key=None, **kwargs):
+        """Ejecuta fn(*args, **kwargs) en el pool. Retorna el Future."""
+        if key is not None:
+            self.cancel(key)
+        future = TaskExecutor.pool().submit(fn, *args, **kwargs)
+        if key is not None:
+            self._latest[key] = future
+
+        TaskExecutor.task_started(self.widget)
+        self._set_running(+1)
+        # add_done_callback corre en el hilo del pool (o aquí mismo si ya terminó): solo encola
+        future.add_done_callback(lambda f: TaskExecutor.post(self._deliver, f, key, on_done, on_error))
+        return future
+
+    def cancel(self, key=None):
+        """Descarta la tarea vigente de esa clave (o todas). No interrumpe una consulta en curso."""
+        keys = [key] if key is not None else list(self._latest)
+        for k in keys:
+            future = self._latest.pop(k, None)
+            if future is not None:
+                future.cancel()
+
+    def post(self, callback, *args):
+        """Para callbacks de progreso: callback(*args) en el hilo de Tk, si la vista sigue viva."""
+        TaskExecutor.post(self._call_if_alive, callback, args)
+
+    # --- Hilo de Tk ---
+
+    def _deliver(self, future, key, on_done, on_error):
+        TaskExecutor.task_finished()
+        self._set_running(-1)
+
+        stale = key is not None and self._latest.get(key) is not future
+        if not stale and key is not None:
+            del self._latest[key]
+        if stale or future.cancelled() or not self._alive():
+            return
+
+        error = future.exception()
+        if error is not None:
+            if on_error:
+                on_error(error)
+            else:
+                _show_error(error)
+        elif on_done:
+            on_done(future.result())
+
+    def _call_if_alive(self, callback, args):
+        if self._alive():
+            callback(*args)
+
+    def _set_running(self, delta):
+        before = self._running
+        self._running += delta
+        if self.on_busy and (before == 0) != (self._running == 0) and self._alive():
+            self.on_busy(self._running > 0)
+
+    def _alive(self):
+        try:
+            return bool(self.widget.winfo_exists())
+        except Exception: # La aplicación ya se destruyó
+            return False
@@ -0,0 +1,112 @@
+import importlib
+from collections import OrderedDict
+from logics.data_events import DataEvents
+
+
+def lazy_view(module_name, class_name, *args):
+    """
+    Fábrica que importa el módulo de la vista recién al construirla por primera vez:
+    las vistas (y sus servicios) no se cargan al arrancar, sino al primer clic del menú.
+    """
+    def factory(container):
+        view_class = getattr(importlib.import_module(module_name), class_name)
+        return view_class(container, *args)
+    return factory
+
+
+class ViewRegistry:
+    """
+    Vistas de módulo que se construyen UNA vez y se ocultan/muestran con pack_forget/pack
+    (antes cada clic del menú destruía y reconstruía la pantalla, reconsultando la BD).
+    Contrato opcional de cada vista:
+        DATA_TOPICS = ('contratos', ...)  áreas de logics.data_events que muestra
+        refresh()                         recarga liviana de esos datos
+    Al volver a mostrarse, si alguna de sus áreas cambió se llama refresh(); si la vista
+    no lo define se reconstruye. Se mantienen vivas a lo sumo max_views (LRU): la menos
+    usada recientemente se destruye y se vuelve a construir si se pide otra vez (salvo que
+    tenga tareas en curso en su TaskRunner `tasks`).
+    """
+
+    def __init__(self, container, factories, max_views=None):
+        self.container = container
+        self.factories = factories # {nombre: callable(container) -> vista}
+        self.max_views = max_views
+        self._views = OrderedDict() # {nombre: (vista, opciones de pack, snapshot de áreas)}
+        self.current = None
+
+    def __contains__(self, name):
+        return name in self.factories
+
+    def owns(self, widget):
+        """True si el widget es una de las vistas vivas del registro."""
+        return any(widget is view for view, _, _ in self._views.values())
+
+    def hide(self):
+        """Oculta la vista actual (sin destruirla)."""
+        if self.current in self._views:
+            self._views[self.current][0].pack_forget()
+        self.current = None
+
+    def show(self, name):
+        """Oculta la vista actual y muestra (construyendo si hace falta) la pedida. Retorna la vista."""
+        if self.current != name:
+            self.hide()
+
+        entry = self._views.get(name)
+        if entry is not None and not entry[0].winfo_exists():
+            entry = None # La destruyó alguien más: se reconstruye
+
+        if entry is None:
+            entry = self._build(name)
+        else:
+            view, pack_options, snapshot = entry
+            view.pack(**pack_options)
+            topics = getattr(view, 'DATA_TOPICS', ())
+            if topics and DataEvents.snapshot(topics) != snapshot:
+                entry = self._refresh(name, entry)
+
+        self._views[name] = entry
+        self._views.move_to_end(name)
+        self.current = name
+        self._evict()
+        return entry[0]
+
+    def clear(self):
+        """Destruye todas las vistas (p. ej. tras cambiar de base de datos)."""
+        for view, _, _ in self._views.values():
+            view.destroy()
+        self._views.clear()
+        self.current = None
+
+    def _build(self, name):
+        view = self.factories[name](self.container)
+        # Cada vista se empaqueta sola en su __init__ (padding propio): guardamos esas opciones
+        pack_options = {k: v for k, v in view.pack_info().items() if k != 'in'}
+        return view, pack_options, DataEvents.snapshot(getattr(view, 'DATA_TOPICS', ()))
+
+    def _refresh(self, name, entry):
+        view, pack_options, _ = entry
+        topics = getattr(view, 'DATA_TOPICS', ())
+        snapshot = DataEvents.snapshot(topics) # Antes de recargar: un cambio durante la recarga no se pierde
+        if hasattr(view, 'refresh'):
+            view.refresh()
+            return view, pack_options, snapshot
+        view.destroy()
+        return self._build(name)
+
+    def _evict(self):
+        if not self.max_views:
+            return
+        # Una vista con trabajo en curso (restauración, importación, lote de kardex...) no se
+        # destruye: se perderían su resultado y sus controles de avance. Queda por encima del
+        # límite hasta que termine y se desaloja en alguna navegación posterior.
+        candidates = [name for name, (view, _, _) in self._views.items()
+                      if name != self.current and not self._busy(view)]
+        for name in candidates[:max(0, len(self._views) - self.max_views)]:
+            view, _, _ = self._views.pop(name)
+            view.destroy()
+
+    @staticmethod
+    def _busy(view):
+        tasks = getattr(view, 'tasks', None)
+        return bool(tasks and tasks.busy)